@@ -0,0 +1,265 @@
+import logging
+import time
+
+from game_constants import *
+import card_tracker
+import cards
+import computer
+import melds
+
+
+
+MAX_SEARCH_DEPTH = 8
+
+
+
+class SearchTimeout(Exception):
+	"""Raised inside a `Lookahead` when it's deadline has passed."""
+
+
+
+
+class Lookahead:
+	"""Rates the hands of a computer by the # of draws that they still need to win, looking `depth` draws ahead
+
+	Properties of a `Lookahead` type object:
+	- The next draw is one of the cards that the computer hasn't seen (`live`), each as likely as any other;
+	  cards of the same value (and all the jokers) are drawn as one
+	- After every draw it discards the card that leaves the best hand; a hand that can win needs no more draws
+	- At the end of the lookahead a hand is rated by the distance of `melds.arrange`
+	- Remembers the rating of every canonical hand (see `melds.encode`) and depth, so that deeper searches reuse the shallower ones
+	- Raises `SearchTimeout` once `deadline` (`time.perf_counter` seconds, None for no deadline) has passed
+	"""
+
+	def __init__(self, joker_val, live, deadline = None):
+		self.joker_val = joker_val
+		self.deadline = deadline
+		self.memo = {}
+		self.num_rated = 0
+
+		# the live cards of every value (the jokers as one value) with the chance of drawing that value
+		draws = {}
+		for card in cards.from_mask(live):
+			draws.setdefault(melds.JOKER_SLOT if cards.is_joker(card, joker_val) else cards.VALUES[card], []).append(card)
+		num_live = max(1, cards.popcount(live))
+		self.draws = [(value_cards, len(value_cards) / num_live) for value_cards in draws.values()]
+
+
+	def distance(self, hand, num_discards):
+		if self.deadline is not None and time.perf_counter() > self.deadline:
+			raise SearchTimeout()
+		self.num_rated += 1
+		return melds.arrange(hand, self.joker_val, num_discards = num_discards)[0]
+
+
+	def discards(self, hand):
+		"""Returns one card of every value in `hand` that isn't a joker."""
+
+		by_value = {}
+		for card in cards.from_mask(hand):
+			if not cards.is_joker(card, self.joker_val):
+				by_value.setdefault(cards.VALUES[card], card)
+		return list(by_value.values())
+
+
+	def after_draw(self, hand, depth):
+		"""Returns the # of draws that the hand `hand` (after a draw, before the discard) still needs to win."""
+
+		key = (melds.encode(hand, self.joker_val), depth, True)
+		draws_needed = self.memo.get(key)
+		if draws_needed is None:
+			draws_needed = self.distance(hand, 1)
+			if draws_needed and depth:
+				draws_needed = self.best_discard(hand, depth)[1]
+			self.memo[key] = draws_needed
+		return draws_needed
+
+
+	def before_draw(self, hand, depth):
+		"""Returns the # of draws that the hand `hand` (before a draw) needs to win."""
+
+		key = (melds.encode(hand, self.joker_val), depth, False)
+		draws_needed = self.memo.get(key)
+		if draws_needed is None:
+			draws_needed = 1 + self.expected(hand, depth - 1)
+			self.memo[key] = draws_needed
+		return draws_needed
+
+
+	def expected(self, hand, depth):
+		"""Returns the # of draws that the hand `hand` needs to win after a draw from the main deck, on average."""
+
+		draws_needed = 0.0
+		for value_cards, chance in self.draws:
+			# a card of the value that isn't in the hand yet (deeper in the search it may have drawn some)
+			card = next((card for card in value_cards if not hand & cards.BITS[card]), None)
+			if card is not None:
+				draws_needed += chance * self.after_draw(hand | cards.BITS[card], depth)
+		return draws_needed
+
+
+	def best_discard(self, hand, depth):
+		"""Returns (card, # of draws still needed) for the discard of `hand` that needs the fewest draws."""
+
+		best = None
+		for card in self.discards(hand):
+			draws_needed = self.before_draw(hand & ~cards.BITS[card], depth)
+			if best is None or draws_needed < best[1]:
+				best = (card, draws_needed)
+		return best
+
+
+
+
+def search_draws(lookahead, hand, tops, max_depth, result = (-1, None, {})):
+	"""Rates the draw of the hand `hand` from the main deck and from the discard pile with every card of `tops` on it,
+	searching 0, 1, 2... draws ahead until `lookahead` runs out of time or `max_depth` is done.
+	A `result` of an earlier search of `lookahead` goes on one draw deeper than it's depth.
+	Returns (depth, draws needed from the main deck, {top: draws needed}) of the deepest search that finished, depth -1 if none did."""
+
+	for depth in range(result[0] + 1, max_depth + 1):
+		try:
+			from_main_deck = lookahead.expected(hand, depth)
+			ratings = {top: lookahead.after_draw(hand | cards.BITS[top], depth) for top in tops}
+		except SearchTimeout:
+			break
+		result = (depth, from_main_deck, ratings)
+	return result
+
+
+def ponder_draws(hand, joker_val, live, tops, budget, max_depth):
+	"""`search_draws` for a new `Lookahead` of `budget` seconds (None for no deadline), run on an executor by `AnytimeComputer.ponder`.
+	Returns the result of `search_draws`, the `Lookahead` and the seconds it searched."""
+
+	start = time.perf_counter()
+	lookahead = Lookahead(joker_val, live, None if budget is None else start + budget)
+	return search_draws(lookahead, hand, tops, max_depth) + (lookahead, time.perf_counter() - start)
+
+
+
+
+class AnytimeComputer(computer.Computer):
+	"""Creates a computer that spends it's delay searching for it's moves (anytime iterative deepening)
+
+	Properties of an `AnytimeComputer` type object:
+	- Keeps it's cards exactly like `computer.Computer` and still discards a winning card as soon as it has one
+	- Chooses the draw and the discard that need the fewest draws to win on average (see `Lookahead`),
+	  drawing from the cards it hasn't seen (see `card_tracker.CardTracker`)
+	- Searches the draw 0, 1, 2... draws ahead and commits the answer of the deepest search that finished when the budget runs out,
+	  or the answer of `computer.Computer` if none did
+	- The draw search rates the discards after every card it can draw, so `get_card` (on the game loop) mostly reads them back
+	- The budget is the share of `delay` given by `difficulty` (see DIFFICULTY_BUDGETS), or `time_budget` seconds if it is set;
+	  it waits for the rest of the delay, so a turn takes as long at every difficulty
+	- Searches exactly `max_depth` draws ahead if it is set, however long it takes (reproducible)
+	- Can `ponder`: search it's next draw for every card that may be on the discard pile while the other seats move;
+	  the time it pondered counts towards it's delay, so it's turn is quicker, and it searches deeper on it's turn with it's own budget
+	"""
+
+	def __init__(self, computer_deck, card_joker, delay = COMPUTER_DELAY, difficulty = COMPUTER_DIFFICULTY, time_budget = None, max_depth = None, seat = COMPUTER_SEAT):
+		if difficulty not in DIFFICULTY_BUDGETS:
+			raise ValueError(f"Unknown difficulty {difficulty!r}, choose from {', '.join(DIFFICULTY_BUDGETS)}")
+
+		super().__init__(computer_deck, card_joker, delay, seat)
+		self.difficulty = difficulty
+		self.time_budget = time_budget
+		self.max_depth = max_depth
+
+		# the search of the last draw and the # of draws it looked ahead, for the discard
+		self.lookahead = None
+		self.depth = None
+		# the future of `ponder_draws` started at the end of the last turn
+		self.pondering = None
+
+
+	@property
+	def budget(self):
+		"""Seconds of search per turn."""
+
+		if self.time_budget is not None:
+			return self.time_budget
+		return self.delay * DIFFICULTY_BUDGETS[self.difficulty]
+
+
+	def ponder(self, executor):
+		"""Starts `ponder_draws` on `executor` for every card that another seat can discard next (the cards it hasn't seen or saw them take)."""
+
+		live = self.tracker.masks[card_tracker.LIVE]
+		tops = cards.from_mask(live | self.tracker.masks[card_tracker.OPPONENT])
+		budget = None if self.max_depth is not None else self.budget
+		self.pondering = executor.submit(ponder_draws, self.hand, self.joker_val, live, tops, budget, self.search_depth)
+
+
+	@property
+	def search_depth(self):
+		return self.max_depth if self.max_depth is not None else MAX_SEARCH_DEPTH
+
+
+	def make_move(self, dealer, discard_pile_card):
+		"""Makes a decision to choose a card from main deck or the discard pile, with the search pondered since the last turn if it rated the card.
+		Returns True if computer chooses a card from discard_pile."""
+
+		start = time.perf_counter()
+		tops = [] if discard_pile_card is None else [discard_pile_card]
+
+		result = None
+		pondering, self.pondering = self.pondering, None
+		if pondering is not None:
+			result = pondering.result()
+			if result[0] < 0 or any(top not in result[2] for top in tops):
+				result = None
+
+		deadline = None if self.max_depth is not None else start + self.budget
+		if result is None:
+			lookahead = Lookahead(self.joker_val, self.tracker.masks[card_tracker.LIVE], deadline)
+			result = search_draws(lookahead, self.hand, tops, self.search_depth) + (lookahead, 0)
+		elif result[0] < self.search_depth:
+			# the pondered search ran out of time before it's deepest search, so it goes on deeper until this turn's deadline
+			depth, from_main_deck, ratings, lookahead, pondered = result
+			lookahead.deadline = deadline
+			result = search_draws(lookahead, self.hand, tops, self.search_depth, (depth, from_main_deck, {top: ratings[top] for top in tops})) + (lookahead, pondered)
+
+		self.depth, from_main_deck, ratings, self.lookahead, pondered = result
+		from_discard = ratings.get(discard_pile_card)
+		if self.depth < 0:
+			self.lookahead = None
+			choose_from_discard = self.choose_draw(discard_pile_card)
+		else:
+			choose_from_discard = from_discard is not None and from_discard < from_main_deck
+		logger.info("In anytime.py/make_move: searched %d draws ahead (%d hands rated, %.2f seconds pondered), draws needed (discard pile, main deck): %s, choose_from_discard: %s", self.depth, self.lookahead.num_rated if self.lookahead else 0, pondered, (from_discard, from_main_deck), choose_from_discard)
+
+		rest = start + self.delay - pondered - time.perf_counter()
+		if rest > 0:
+			time.sleep(rest)
+		return choose_from_discard
+
+
+	def get_card(self, card):
+		"""Recieves a card from a `Dealer` object and returns the card whose discard needs the fewest draws to win."""
+
+		self.add_card_to_grps(card)
+		lookahead, self.lookahead = self.lookahead, None
+
+		winning_discard = melds.find_winning_discard(self.hand, self.joker_val)
+		if winning_discard is not None:
+			card = winning_discard[0]
+			self.remove_card(card)
+			logger.info("In anytime.py/get_card: computer returned %s to win, computer = %s", cards.name(card), self)
+			return card
+
+		if lookahead is None:
+			return self.discard_card()
+
+		# the draw search already rated these discards, atleast 1 draw ahead unless it ran out of time first
+		lookahead.deadline = None
+		card, draws_needed = lookahead.best_discard(self.hand, max(1, self.depth))
+		self.remove_card(card)
+		logger.info("In anytime.py/get_card: computer returned %s, draws needed: %.2f, computer = %s", cards.name(card), draws_needed, self)
+		return card
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,182 @@
+import logging
+import time
+from collections import OrderedDict, deque
+
+import pygame
+
+from game_constants import *
+
+
+
+CARD_SUITS = ["Diamonds","Hearts","Spades","Clubs"]
+CARD_BACKS = ["card_back", "card_back2", "card_back3"]
+BUTTON_NAMES = ["add_button", "check_button", "exit_game_button", "go_back_button", "remove_button",
+	"show_button", "start_button", "swap_button", "switch_music_button"]
+BACKGROUND_NAMES = ["game_bg", "start_menu_bg"]
+
+DEFAULT_SIZES = {
+	"cards": (CARD_WIDTH, CARD_HEIGHT),
+	"buttons": (BUTTON_WIDTH, BUTTON_HEIGHT),
+	"in_game": (DISPLAY_WIDTH, DISPLAY_HEIGHT),
+}
+
+MAX_VARIANT_BYTES = 32 * 1024 * 1024
+# seconds per frame that `AssetRegistry.warm_up_step` loads images for; a card takes about 1 ms, a background about 20 ms
+WARM_UP_BUDGET = 0.004
+
+
+
+class AssetRegistry:
+	"""Loads, scales and converts every image of the game once per process and hands out shared surfaces
+
+	Properties of a `AssetRegistry` type object:
+	- Keeps the images at the sizes used by the game (card faces, card backs, buttons, backgrounds) for the whole process
+	- Keeps images at any other size as variants, evicting the least recently used ones above `max_variant_bytes`
+	- Converts the surfaces to the display format once a display mode is set, so they blit faster
+	- Can load the images at their default sizes a few per frame on the main thread, while the game already shows the menu
+	- Resolves every font once per (name, size), since `pygame.font.SysFont` scans the system fonts
+	- The returned surfaces and fonts are shared and must not be drawn on
+	"""
+
+	def __init__(self, max_variant_bytes = MAX_VARIANT_BYTES):
+		self.max_variant_bytes = max_variant_bytes
+		self.surfaces = {}
+		self.variants = OrderedDict()
+		self.variant_bytes = 0
+		self.fonts = {}
+		self.warm_up_queue = deque()
+
+
+	def get(self, folder, file_name, size = None):
+		"""Returns the image game_icons/`folder`/`file_name` scaled to `size` (defaults to the size the game uses)."""
+
+		if size is None:
+			size = DEFAULT_SIZES[folder]
+		key = (folder, file_name, tuple(size))
+
+		surface = self.surfaces.get(key)
+		if surface is not None:
+			return surface
+
+		if tuple(size) == DEFAULT_SIZES[folder]:
+			surface = self.surfaces[key] = self.__load(folder, file_name, size)
+			return surface
+
+		surface = self.variants.get(key)
+		if surface is not None:
+			self.variants.move_to_end(key)
+			return surface
+
+		surface = self.variants[key] = self.__load(folder, file_name, size)
+		self.variant_bytes += self.__size_in_bytes(surface)
+		self.__evict_variants()
+		return surface
+
+
+	def card(self, suit, val, size = None):
+		"""Returns the face of the card `val`-of-`suit`."""
+
+		return self.get("cards", f"{val}-{suit.lower()}.jpg", size)
+
+
+	def card_back(self, name = "card_back", size = None):
+		return self.get("cards", f"{name}.png", size)
+
+
+	def button(self, name, size = None):
+		return self.get("buttons", f"{name}.png", size)
+
+
+	def background(self, name, size = None):
+		return self.get("in_game", f"{name}.jpg", size)
+
+
+	def font(self, name, size):
+		"""Returns the system font `name` of `size`, resolved once."""
+
+		key = (name, size)
+		font = self.fonts.get(key)
+		if font is None:
+			font = self.fonts[key] = pygame.font.SysFont(name, size)
+		return font
+
+
+	def start_warm_up(self):
+		"""Queues all the images the game uses at their default sizes for `warm_up_step`.
+		Images that the game asks for before they are loaded are loaded right away as usual."""
+
+		self.warm_up_queue = deque((self.card, (suit, val)) for suit in CARD_SUITS for val in range(1, NUM_CARDS_WITH_PLAYER+1))
+		self.warm_up_queue.append((self.card, ("Joker", 0)))
+		self.warm_up_queue.extend((self.card_back, (name,)) for name in CARD_BACKS)
+		self.warm_up_queue.extend((self.button, (name,)) for name in BUTTON_NAMES)
+		self.warm_up_queue.extend((self.background, (name,)) for name in BACKGROUND_NAMES)
+
+
+	def warm_up_step(self, budget = WARM_UP_BUDGET):
+		"""Loads the images queued by `start_warm_up` for about `budget` seconds (atleast one image), to run between two frames.
+		Returns True while images are still queued."""
+
+		deadline = time.perf_counter() + budget
+		while self.warm_up_queue:
+			load, args = self.warm_up_queue.popleft()
+			load(*args)
+			if not self.warm_up_queue:
+				logger.info(f"In assets.py/warm_up_step: {len(self.surfaces)} images loaded")
+			elif time.perf_counter() > deadline:
+				break
+		return len(self.warm_up_queue) > 0
+
+
+	def warm_up(self):
+		"""Loads all the images the game uses at their default sizes at once.
+		Call it after the display mode is set so that the surfaces are converted to the display format."""
+
+		self.start_warm_up()
+		self.warm_up_step(budget = float("inf"))
+
+
+	def clear(self):
+		"""Drops all the cached surfaces, e.g. after the display mode changes."""
+
+		self.surfaces.clear()
+		self.variants.clear()
+		self.variant_bytes = 0
+		self.fonts.clear()
+
+
+	def __load(self, folder, file_name, size):
+		"""Loads, scales and converts a single image."""
+
+		surface = pygame.transform.scale(pygame.image.load(f"game_icons/{folder}/{file_name}"), size)
+
+		if pygame.display.get_surface() is not None:
+			if file_name.endswith(".png"):
+				surface = surface.convert_alpha()
+			else:
+				surface = surface.convert()
+		return surface
+
+
+	def __size_in_bytes(self, surface):
+		return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+	def __evict_variants(self):
+		"""Drops the least recently used variants until they fit in self.max_variant_bytes."""
+
+		while self.variant_bytes > self.max_variant_bytes and len(self.variants) > 1:
+			key, surface = self.variants.popitem(last = False)
+			self.variant_bytes -= self.__size_in_bytes(surface)
+			logger.info(f"In assets.py/__evict_variants: evicted {key}")
+
+
+
+
+registry = AssetRegistry()
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
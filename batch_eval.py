@@ -0,0 +1,320 @@
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from game_constants import *
+import cards
+import melds
+
+
+
+# (pure life, other slots, drops) weights of the automata whose bounds are combined by `evaluate`
+WEIGHTS = ((1, 1, 1), (1, 1, 2), (2, 2, 1))
+# open runs (other than the pure and the second life) that an arrangement keeps at once
+MAX_OPEN_RUNS = 3
+# steps of the pure life and the second life: 0 is not started, DONE is complete and no longer needs cards
+PURE_DONE = melds.MIN_GROUP_SIZE
+SECOND_DONE = melds.MIN_SECOND_LIFE_SIZE
+# symbols read by the automata: the # of natural cards of a value (0 to 4), or JOKER_SYMBOL at the joker value
+JOKER_SYMBOL = melds.MAX_SET_SIZE + 1
+NUM_SYMBOLS = JOKER_SYMBOL + 1
+INF_COST = 99
+CHUNK_SIZE = 1 << 18
+VALUE_BITS = np.array([1 << (val - 1) for val in range(1, cards.NUM_VALUES+1)], dtype = np.uint16)
+
+
+
+def _structures():
+	"""Returns every (pure life step, second life step, runs of 1, runs of 2, runs of atleast 3) that an arrangement can be in between two values."""
+
+	structures = []
+	for pure in range(PURE_DONE + 1):
+		for second in range(SECOND_DONE + 1):
+			for runs_1 in range(MAX_OPEN_RUNS + 1):
+				for runs_2 in range(MAX_OPEN_RUNS + 1 - runs_1):
+					for runs_3 in range(MAX_OPEN_RUNS + 1 - runs_1 - runs_2):
+						structures.append((pure, second, runs_1, runs_2, runs_3))
+	return structures
+
+
+STRUCTURES = _structures()
+STRUCTURE_INDEX = {structure: i for i, structure in enumerate(STRUCTURES)}
+START_STRUCTURE = STRUCTURE_INDEX[(0, 0, 0, 0, 0)]
+FINAL_STRUCTURES = [i for i, (pure, second, runs_1, runs_2, runs_3) in enumerate(STRUCTURES) if pure == PURE_DONE and second == SECOND_DONE and runs_1 == runs_2 == 0]
+
+
+
+class MeldAutomaton:
+	"""Reads the value counts of hands from the lowest value to the highest and bounds the cost of their best arrangement
+
+	Properties of a `MeldAutomaton` type object:
+	- An arrangement is a pure life, a second life of atleast 4 cards, other lives and sets of 3 or 4 cards
+	- Every slot of the pure life without a card costs `pure_weight` (a joker can't fill it), every other empty slot `slot_weight`
+	  and every card left out `drop_weight`
+	- A state is the least cost of every structure (see STRUCTURES) after the values read so far, less the smallest of them
+	- States are numbered as they are first reached, so self.next[state * NUM_SYMBOLS + symbol] is -1 until it is needed
+	- Runs are only bounded by MAX_OPEN_RUNS, so the cost is never above the cost of the best arrangement
+	"""
+
+	def __init__(self, weights):
+		self.weights = weights
+		self.pure_weight, self.slot_weight, self.drop_weight = weights
+
+		# edges (source structure, target structure, cost) of every symbol, sorted by target for np.minimum.reduceat
+		self.edges = []
+		for symbol in range(NUM_SYMBOLS):
+			costs = {}
+			for source, structure in enumerate(STRUCTURES):
+				for target, cost in self.__transitions(structure, symbol):
+					if cost < costs.get((target, source), INF_COST):
+						costs[(target, source)] = cost
+			keys = sorted(costs)
+			targets = np.array([target for target, source in keys], dtype = np.intp)
+			sources = np.array([source for target, source in keys], dtype = np.intp)
+			edge_costs = np.array([costs[key] for key in keys], dtype = np.int16)
+			reached, starts = np.unique(targets, return_index = True)
+			self.edges.append((sources, edge_costs, reached, starts))
+
+		self.num_states = 0
+		self.state_ids = {}
+		self.states = np.zeros((1024, len(STRUCTURES)), dtype = np.int8)
+		self.final_costs = np.zeros(1024, dtype = np.int16)
+		self.next = np.full(1024 * NUM_SYMBOLS, -1, dtype = np.int32)
+		self.offsets = np.zeros(1024 * NUM_SYMBOLS, dtype = np.int16)
+
+		start = np.full((1, len(STRUCTURES)), INF_COST, dtype = np.int16)
+		start[0, START_STRUCTURE] = 0
+		self.start = self.__state_ids(start)[0]
+
+
+	def __transitions(self, structure, symbol):
+		"""Yields (next structure, cost) for every way of using the cards of one value, read as `symbol`, in `structure`."""
+
+		pure, second, runs_1, runs_2, runs_3 = structure
+		count = 0 if symbol == JOKER_SYMBOL else symbol
+
+		# (next step, slot taken at this value) of the pure life and of the second life
+		if pure == PURE_DONE:
+			pure_moves = [(PURE_DONE, 0)]
+		elif symbol == JOKER_SYMBOL:
+			pure_moves = [(0, 0)] if pure == 0 else []
+		else:
+			pure_moves = [(pure + 1, 1)] + ([(0, 0)] if pure == 0 else [])
+		if second == SECOND_DONE:
+			second_moves = [(SECOND_DONE, 0)]
+		else:
+			second_moves = [(second + 1, 1)] + ([(0, 0)] if second == 0 else [])
+		set_sizes = (0, melds.MIN_GROUP_SIZE, melds.MAX_SET_SIZE) if count else (0,)
+
+		for next_pure, pure_slot in pure_moves:
+			for next_second, second_slot in second_moves:
+				# a life that reaches it's least size can go on like any other long run
+				grown = (pure == PURE_DONE - 1 and pure_slot) + (second == SECOND_DONE - 1 and second_slot)
+				for continued in range(runs_3 + 1):
+					for started in range(MAX_OPEN_RUNS + 1 - runs_1 - runs_2 - continued - grown):
+						for set_size in set_sizes:
+							slots = pure_slot + second_slot + runs_1 + runs_2 + continued + started + set_size
+							used = min(count, slots)
+							pure_used = min(used, pure_slot)
+							cost = self.pure_weight * (pure_slot - pure_used) + self.slot_weight * (slots - pure_slot - used + pure_used) + self.drop_weight * (count - used)
+							yield STRUCTURE_INDEX[(next_pure, next_second, started, runs_1, runs_2 + continued + grown)], cost
+
+
+	def __state_ids(self, costs):
+		"""Returns the ids of the states with the cost rows `costs` (already less their smallest cost), numbering the new ones."""
+
+		costs = np.minimum(costs, INF_COST).astype(np.int8)
+		ids = np.empty(len(costs), dtype = np.int32)
+		for i, row in enumerate(costs):
+			key = row.tobytes()
+			state = self.state_ids.get(key)
+			if state is None:
+				state = self.state_ids[key] = self.num_states
+				self.num_states += 1
+				if state == len(self.states):
+					self.__grow()
+				self.states[state] = row
+				self.final_costs[state] = row[FINAL_STRUCTURES].min()
+			ids[i] = state
+		return ids
+
+
+	def __grow(self):
+		size = 2 * len(self.states)
+		self.states = np.concatenate((self.states, np.zeros_like(self.states)))
+		self.final_costs = np.concatenate((self.final_costs, np.zeros_like(self.final_costs)))
+		self.next = np.concatenate((self.next, np.full(size * NUM_SYMBOLS - len(self.next), -1, dtype = np.int32)))
+		self.offsets = np.concatenate((self.offsets, np.zeros(size * NUM_SYMBOLS - len(self.offsets), dtype = np.int16)))
+
+
+	def __expand(self, transitions):
+		"""Fills self.next and self.offsets for the (state * NUM_SYMBOLS + symbol) in `transitions`."""
+
+		transitions = np.unique(transitions)
+		for symbol in range(NUM_SYMBOLS):
+			keys = transitions[transitions % NUM_SYMBOLS == symbol]
+			if not len(keys):
+				continue
+			sources, edge_costs, reached, starts = self.edges[symbol]
+			costs = np.full((len(keys), len(STRUCTURES)), INF_COST, dtype = np.int16)
+			costs[:, reached] = np.minimum.reduceat(self.states[keys // NUM_SYMBOLS][:, sources].astype(np.int16) + edge_costs, starts, axis = 1)
+			np.minimum(costs, INF_COST, out = costs)
+			smallest = costs.min(axis = 1)
+			costs = np.where(costs < INF_COST, costs - smallest[:, None], INF_COST)
+			next_ids = self.__state_ids(costs)
+			self.next[keys] = next_ids
+			self.offsets[keys] = smallest
+		logger.info("In batch_eval.py/expand: automaton %s has %d states", self.weights, self.num_states)
+
+
+	def min_costs(self, symbols):
+		"""Returns the least cost of an arrangement for every column of `symbols` (13, N): the symbols of the values 1 to 13."""
+
+		states = np.full(symbols.shape[1], self.start, dtype = np.int32)
+		total = np.zeros(symbols.shape[1], dtype = np.int16)
+		for val in range(cards.NUM_VALUES):
+			transitions = states * NUM_SYMBOLS + symbols[val]
+			next_states = self.next[transitions]
+			unknown = next_states < 0
+			if unknown.any():
+				self.__expand(transitions[unknown])
+				next_states = self.next[transitions]
+			total += self.offsets[transitions]
+			states = next_states
+		return total + self.final_costs[states]
+
+
+
+
+_automata = {}
+
+
+def get_automaton(weights):
+	"""Returns the `MeldAutomaton` for `weights`, keeping it (and the states it reaches) for the whole process."""
+
+	automaton = _automata.get(weights)
+	if automaton is None:
+		automaton = _automata[weights] = MeldAutomaton(weights)
+	return automaton
+
+
+_completions = None
+
+
+def completions():
+	"""Returns the `melds.MeldIndex.completions` of every joker value as a (14, 8192) array."""
+
+	global _completions
+	if _completions is None:
+		_completions = np.zeros((cards.NUM_VALUES + 1, 1 << cards.NUM_VALUES), dtype = np.uint16)
+		for joker_val in range(1, cards.NUM_VALUES + 1):
+			_completions[joker_val] = melds.get_meld_index(joker_val).completions
+	return _completions
+
+
+def _value_masks(has_values):
+	"""Returns the 13-bit value masks of the rows of `has_values` ((N, 13) bool array)."""
+
+	return (has_values.astype(np.uint16) @ VALUE_BITS).astype(np.intp)
+
+
+def from_masks(masks):
+	"""Returns the hand masks `masks` of cards of the first deck (see `cards`) as an (N, 53) bool array."""
+
+	masks = np.asarray(masks, dtype = np.uint64)
+	return (masks[:, None] >> np.arange(cards.CARDS_PER_DECK, dtype = np.uint64) & 1).astype(bool)
+
+
+def deal(num_hands, seed = None):
+	"""Deals `num_hands` opening hands like `engine.RoundEngine.initialize_distribute_cards`: a card joker, then 13 cards
+	of the rest of the deck with the extra joker. Returns the hands as an (N, 53) bool array and the joker values."""
+
+	rng = np.random.default_rng(seed)
+	rows = np.arange(num_hands)[:, None]
+	card_jokers = rng.integers(0, cards.JOKER, num_hands)
+
+	keys = rng.random((num_hands, cards.CARDS_PER_DECK))
+	keys[rows[:, 0], card_jokers] = 2.0
+	hands = np.zeros((num_hands, cards.CARDS_PER_DECK), dtype = bool)
+	hands[rows, np.argpartition(keys, NUM_CARDS_WITH_PLAYER - 1, axis = 1)[:, :NUM_CARDS_WITH_PLAYER]] = True
+	return hands, card_jokers % cards.NUM_VALUES + 1
+
+
+def evaluate(hands, joker_vals, num_discards = 0):
+	"""Evaluates every row of `hands` ((N, 53) bool array) in a round whose card joker has the value in `joker_vals`.
+	Returns a dict of (N,) arrays:
+	- jokers: the # of jokers
+	- needed: the value mask of the values that complete a life or a set of 3 with 2 cards (like `computer.Computer.make_move`)
+	- pure_life: whether the hand already has a pure life
+	- cards_to_win: a lower bound of the distance of `melds.arrange` with `num_discards`, equal to it for ~99% of the hands"""
+
+	hands = np.asarray(hands, dtype = bool)
+	joker_vals = np.asarray(joker_vals, dtype = np.intp)
+	rows = np.arange(len(hands))
+
+	# the # of cards of every value, adding up the suits
+	suits = hands.view(np.uint8)
+	counts = sum(suits[:, i:i+cards.NUM_VALUES] for i in range(0, cards.JOKER, cards.NUM_VALUES))
+	jokers = hands[:, cards.JOKER] + counts[rows, joker_vals - 1]
+	counts[rows, joker_vals - 1] = 0
+
+	values = _value_masks(counts > 0)
+	needed = completions()[joker_vals, values] | _value_masks(counts >= 2)
+	pure_life = (values & values >> 1 & values >> 2) != 0
+
+	# one contiguous row of symbols per value
+	symbols = counts.T.astype(np.int32)
+	symbols[joker_vals - 1, rows] = JOKER_SYMBOL
+	cards_to_win = np.zeros(len(hands), dtype = np.int16)
+	for weights in WEIGHTS:
+		pure_weight, slot_weight, drop_weight = weights
+		excess = get_automaton(weights).min_costs(symbols) - slot_weight * jokers - drop_weight * num_discards
+		np.maximum(cards_to_win, -(-excess // (pure_weight + drop_weight)), out = cards_to_win)
+
+	return {"jokers": jokers, "needed": needed.astype(np.uint16), "pure_life": pure_life, "cards_to_win": cards_to_win}
+
+
+def summarize(results):
+	"""Returns the histograms of the results of `evaluate`: the # of hands by cards to win, by # of jokers,
+	by # of needed values and needing every value (1 to 13), and the share of hands with a pure life."""
+
+	needed = results["needed"].astype(np.int64)
+	needed_values = (needed[:, None] >> np.arange(cards.NUM_VALUES)) & 1
+	return {
+		"hands": len(needed),
+		"cards_to_win": np.bincount(results["cards_to_win"]).tolist(),
+		"jokers": np.bincount(results["jokers"]).tolist(),
+		"num_needed": np.bincount(needed_values.sum(axis = 1)).tolist(),
+		"needed_by_value": needed_values.sum(axis = 0).tolist(),
+		"pure_life": float(results["pure_life"].mean()) if len(needed) else 0.0,
+	}
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Deals and evaluates many opening hands at once.")
+	parser.add_argument("--hands", type = int, default = 1000000)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--discards", type = int, default = 0, help = "cards that can still be discarded (1 for a hand after a draw)")
+	args = parser.parse_args()
+
+	hands, joker_vals = deal(args.hands, args.seed)
+	for run in ("cold", "warm"):
+		start = time.perf_counter()
+		chunks = [evaluate(hands[i:i+CHUNK_SIZE], joker_vals[i:i+CHUNK_SIZE], args.discards) for i in range(0, args.hands, CHUNK_SIZE)]
+		seconds = time.perf_counter() - start
+		print(f"{run}: evaluated {args.hands} hands in {seconds:.2f}s ({args.hands / seconds:.0f} hands/s)")
+
+	summary = summarize({key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]})
+	print(f"pure life: {summary['pure_life']:.1%}")
+	for key in ("cards_to_win", "jokers", "num_needed"):
+		print(f"{key:13}" + " ".join(f"{i}:{num}" for i, num in enumerate(summary[key]) if num))
+	print(f"{'needed value':13}" + " ".join(f"{val}:{num}" for val, num in enumerate(summary["needed_by_value"], 1)))
+else:
+	logger = logging.getLogger('logger.main')
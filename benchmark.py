@@ -0,0 +1,380 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+
+from game_constants import *
+import anytime
+import cards
+import computer
+import engine
+import melds
+import player
+
+
+
+BENCHMARK_VERSION = 1
+DEFAULT_THRESHOLD = 0.2
+
+
+
+def random_hand(rng, size = NUM_CARDS_WITH_PLAYER):
+	"""Returns a card joker and `size` other cards (ids) dealt from a shuffled deck."""
+
+	deck = list(range(cards.CARDS_PER_DECK))
+	rng.shuffle(deck)
+	card_joker = next(card for card in deck if card != cards.JOKER)
+	deck.remove(card_joker)
+	return card_joker, deck[:size], deck[size:]
+
+
+def bench_computer_build_groups(rng, scale):
+	hands = [random_hand(rng) for i in range(500 * scale)]
+
+	start = time.perf_counter()
+	for card_joker, hand, rest in hands:
+		computer.Computer(hand, card_joker, 0)
+	return len(hands), time.perf_counter() - start
+
+
+def bench_computer_get_card(rng, scale):
+	computers = []
+	for i in range(500 * scale):
+		card_joker, hand, rest = random_hand(rng)
+		computers.append((computer.Computer(hand, card_joker, 0), rest))
+
+	start = time.perf_counter()
+	num_ops = 0
+	for comp, rest in computers:
+		for card in rest[:4]:
+			comp.get_card(card)
+			num_ops += 1
+	return num_ops, time.perf_counter() - start
+
+
+def bench_computer_did_computer_win(rng, scale):
+	computers = []
+	for i in range(2000 * scale):
+		card_joker, hand, rest = random_hand(rng)
+		computers.append(computer.Computer(hand, card_joker, 0))
+
+	start = time.perf_counter()
+	for comp in computers:
+		comp.did_computer_win()
+	return len(computers), time.perf_counter() - start
+
+
+def bench_computer_make_move(rng, scale):
+	moves = []
+	for i in range(2000 * scale):
+		card_joker, hand, rest = random_hand(rng)
+		moves.append((computer.Computer(hand, card_joker, 0), rest[0]))
+
+	start = time.perf_counter()
+	for comp, discard_pile_card in moves:
+		comp.make_move(None, discard_pile_card)
+	return len(moves), time.perf_counter() - start
+
+
+def bench_anytime_turn(rng, scale):
+	"""A draw and a discard of the anytime computer searching 1 draw ahead."""
+
+	turns = []
+	for i in range(10 * scale):
+		card_joker, hand, rest = random_hand(rng)
+		turns.append((anytime.AnytimeComputer(hand, card_joker, 0, max_depth = 1), rest[0], rest[1]))
+
+	start = time.perf_counter()
+	for comp, discard_pile_card, card in turns:
+		comp.get_card(discard_pile_card if comp.make_move(None, discard_pile_card) else card)
+	return len(turns), time.perf_counter() - start
+
+
+def make_players(rng, num_players, valid):
+	"""Builds players with 3 selected cards, which form a set if `valid` and no group otherwise."""
+
+	players = []
+	while len(players) < num_players:
+		card_joker, hand, rest = random_hand(rng)
+		joker_val = cards.VALUES[card_joker]
+		naturals = [card for card in hand if not cards.is_joker(card, joker_val)]
+
+		if valid:
+			by_value = {}
+			for card in naturals:
+				by_value.setdefault(cards.VALUES[card], []).append(card)
+			selected = next((grp[:3] for grp in by_value.values() if len(grp) >= 3), None)
+		else:
+			selected = naturals[:3]
+			if cards.is_set(cards.to_mask(selected)) or cards.is_run(cards.to_mask(selected)):
+				selected = None
+		if selected is None:
+			continue
+
+		deck = [engine.Card(cards.suit(card), cards.VALUES[card]) for card in hand]
+		for card in deck:
+			card.clicked = card.id in selected
+		players.append(player.Player(deck, engine.Card(cards.suit(card_joker), joker_val)))
+	return players
+
+
+def bench_player_check_group_valid(rng, scale):
+	players = make_players(rng, 1000 * scale, True)
+
+	start = time.perf_counter()
+	for cur_player in players:
+		cur_player.check_group()
+	return len(players), time.perf_counter() - start
+
+
+def bench_player_check_group_invalid(rng, scale):
+	players = make_players(rng, 1000 * scale, False)
+
+	start = time.perf_counter()
+	for cur_player in players:
+		cur_player.check_group()
+	return len(players), time.perf_counter() - start
+
+
+def bench_player_hint(rng, scale):
+	"""The hint of a player right after a draw, with a cold cache."""
+
+	hands = [random_hand(rng) for i in range(500 * scale)]
+
+	start = time.perf_counter()
+	for card_joker, hand, rest in hands:
+		melds.clear_cache()
+		melds.arrange(cards.to_mask(hand[:NUM_CARDS_WITH_PLAYER] + rest[:1]), cards.VALUES[card_joker], num_discards = 1)
+	return len(hands), time.perf_counter() - start
+
+
+def bench_deal(rng, scale):
+	round_engine = engine.RoundEngine(rng.getrandbits(32))
+	num_deals = 2000 * scale
+
+	start = time.perf_counter()
+	for i in range(num_deals):
+		round_engine.initialize_distribute_cards()
+	return num_deals, time.perf_counter() - start
+
+
+def bench_deck_fork(rng, scale):
+	"""Forks the deck of a round and draws from the fork until it needs a reshuffle, like a search exploring a line of play."""
+
+	round_engine = engine.RoundEngine(rng.getrandbits(32))
+	num_forks = 20000 * scale
+
+	start = time.perf_counter()
+	for i in range(num_forks):
+		deck = round_engine.deck.fork()
+		while not deck.needs_reshuffle():
+			deck.discard_card(deck.draw_main())
+	return num_forks, time.perf_counter() - start
+
+
+def bench_round_fork(rng, scale):
+	"""Forks a round in the middle of the game, like a search branching on hypothetical futures."""
+
+	round_engine = engine.RoundEngine(rng.getrandbits(32))
+	policy = engine.MirrorPolicy(round_engine)
+	round_engine.player_discard(round_engine.player_draw(policy.choose_draw(round_engine)))
+	round_engine.computer_turn()
+	num_forks = 2000 * scale
+
+	start = time.perf_counter()
+	for i in range(num_forks):
+		round_engine.fork()
+	return num_forks, time.perf_counter() - start
+
+
+def bench_headless_round(rng, scale):
+	seed = rng.getrandbits(32)
+	num_rounds = 100 * scale
+
+	start = time.perf_counter()
+	for i in range(num_rounds):
+		round_engine = engine.RoundEngine(seed + i)
+		round_engine.play(engine.MirrorPolicy(round_engine))
+	return num_rounds, time.perf_counter() - start
+
+
+def bench_batch_evaluate(rng, scale):
+	"""Evaluates opening hands in one call, with the tables of the automata already built by a first call."""
+
+	import batch_eval
+
+	hands, joker_vals = batch_eval.deal(100000 * scale, rng.getrandbits(32))
+	batch_eval.evaluate(hands, joker_vals)
+
+	start = time.perf_counter()
+	batch_eval.evaluate(hands, joker_vals)
+	return len(hands), time.perf_counter() - start
+
+
+def make_display_round(seed):
+	"""Builds a `main.Round` on SDL's dummy video driver, with the globals that `main` sets up when it is run."""
+
+	os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+	os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+	import pygame
+	import assets
+	import main
+	import renderer
+
+	pygame.init()
+	main.logger = logger
+	main.screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
+	main.myfont = assets.registry.font("monospace", FONT_SIZE)
+	main.text_cache = renderer.TextCache()
+	assets.registry.warm_up()
+
+	cur_round = main.Round(INITIAL_PLAYER_POINTS, INITIAL_COMPUTER_POINTS, seed, computer_delay = 0)
+	cur_round.running = True
+	return cur_round, pygame
+
+
+def bench_display_frame(rng, scale):
+	"""One frame of the round screen (events, drawing and the display update) when a card is clicked every 10 frames."""
+
+	cur_round, pygame = make_display_round(rng.getrandbits(32))
+	num_frames = 300 * scale
+
+	start = time.perf_counter()
+	for i in range(num_frames):
+		if i % 10 == 0:
+			card = cur_round.player.player_deck[i // 10 % len(cur_round.player.player_deck)]
+			card.clicked = not card.clicked
+		cur_round.game_logic()
+		pygame.display.update(cur_round.dirty_rects)
+	return num_frames, time.perf_counter() - start
+
+
+def bench_display_full_frame(rng, scale):
+	"""One frame of the round screen drawn from scratch."""
+
+	cur_round, pygame = make_display_round(rng.getrandbits(32))
+	num_frames = 100 * scale
+
+	start = time.perf_counter()
+	for i in range(num_frames):
+		cur_round.renderer.invalidate()
+		cur_round.game_logic()
+		pygame.display.update(cur_round.dirty_rects)
+	return num_frames, time.perf_counter() - start
+
+
+
+
+BENCHMARKS = {
+	"computer_build_groups": bench_computer_build_groups,
+	"computer_get_card": bench_computer_get_card,
+	"computer_did_computer_win": bench_computer_did_computer_win,
+	"computer_make_move": bench_computer_make_move,
+	"anytime_turn": bench_anytime_turn,
+	"player_check_group_valid": bench_player_check_group_valid,
+	"player_check_group_invalid": bench_player_check_group_invalid,
+	"player_hint": bench_player_hint,
+	"deal": bench_deal,
+	"deck_fork": bench_deck_fork,
+	"round_fork": bench_round_fork,
+	"headless_round": bench_headless_round,
+	"batch_evaluate": bench_batch_evaluate,
+	"display_frame": bench_display_frame,
+	"display_full_frame": bench_display_full_frame,
+}
+
+
+
+def run_benchmarks(names = None, seed = 0, repeat = 3, scale = 1):
+	"""Runs the benchmarks `names` (all by default) `repeat` times on workloads dealt with `seed`, keeping the fastest run.
+	Returns a dict with the environment and the results (µs per operation and operations per second) of every benchmark."""
+
+	results = {}
+	for name in names or BENCHMARKS:
+		best = None
+		for i in range(repeat):
+			# every run starts cold, with the same workload
+			melds.clear_cache()
+			try:
+				num_ops, seconds = BENCHMARKS[name](random.Random(seed), scale)
+			except ImportError as error:
+				logger.warning(f"In benchmark.py/run_benchmarks: skipping {name}: {error}")
+				break
+			if best is None or seconds < best[1]:
+				best = (num_ops, seconds)
+
+		if best is None:
+			continue
+		num_ops, seconds = best
+		results[name] = {"ops": num_ops, "seconds": seconds, "us_per_op": 1e6 * seconds / num_ops, "ops_per_second": num_ops / seconds}
+
+	return {
+		"version": BENCHMARK_VERSION,
+		"seed": seed,
+		"scale": scale,
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"results": results,
+	}
+
+
+def compare(report, baseline):
+	"""Compares the µs per operation of `report` with `baseline`.
+	Returns a list of (name, baseline µs, current µs, change), where a positive change is a slowdown."""
+
+	comparison = []
+	for name, result in report["results"].items():
+		base = baseline["results"].get(name)
+		if base is None:
+			continue
+		change = result["us_per_op"] / base["us_per_op"] - 1
+		comparison.append((name, base["us_per_op"], result["us_per_op"], change))
+	return comparison
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Times fixed-seed workloads of the game and compares them with a saved baseline.")
+	parser.add_argument("names", nargs = "*", help = f"benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--repeat", type = int, default = 3, help = "runs per benchmark, the fastest is kept")
+	parser.add_argument("--scale", type = int, default = 1, help = "multiplies the size of every workload")
+	parser.add_argument("--json", help = "write the results to this file (e.g. to save a baseline)")
+	parser.add_argument("--baseline", help = "compare with the results saved in this file")
+	parser.add_argument("--threshold", type = float, default = DEFAULT_THRESHOLD, help = "slowdown that counts as a regression (0.2 = 20%%)")
+	args = parser.parse_args()
+
+	for name in args.names:
+		if name not in BENCHMARKS:
+			parser.error(f"unknown benchmark {name!r}")
+
+	report = run_benchmarks(args.names, args.seed, args.repeat, args.scale)
+
+	for name, result in report["results"].items():
+		print(f"{name:28} {result['us_per_op']:12.2f} us/op {result['ops_per_second']:12.0f} ops/s")
+
+	if args.json:
+		with open(args.json, "w") as json_file:
+			json.dump(report, json_file, indent = 2)
+
+	if args.baseline:
+		with open(args.baseline) as baseline_file:
+			baseline = json.load(baseline_file)
+
+		regressions = 0
+		print(f"\ncompared with {args.baseline}:")
+		for name, base_us, cur_us, change in compare(report, baseline):
+			flag = "SLOWER" if change > args.threshold else ""
+			regressions += change > args.threshold
+			print(f"{name:28} {base_us:12.2f} -> {cur_us:12.2f} us/op {100 * change:+7.1f}% {flag}")
+		sys.exit(1 if regressions else 0)
+else:
+	logger = logging.getLogger('logger.main')
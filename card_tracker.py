@@ -0,0 +1,182 @@
+import logging
+from array import array
+
+from game_constants import *
+import cards
+
+
+
+# what a seat knows about a card
+LIVE = 0		# not seen yet: in the main deck or hidden in an opponent's hand
+OWN = 1			# in the seat's own hand
+OPPONENT = 2	# picked from the discard pile by an opponent and not discarded since
+DISCARD_TOP = 3	# on top of the discard pile
+BURIED = 4		# in the discard pile, under the top
+OUT = 5			# the card joker, or a card of a deck that the round doesn't use
+NUM_STATES = 6
+
+# # of cards of every value in the first deck and in the other decks
+_FIRST_DECK_COUNTS = array("b", [cards.count_value(cards.DECK_MASKS[0], val) for val in range(cards.NUM_VALUES+1)])
+_OTHER_DECKS_COUNTS = array("b", [cards.count_value(cards.FULL_MASK & ~cards.DECK_MASKS[0], val) for val in range(cards.NUM_VALUES+1)])
+
+
+
+class CardTracker:
+	"""Keeps track of every card that a seat has seen
+
+	Properties of a `CardTracker` type object:
+	- Keeps the state (LIVE, OWN, OPPONENT, DISCARD_TOP, BURIED, OUT) of every card in a fixed size array
+	- Keeps the # of cards of every value in every state, and a mask of the cards in every state
+	- Knows how many decks the round is dealt from (see `use_decks`)
+	- Keeps the order of the discard pile, the # of hidden cards in every opponent's hand and the cards every opponent took from the discard pile
+	- Is updated by the `Dealer` on every draw, discard and reshuffle, with O(1) work per card
+	- Can be saved with `snapshot` and brought back with `restore`
+	"""
+
+	def __init__(self, seat, own_cards, card_joker):
+		self.seat = seat
+
+		self.card_joker = card_joker
+
+		# only the cards of the first deck are in the game until `use_decks` says otherwise
+		self.num_decks = 1
+		self.states = array("b", [LIVE]) * cards.CARDS_PER_DECK + array("b", [OUT]) * (cards.NUM_CARDS - cards.CARDS_PER_DECK)
+		self.value_counts = [array("b", [0]) * (cards.NUM_VALUES+1) for state in range(NUM_STATES)]
+		self.value_counts[LIVE] = array("b", _FIRST_DECK_COUNTS)
+		self.value_counts[OUT] = array("b", _OTHER_DECKS_COUNTS)
+		self.masks = [0] * NUM_STATES
+		self.masks[LIVE] = cards.DECK_MASKS[0]
+		self.masks[OUT] = cards.FULL_MASK & ~cards.DECK_MASKS[0]
+
+		self.discard_pile = []
+		self.hidden_counts = {}
+		# masks of the cards (in the OPPONENT state) that every opponent took
+		self.held = {}
+
+		self.set_state(card_joker, OUT)
+		for card in own_cards:
+			self.set_state(card, OWN)
+
+
+	def set_state(self, card, state):
+		old_state = self.states[card]
+		val = cards.VALUES[card]
+
+		self.states[card] = state
+		self.value_counts[old_state][val] -= 1
+		self.value_counts[state][val] += 1
+		self.masks[old_state] &= ~cards.BITS[card]
+		self.masks[state] |= cards.BITS[card]
+
+
+	def snapshot(self):
+		"""Returns the state of the tracker as plain lists, see `restore`."""
+
+		return {"num_decks": self.num_decks, "states": self.states.tolist(), "discard_pile": list(self.discard_pile), "hidden_counts": sorted(self.hidden_counts.items()), "held": sorted(self.held.items())}
+
+
+	def restore(self, state):
+		"""Goes back to a state returned by `snapshot`. The counts and masks are rebuilt from the states."""
+
+		self.num_decks = state["num_decks"]
+		self.states = array("b", state["states"])
+		self.masks = [0] * NUM_STATES
+		for card, card_state in enumerate(self.states):
+			self.masks[card_state] |= cards.BITS[card]
+		self.value_counts = [array("b", [cards.count_value(mask, val) for val in range(cards.NUM_VALUES+1)]) for mask in self.masks]
+
+		self.discard_pile = list(state["discard_pile"])
+		self.hidden_counts = {seat: count for seat, count in state["hidden_counts"]}
+		self.held = {seat: mask for seat, mask in state["held"]}
+
+
+	def use_decks(self, num_decks):
+		"""The round is dealt from `num_decks` decks: the cards of the other decks, that the seat hasn't seen, are live too."""
+
+		for card in range(self.num_decks * cards.CARDS_PER_DECK, num_decks * cards.CARDS_PER_DECK):
+			if self.states[card] == OUT and card != self.card_joker:
+				self.set_state(card, LIVE)
+		self.num_decks = num_decks
+
+
+	def hidden_count(self, seat):
+		"""Returns the # of cards in the hand of `seat` that this seat hasn't seen."""
+
+		return self.hidden_counts.get(seat, NUM_CARDS_WITH_PLAYER)
+
+
+	def turned_up(self, card):
+		"""The dealer turned `card` up to start the discard pile."""
+
+		self.discarded(None, card)
+
+
+	def drew_main(self, seat, card):
+		"""`seat` drew `card` from the main deck. Only the seat itself sees the card."""
+
+		if seat == self.seat:
+			self.set_state(card, OWN)
+		else:
+			self.hidden_counts[seat] = self.hidden_count(seat) + 1
+
+
+	def took_discard(self, seat, card):
+		"""`seat` took `card` from the top of the discard pile."""
+
+		self.discard_pile.pop()
+		self.set_state(card, OWN if seat == self.seat else OPPONENT)
+		if seat != self.seat:
+			self.held[seat] = self.held.get(seat, 0) | cards.BITS[card]
+		if len(self.discard_pile):
+			self.set_state(self.discard_pile[-1], DISCARD_TOP)
+
+
+	def discarded(self, seat, card):
+		"""`seat` put `card` on top of the discard pile."""
+
+		if seat is not None and seat != self.seat and self.states[card] == LIVE:
+			self.hidden_counts[seat] = self.hidden_count(seat) - 1
+		elif self.states[card] == OPPONENT:
+			self.held[seat] &= ~cards.BITS[card]
+
+		if len(self.discard_pile):
+			self.set_state(self.discard_pile[-1], BURIED)
+		self.discard_pile.append(card)
+		self.set_state(card, DISCARD_TOP)
+
+
+	def reshuffled(self, card):
+		"""The discard pile was shuffled into the main deck and `card` was turned up as the new discard pile."""
+
+		for pile_card in self.discard_pile:
+			self.set_state(pile_card, LIVE)
+		self.discard_pile = []
+		self.turned_up(card)
+
+
+	def seen(self, val):
+		"""Returns the # of cards of value `val` that the seat has seen."""
+
+		return cards.count_value(sum(cards.DECK_MASKS[:self.num_decks]), val) - self.value_counts[LIVE][val]
+
+
+	def num_unseen(self):
+		return cards.popcount(self.masks[LIVE])
+
+
+	def draw_probability(self, val):
+		"""Returns the probability that the next card drawn from the main deck has value `val`.
+		Every unseen card is equally likely to be the next one, wherever it is."""
+
+		num_unseen = self.num_unseen()
+		if not num_unseen:
+			return 0.0
+		return self.value_counts[LIVE][val] / num_unseen
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,167 @@
+"""Compact representation of the cards for the game logic.
+
+Every card of the first deck is an int in [0, 52]:
+- card `suit_index * 13 + (val - 1)` is the card `val`-of-`SUITS[suit_index]`
+- card `JOKER` (52) is the printed joker
+Rounds with many seats are dealt from MAX_DECKS decks; card `deck * CARDS_PER_DECK + c` is card `c` of deck `deck`.
+
+A hand is a 106-bit int mask with bit `card` set for every card in the hand.
+Lives in this game only need increasing values (suits don't matter) and sets need the same value,
+so most questions about a hand are answered on it's 13-bit value mask (bit `val - 1`).
+"""
+
+from game_constants import *
+
+
+
+SUITS = ["Diamonds","Hearts","Spades","Clubs"]
+NUM_VALUES = NUM_CARDS_WITH_PLAYER
+JOKER = len(SUITS) * NUM_VALUES
+CARDS_PER_DECK = JOKER + 1
+MAX_DECKS = 2
+NUM_CARDS = CARDS_PER_DECK * MAX_DECKS
+
+FULL_MASK = (1 << NUM_CARDS) - 1
+FULL_VALUE_MASK = (1 << NUM_VALUES) - 1
+
+# DECK_MASKS[deck] has the bits of all 53 cards of the deck
+DECK_MASKS = tuple(((1 << CARDS_PER_DECK) - 1) << (deck * CARDS_PER_DECK) for deck in range(MAX_DECKS))
+
+# lookup tables indexed by card
+VALUES = tuple(((card % CARDS_PER_DECK) % NUM_VALUES + 1 if card % CARDS_PER_DECK != JOKER else 0) for card in range(NUM_CARDS))
+SUIT_INDICES = tuple((card % CARDS_PER_DECK) // NUM_VALUES for card in range(NUM_CARDS))
+BITS = tuple(1 << card for card in range(NUM_CARDS))
+
+# VALUE_MASKS[val] has the bits of all the cards with value `val` in every deck (the printed jokers for val = 0)
+VALUE_MASKS = tuple(sum(BITS[card] for card in range(NUM_CARDS) if VALUES[card] == val) for val in range(NUM_VALUES+1))
+
+# SUIT_MASKS[suit_index] has the bits of all the cards of the suit in every deck
+SUIT_MASKS = tuple(sum(FULL_VALUE_MASK << (deck * CARDS_PER_DECK + suit * NUM_VALUES) for deck in range(MAX_DECKS)) for suit in range(len(SUITS)))
+
+if hasattr(int, "bit_count"):
+	popcount = int.bit_count
+else:
+	def popcount(mask):
+		return bin(mask).count("1")
+
+
+
+def card_id(suit, val, deck = 0):
+	"""Returns the card with value `val` of `suit` ("Joker" for the printed joker) of the deck # `deck`."""
+
+	if val == 0:
+		return deck * CARDS_PER_DECK + JOKER
+	return deck * CARDS_PER_DECK + SUITS.index(suit) * NUM_VALUES + val - 1
+
+
+def value(card):
+	return VALUES[card]
+
+
+def suit(card):
+	return "Joker" if VALUES[card] == 0 else SUITS[SUIT_INDICES[card]]
+
+
+def name(card):
+	"""Returns the same text as `str()` of the `Card` sprite."""
+
+	return str(VALUES[card])+"-of-"+suit(card)
+
+
+def is_joker(card, joker_val):
+	"""Checks if `card` can be used as a joker in a round whose card joker has value `joker_val`."""
+
+	return VALUES[card] == 0 or VALUES[card] == joker_val
+
+
+def joker_mask(joker_val):
+	"""Returns the mask of all the cards that are jokers in a round whose card joker has value `joker_val`."""
+
+	return VALUE_MASKS[0] | VALUE_MASKS[joker_val]
+
+
+def to_mask(cards):
+	mask = 0
+	for card in cards:
+		mask |= BITS[card]
+	return mask
+
+
+def from_mask(mask):
+	"""Returns the cards in `mask` in increasing order."""
+
+	cards = []
+	while mask:
+		low_bit = mask & -mask
+		cards.append(low_bit.bit_length() - 1)
+		mask ^= low_bit
+	return cards
+
+
+def fold_decks(mask):
+	"""Returns the mask of the cards of the first deck that are in `mask` themselves or by their copy of the second deck."""
+
+	# the second deck has the same cards at the same places, one deck higher
+	if mask >> CARDS_PER_DECK:
+		return (mask | mask >> CARDS_PER_DECK) & DECK_MASKS[0]
+	return mask
+
+
+def value_mask(mask):
+	"""Returns the 13-bit mask of values (bit `val - 1`) present in the hand `mask`, ignoring the printed jokers."""
+
+	mask = fold_decks(mask & ~VALUE_MASKS[0])
+	result = 0
+	for suit_index in range(len(SUITS)):
+		result |= mask >> (suit_index * NUM_VALUES)
+	return result & FULL_VALUE_MASK
+
+
+def value_mask_at_least(mask, num):
+	"""Returns the 13-bit mask of values that have atleast `num` (1 to 4 per deck) cards in the hand `mask`."""
+
+	num_decks = MAX_DECKS if mask >> CARDS_PER_DECK else 1
+	rows = [(mask >> (deck * CARDS_PER_DECK + suit_index * NUM_VALUES)) & FULL_VALUE_MASK for deck in range(num_decks) for suit_index in range(len(SUITS))]
+
+	# counts[i] has the values seen in exactly i of the rows so far
+	counts = [FULL_VALUE_MASK] + [0] * len(rows)
+	for row in rows:
+		for i in range(len(rows), 0, -1):
+			counts[i] = (counts[i] & ~row) | (counts[i-1] & row)
+		counts[0] &= ~row
+
+	result = 0
+	for i in range(num, len(rows)+1):
+		result |= counts[i]
+	return result
+
+
+def count_value(mask, val):
+	"""Returns the number of cards with value `val` in the hand `mask`."""
+
+	return popcount(mask & VALUE_MASKS[val])
+
+
+def is_set(mask):
+	"""Checks if the cards of `mask` all have the same value and different suits."""
+
+	return mask != 0 and popcount(value_mask(mask)) == 1 and not mask & VALUE_MASKS[0] and popcount(fold_decks(mask)) == popcount(mask)
+
+
+def is_run(mask):
+	"""Checks if the cards of `mask` have increasing values with a difference of 1 (one card per value)."""
+
+	values = value_mask(mask)
+	if not values or mask & VALUE_MASKS[0] or popcount(values) != popcount(mask):
+		return False
+	values //= values & -values
+	return values & (values + 1) == 0
+
+
+def runs_of_length(values, length):
+	"""Returns the mask of values that start a run of at least `length` consecutive values in the value mask `values`."""
+
+	starts = values
+	for shift in range(1, length):
+		starts &= values >> shift
+	return starts
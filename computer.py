@@ -1,72 +1,175 @@
+import bisect
 import logging
 from time import sleep
 
+from game_constants import *
+import card_tracker
+import cards
+import melds
+
+
+
+SINGLE = "single"
+SET = "set"
+LIFE = "life"
+
+MAX_GROUP_SIZE = 4
+MAX_SET_CARDS = 5
+
+
+
+class Group(list):
+	"""A list of cards that a `Computer` is building into a set or a life
+
+	Properties of a `Group` type object:
+	- Knows it's kind: SINGLE (1 card, can become either), SET (same values) or LIFE (increasing values)
+	- Knows the values of the cards that can be added to it
+	- Has a sequence number which keeps the order of groups of the same size stable
+	"""
+
+	# groups are kept in sets and compared by identity, not by their cards
+	__hash__ = object.__hash__
+	__eq__ = object.__eq__
+	__ne__ = object.__ne__
+
+	def __init__(self, card, seq):
+		super().__init__([card])
+		self.kind = SINGLE
+		self.seq = seq
+
+
+	def key(self):
+		"""Groups are kept in the order of decreasing size."""
+
+		return (-len(self), self.seq)
+
+
+	def update_kind(self):
+		if len(self) == 1:
+			self.kind = SINGLE
+		elif cards.VALUES[self[0]] == cards.VALUES[self[1]]:
+			self.kind = SET
+		else:
+			self.kind = LIFE
+
+
+	def needed_values(self):
+		"""Returns the values of the cards that can be added to the group."""
+
+		if len(self) >= MAX_GROUP_SIZE:
+			return ()
+		if self.kind == SINGLE:
+			return (cards.VALUES[self[0]], cards.VALUES[self[0]] + 1)
+		if self.kind == SET:
+			return (cards.VALUES[self[0]],)
+		return (cards.VALUES[self[-1]] + 1,)
+
+
+
+
 class Computer:
 	"""Creates a virtual computer who plays the game with the player
 	
 	Properties of a `Computer` type object:
-	- Keeps all it's cards as a list of different sets and lives (list of lists)
-	- Capable of checking if the computer won
+	- Keeps all it's cards (see `cards`) as a list of different sets and lives (`Group`s) and as a mask
+	- Keeps the groups ordered by size and the values they need up to date on every card added or removed
+	- Capable of checking if the computer won, keeping the winning groups in self.partition
 	- Can form relevant groups from the specified cards
-	- Computer waits for 2 seconds before making a decision to give a realistic feel
+	- Remembers every card it has seen at it's `seat` in a `card_tracker.CardTracker`, kept up to date by the `Dealer`
+	- Can be saved with `snapshot` and brought back with `restore`
+	- Computer waits for `delay` seconds before making a decision to give a realistic feel
 	"""
 
-	def __init__(self, computer_deck, card_joker):
+	def __init__(self, computer_deck, card_joker, delay = COMPUTER_DELAY, seat = COMPUTER_SEAT):
 
 		self.card_joker = card_joker
+		self.joker_val = cards.value(card_joker)
+		self.meld_index = melds.get_meld_index(self.joker_val)
+		self.delay = delay
+		self.tracker = card_tracker.CardTracker(seat, computer_deck, card_joker)
+
+		# self.grps is sorted by Group.key(); self.grp_keys has the keys for bisect
 		self.grps = []
+		self.grp_keys = []
+		self.grp_seq = 0
+		self.grp_of_card = {}
+		self.grps_needing = [set() for val in range(cards.NUM_VALUES+2)]
+		self.num_set_cards = 0
+
+		# counts of the values of the cards that are not jokers, with the masks of values held once and atleast twice
+		self.value_counts = [0] * (cards.NUM_VALUES+1)
+		self.values = 0
+		self.pairs = 0
+
 		self.jokers = []
+		self.hand = 0
+		self.partition = None
 		self.build_groups(computer_deck)
-		self.cards_with_player = []
+
+
+	@property
+	def cards_with_player(self):
+		"""Mask of the cards that the computer knows are with the other player."""
+
+		return self.tracker.masks[card_tracker.OPPONENT]
 
 
 	def build_groups(self, computer_deck):
 		"""Divides the deck in the argument into different most suitable groups."""
 
-		computer_deck.sort()
+		computer_deck.sort(key = cards.value)
 		
 		for card in computer_deck:
 			self.add_card_to_grps(card)
 
-		self.grps = sorted(self.grps, key = lambda x: -len(x))
-
-		logger.info(f"In computer.py/build_groups: computer: {self}")
+		logger.info("In computer.py/build_groups: computer: %s", self)
 
 
 	def get_card(self, card):
 		"""Recieves a card from a `Dealer` object and returns 1 card back to `Dealer`.
-		Note: Currently it removes the card from group with least size."""
+		The card is chosen by `discard_card`: a winning discard, else a card of a set when too many cards form sets,
+		else a card of the smallest group whose needed cards are least likely to come."""
 
 		self.add_card_to_grps(card)
+		return self.discard_card()
 
-		self.grps = sorted(self.grps, key = lambda x: -len(x))
 
+	def discard_card(self):
+		"""Chooses a card of the 14 cards in hand, removes it and returns it."""
 
-		# check if # of cards forming sets is more than 5; if yes, then break the set to allow computer to form runs
-		num_set_cards = 0
-		pos = -1
-		for i in range(len(self.grps)):
-			if len(self.grps[i]) > 1 and self.grps[i][0] == self.grps[i][1]:
-				num_set_cards += len(self.grps[i])
-				pos = i
-
-		if num_set_cards > 5:
-			card = self.grps[pos][-1]
-			self.grps[pos].remove(card)
-			logger.info(f"In computer.py/get_card: computer returned {card} to break too many set, computer = {self}")
+		# if discarding some card wins the round, then discard it
+		winning_discard = melds.find_winning_discard(self.hand, self.joker_val)
+		if winning_discard is not None:
+			card = winning_discard[0]
+			self.remove_card(card)
+			logger.info("In computer.py/discard_card: computer returned %s to win, computer = %s", cards.name(card), self)
 			return card
 
 
-		# if # of sets is fine, then remove a card from the group with least size
-		card = self.grps[-1][-1]
+		# check if # of cards forming sets is more than 5; if yes, then break the smallest set to allow computer to form runs
+		if self.num_set_cards > MAX_SET_CARDS:
+			for grp in reversed(self.grps):
+				if grp.kind == SET:
+					card = grp[-1]
+					break
+			self.remove_card(card)
+			logger.info("In computer.py/discard_card: computer returned %s to break too many set, computer = %s", cards.name(card), self)
+			return card
 
-		
-		if len(self.grps[-1]) == 1:
-			self.grps.remove(self.grps[-1])
-		else:
-			self.grps[-1].remove(self.grps[-1][-1])
 
-		logger.info(f"In computer.py/get_card: computer returned {card}, computer = {self}")
+		# if # of sets is fine, then remove a card from the group with least size,
+		# preferring the group whose needed cards are least likely to come (see `card_tracker.CardTracker`)
+		card = self.grps[-1][-1]
+		least_live = None
+		for grp in reversed(self.grps):
+			if len(grp) != len(self.grps[-1]):
+				break
+			live = sum(self.tracker.value_counts[card_tracker.LIVE][val] for val in grp.needed_values() if val <= cards.NUM_VALUES)
+			if least_live is None or live < least_live:
+				card, least_live = grp[-1], live
+		self.remove_card(card)
+
+		logger.info("In computer.py/discard_card: computer returned %s, computer = %s", cards.name(card), self)
 
 		return card
 
@@ -75,125 +178,179 @@ class Computer:
 		"""Adds the card in the argument to most suitable group in self.grps
 		Note: Currently, it adds to a valid group with smallest size."""
 
-		if card.val == self.card_joker.val or card.val == 0:
+		self.hand |= cards.BITS[card]
+
+		if cards.is_joker(card, self.joker_val):
 			self.jokers.append(card)
+			return
+
+		card_val = cards.VALUES[card]
+		self.__count_value(card_val, 1)
+
+		# the groups that can take the card; the smallest one is the last in self.grps
+		candidates = self.grps_needing[card_val]
+		if candidates:
+			grp = max(candidates, key = Group.key)
+			self.__detach(grp)
+			grp.append(card)
+			grp.update_kind()
+			self.__attach(grp)
 		else:
-			new_grp = True
+			grp = Group(card, self.grp_seq)
+			self.grp_seq += 1
+			self.__attach(grp)
 
-			for grp in self.grps[::-1]:
-				if len(grp) >= 4:
-					continue
-				is_a_set = True
-				val = grp[0].val
+		self.grp_of_card[card] = grp
 
-				for grp_card in grp:
-					if grp_card.val != val:
-						is_a_set = False
 
-				if is_a_set and card.val == val:
-					new_grp = False
-					grp.append(card)
-					break
+	def did_computer_win(self):
+		"""Checks if the computer can win with the current lives and sets.
+		All the cards are tried in every possible group (see `melds.solve`), not only in self.grps."""
 
-				if (not is_a_set or len(grp) == 1) and card.val == grp[-1].val+1:
-					new_grp = False
-					grp.append(card)
-					break
-			
-			if new_grp:
-				self.grps.append([card])
+		partition = melds.solve(self.hand, self.joker_val)
 
+		if partition is None:
+			logger.info("In computer.py/did_computer_win: no valid groups for computer: %s", self)
+			return False
 
-	def did_computer_win(self):
-		"""Checks if the computer can win with the current lives and sets."""
+		self.partition = partition
+		logger.info("In computer.py/did_computer_win: valid group found for computer: %s", self)
+		return True
 
-		num_jokers = len(self.jokers)
 
-		# check if pure run exists; try forming pure run from groups in range [1, len(self.grps)] so we can form an impure run from the largest group
-		# in case we don't find pure groups then check for pure group at self.grps[0]
-		is_pure_run = False
-		pure_run_pos = -1
-		
-		if len(self.grps) < 2:
-			return False
 
-		for i in range(1, len(self.grps)):
-			is_a_set = True
-			for grp_card in self.grps[i]:
-				if grp_card.val != self.grps[i][0].val:
-					is_a_set = False
-					break
-			if not is_a_set and len(self.grps[i]) > 2:
-				is_pure_run = True
-				pure_run_pos = i
-				break
+	def remove_card(self, card):
+		"""Removes the card from self.jokers or from it's group in self.grps.
+		Removing a card from the middle of a life splits the life in two groups."""
 
-		if not is_pure_run:
-			if len(self.grps[0]) > 2 and self.grps[0][1].val == self.grps[0][0].val + 1:
-				is_pure_run = True
-				pure_run_pos = 0
+		self.hand &= ~cards.BITS[card]
 
-		if not is_pure_run:
-			logger.info(f"In computer.py/did_computer_win: computer: {self}, is_pure_run: {is_pure_run}")
-			return False
+		if card in self.jokers:
+			self.jokers.remove(card)
+			return
 
+		self.__count_value(cards.VALUES[card], -1)
 
+		grp = self.grp_of_card.pop(card)
+		self.__detach(grp)
 
-		# check if second life exists; try forming second life with the largest run we have in the moment. 
-		# If length of that life is less < 4, then try using as many jokers as possible.
-		is_second_life = False
-		second_life_pos = -1
-		for i in range(len(self.grps)):
-			if i == pure_run_pos: 
-				continue
-
-			# if self.grps[i] is a set then continue
-			if len(self.grps[0]) > 1 and self.grps[i][0] == self.grps[i][1]:
-				continue
-
-			if len(self.grps[i]) + num_jokers >= 4:
-				is_second_life = True
-				second_life_pos = i
-				if len(self.grps[i]) < 4:
-					num_jokers -= 4 - len(self.grps[i])
-			break
-
-		if not is_second_life:
-			logger.info(f"In computer.py/did_computer_win: computer: {self}, is_second_life: {is_second_life}")
-			return False
+		pos = grp.index(card)
+		if grp.kind == LIFE and 0 < pos < len(grp) - 1:
+			rest = grp[pos+1:]
+			del grp[pos:]
+
+			new_grp = Group(rest[0], self.grp_seq)
+			self.grp_seq += 1
+			new_grp.extend(rest[1:])
+			new_grp.update_kind()
+			for grp_card in rest:
+				self.grp_of_card[grp_card] = new_grp
+			self.__attach(new_grp)
+		else:
+			del grp[pos]
 
+		if len(grp):
+			grp.update_kind()
+			self.__attach(grp)
 
 
-		# use a joker card for every group smaller than 3; if # of jokers go negative then we can't form valid groups
-		for i in range(len(self.grps)):
-			if i == pure_run_pos or i == second_life_pos or len(self.grps[i])>2:
-				continue
-			num_jokers -= (3 - len(self.grps[i]))
+	def snapshot(self):
+		"""Returns the state of the computer (it's groups, jokers and tracker) as plain lists, see `restore`."""
 
-		if num_jokers < 0:
-			logger.info(f"In computer.py/did_computer_win: computer: {self}, num_jokers: {num_jokers}")
-			return False
+		return {
+			"grps": [[grp.seq, list(grp)] for grp in self.grps],
+			"grp_seq": self.grp_seq,
+			"jokers": list(self.jokers),
+			"tracker": self.tracker.snapshot(),
+		}
 
-		logger.info(f"In computer.py/did_computer_win: valid group found for computer: {self}")
-		return True
 
+	def restore(self, state):
+		"""Goes back to a state returned by `snapshot`, rebuilding the indexes of the groups."""
+
+		self.grps = []
+		self.grp_keys = []
+		self.grp_of_card = {}
+		self.grps_needing = [set() for val in range(cards.NUM_VALUES+2)]
+		self.num_set_cards = 0
+		self.value_counts = [0] * (cards.NUM_VALUES+1)
+		self.values = 0
+		self.pairs = 0
+		self.partition = None
+
+		self.grp_seq = state["grp_seq"]
+		self.jokers = list(state["jokers"])
+		self.hand = cards.to_mask(self.jokers)
+
+		for seq, grp_cards in state["grps"]:
+			grp = Group(grp_cards[0], seq)
+			grp.extend(grp_cards[1:])
+			grp.update_kind()
+			self.__attach(grp)
+			for card in grp:
+				self.grp_of_card[card] = grp
+				self.__count_value(cards.VALUES[card], 1)
+				self.hand |= cards.BITS[card]
+
+		self.tracker.restore(state["tracker"])
+
+
+	def __attach(self, grp):
+		"""Inserts the group at it's place in self.grps and records what it needs."""
+
+		key = grp.key()
+		pos = bisect.bisect(self.grp_keys, key)
+		self.grps.insert(pos, grp)
+		self.grp_keys.insert(pos, key)
+
+		for val in grp.needed_values():
+			self.grps_needing[val].add(grp)
+		if grp.kind == SET:
+			self.num_set_cards += len(grp)
+
+
+	def __detach(self, grp):
+		"""Takes the group out of self.grps and of what it needs. Must be called before the group changes."""
 
+		pos = bisect.bisect_left(self.grp_keys, grp.key())
+		del self.grps[pos]
+		del self.grp_keys[pos]
 
-	def append_to_cards_with_player(self, card):
-		self.cards_with_player.append(card)
+		for val in grp.needed_values():
+			self.grps_needing[val].discard(grp)
+		if grp.kind == SET:
+			self.num_set_cards -= len(grp)
 
-	def remove_from_cards_with_player(self, card):
-		try: 
-			self.cards_with_player.remove(card)
-		except:
-			pass
+
+	def __count_value(self, val, change):
+		"""Updates the count of `val` and the masks of values held once and atleast twice."""
+
+		self.value_counts[val] += change
+		count = self.value_counts[val]
+		bit = 1 << (val - 1)
+
+		self.values = self.values | bit if count >= 1 else self.values & ~bit
+		self.pairs = self.pairs | bit if count >= 2 else self.pairs & ~bit
+
+
+	def ponder(self, executor):
+		"""Starts thinking about the next draw on `executor` while the other seats move (see `turns.TurnScheduler`).
+		This computer decides fast enough on it's turn, so it doesn't."""
+
+		return None
 
 
 	def make_move(self, dealer, discard_pile_card):
 		"""Makes a decision to choose a card from main deck or the discard pile. 
 		Returns True if computer chooses a card from discard_pile."""
 		
-		sleep(2)
+		if self.delay:
+			sleep(self.delay)
+		return self.choose_draw(discard_pile_card)
+
+
+	def choose_draw(self, discard_pile_card):
+		"""Returns True if the computer takes `discard_pile_card` (None if the discard pile is empty): a joker or a card it needs."""
 
 		choose_from_discard = True
 
@@ -202,61 +359,18 @@ class Computer:
 			choose_from_discard = False
 		else:
 
-			# make a list of all the cards that I can use to make sets and lives
-			cards_needed = []
-			cards_needed_freq = []
-
-			for grp in self.grps:
-				if len(grp) >= 3:
-					continue
-
-				is_a_set = True
-				for i in range(len(grp)):
-					if grp[i].val != grp[0].val:
-						is_a_set = False
-
-				if is_a_set:
-					cards_needed.append(grp[0].val)
-				else:
-					cards_needed.append(grp[-1].val+1)
-				
-				cards_needed_freq.append(4)
-
-			# if the player or computer have some card that the computer needs, then reduce probability of getting that card.
-			for grp in self.grps:
-				for card in grp:
-					try:
-						ind = cards_needed.index(card.val)
-						cards_needed_freq[ind] -= 1
-					except:
-						pass
-			
-			for card in self.cards_with_player:
-				try:
-					ind = cards_needed.index(card.val)
-					cards_needed_freq[ind] -= 1
-				except:
-					pass
-
-			# log the cards needed by computer
-			string = "cards_needed: (val: freq) = "
-			for i in range(len(cards_needed)):
-				string += "(" + str(cards_needed[i]) + ": " + str(cards_needed_freq[i]) + "), "
-			logger.info(f"In computer.py/make_move: discard_pile_card: {discard_pile_card}, {string}")
-
-
-			# If we don't need the top card in Discard Pile then `choose_from_discard` = False
-			flag = False
-			for i in range(len(cards_needed)):
-				if cards_needed_freq[i] > 0 and cards_needed[i] == discard_pile_card.val:
-					flag = True
-					break
+			# values that complete a set or a life with the cards I have (see `melds.MeldIndex.needed_values`)
+			cards_needed = self.meld_index.completions[self.values] | self.pairs
+
+			if logger.isEnabledFor(logging.INFO):
+				logger.info("In computer.py/choose_draw: discard_pile_card: %s, cards_needed: %s", cards.name(discard_pile_card), [val for val in range(1, cards.NUM_VALUES+1) if cards_needed & (1 << (val - 1))])
 
-			if not flag:
+			# If we don't need the top card in Discard Pile (and it isn't a joker) then `choose_from_discard` = False
+			if not cards.is_joker(discard_pile_card, self.joker_val) and not cards_needed & (1 << (cards.VALUES[discard_pile_card] - 1)):
 				choose_from_discard = False
 
 
-		logger.info(f"In computer.py/make_move: choose_from_discard: {choose_from_discard}")
+		logger.info("In computer.py/choose_draw: choose_from_discard: %s", choose_from_discard)
 		return choose_from_discard
 
 
@@ -265,14 +379,14 @@ class Computer:
 		
 		string = "{Jokers: "
 		for card in self.jokers:
-			string += str(card)+", "
+			string += cards.name(card)+", "
 
 		string += "}"
 
 		for i in range(len(self.grps)):
 			string += ", {group "+str(i+1)+": "
 			for card in self.grps[i]:
-				string += str(card)+", "
+				string += cards.name(card)+", "
 			string += "}"
 		return string
 
@@ -0,0 +1,54 @@
+import logging
+import threading
+import time
+
+import pygame
+
+
+
+COMPUTER_MOVE_EVENT = pygame.USEREVENT + 1
+MESSAGE_TIMEOUT_EVENT = pygame.USEREVENT + 2
+
+
+
+class ComputerWorker:
+	"""Lets a `Computer` make it's decision on a background thread so that the game loop keeps running
+
+	Properties of a `ComputerWorker` type object:
+	- Runs `Computer.make_move` (including it's delay) on a daemon thread
+	- Posts the decision back to the game loop as a `COMPUTER_MOVE_EVENT` with the attributes `computer`, `from_discard` and `seconds` (time taken)
+	- The game loop must not change the computer or the piles until the event arrives
+	"""
+
+	def __init__(self):
+		self.thread = None
+
+
+	def start(self, computer, dealer, discard_pile_card):
+		"""Starts the decision of `computer` on the top card of the discard pile."""
+
+		self.thread = threading.Thread(target = self.__run, args = (computer, dealer, discard_pile_card), daemon = True)
+		self.thread.start()
+
+
+	def is_busy(self):
+		return self.thread is not None and self.thread.is_alive()
+
+
+	def __run(self, computer, dealer, discard_pile_card):
+		start = time.perf_counter()
+		try:
+			from_discard = computer.make_move(dealer, discard_pile_card)
+		except Exception:
+			logger.exception(f"In computer_worker.py/__run: computer failed to make a move, choosing from main deck")
+			from_discard = False
+
+		pygame.event.post(pygame.event.Event(COMPUTER_MOVE_EVENT, computer = computer, from_discard = from_discard, seconds = time.perf_counter() - start))
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -1,119 +1,182 @@
 from game_constants import *
 import logging
-import time
+from time import perf_counter
+
+import game_log
 
 class Dealer:
 	"""Creates the game dealer who distributes all cards and prevents computer and player from accessing the `main_deck` or `discard_pile`
 	
 	Properties of a `Dealer` type object:
-	- Has reference to the current round being played and all the different players
+	- Has reference to the current round being played and all the different players: the `Player` (`players`) and the `Computer` (`computers`) of every seat
 	- Checks when the game ends
-	- Converts `discard_pile` to `main_deck` when `main_deck` goes empty
+	- Draws and discards on the round's `piles.Deck`, and reshuffles the discard pile into the main deck when a draw finds it empty
+	- Tells every seat's `card_tracker.CardTracker` about each draw, discard and reshuffle
 	"""
 
 
-	def __init__(self, main_deck, discard_pile, card_joker, player, computer, cur_round):
-		self.card_joker = card_joker
-		self.main_deck = main_deck
-		self.discard_pile = discard_pile
+	def __init__(self, deck, card_joker, players, computers, cur_round):
+		self.deck = deck
 		self.card_joker = card_joker
-		self.player = player
-		self.computer = computer
+		self.players = players
+		self.computers = computers
 		self.round = cur_round
 
+		self.trackers = []
+		for computer in computers.values():
+			self.add_tracker(computer.tracker)
+
+
+	@property
+	def main_deck(self):
+		return self.deck.main
+
+
+	@property
+	def discard_pile(self):
+		return self.deck.discard
+
+
+	def add_tracker(self, tracker):
+		"""Keeps `tracker` up to date from now on, starting with the top of the discard pile."""
+
+		self.trackers.append(tracker)
+		tracker.use_decks(self.round.num_decks)
+		tracker.turned_up(self.discard_pile[-1].id)
+
 
-	def give_card_to_player(self):
-		"""Gives a card to self.player based on which of discard_pile and main_deck is selected."""
+	def give_card_to_player(self, seat = PLAYER_SEAT):
+		"""Gives a card to the player of `seat` based on which of discard_pile and main_deck is selected."""
 
-		if not self.player.player_can_add_card:
+		player = self.players[seat]
+		if not player.player_can_add_card:
 			return
 		
-		if self.player.is_main_deck_selected and self.discard_pile[-1].clicked:
-			self.round.update_event_info(f"Select one place to add card from!")
-			time.sleep(2)
+		if player.is_main_deck_selected and self.discard_pile[-1].clicked:
+			self.round.update_event_info(f"Select one place to add card from!", MESSAGE_DELAY)
 			logger.info(f"In dealer.py/give_card_to_player: main deck and discard pile both selected")
 			return
 
-		if not self.player.is_main_deck_selected and not self.discard_pile[-1].clicked:
-			self.round.update_event_info(f"Select some place to add card from!")
-			time.sleep(2)
+		if not player.is_main_deck_selected and not self.discard_pile[-1].clicked:
+			self.round.update_event_info(f"Select some place to add card from!", MESSAGE_DELAY)
 			logger.info(f"In dealer.py/give_card_to_player: No piles / decks selected")
 			return
 
-		self.player.player_can_add_card = False
+		player.player_can_add_card = False
+		# a turn is counted at every draw of the player, the seat that moves first
+		if seat == PLAYER_SEAT:
+			self.round.turns += 1
 
-		if self.discard_pile[-1].clicked:
-			self.player.add_card(self.discard_pile[-1])
-			self.computer.append_to_cards_with_player(self.discard_pile[-1])
-			self.discard_pile.remove(self.discard_pile[-1])
+		from_discard = self.discard_pile[-1].clicked
+		if from_discard:
+			card = self.deck.draw_discard()
+			for tracker in self.trackers:
+				tracker.took_discard(seat, card.id)
 		else:
-			self.player.add_card(self.main_deck[0])
-			self.main_deck.remove(self.main_deck[0])
-			
-		self.player.player_can_remove_card = True
+			card = self.draw_main()
+			for tracker in self.trackers:
+				tracker.drew_main(seat, card.id)
+
+		player.add_card(card)
+		game_log.event("draw", turn = self.round.turns, seat = seat, card = card.id, from_discard = from_discard)
+		self.round.record(ACTION_DRAW, seat, int(from_discard), card.id)
+
+		player.player_can_remove_card = True
 
 
-	def take_card_from_player(self):
-		"""Receives a card from the player and adds it to self.discard_pile after adjusting it's image location."""
+	def take_card_from_player(self, seat = PLAYER_SEAT):
+		"""Receives a card from the player of `seat` and adds it to self.discard_pile after adjusting it's image location."""
 
-		card = self.player.remove_card()
+		card = self.players[seat].remove_card()
 		
 		if isinstance(card, str):
-			self.round.update_event_info(card)
-			time.sleep(2)
+			self.round.update_event_info(card, MESSAGE_DELAY)
 			return
 
-		logger.info(f"In dealer.py/take_card_from_player: Received card: {card}")
+		logger.info("In dealer.py/take_card_from_player: Received card: %s", card)
+		game_log.event("discard", turn = self.round.turns, seat = seat, card = card.id)
+		self.round.record(ACTION_DISCARD, seat, card.id)
 		card.rect.x, card.rect.y = BORDER_GAP * 22, MID_CARD_POS
 
-		self.discard_pile.append(card)
-		self.computer.remove_from_cards_with_player(card)
-		self.round.computer_move = True
+		self.deck.discard_card(card)
+		for tracker in self.trackers:
+			tracker.discarded(seat, card.id)
+		self.round.end_turn(seat)
+
+
+	def give_card_to_computer(self, from_discard = None, seat = COMPUTER_SEAT):
+		"""Gives a card to the computer of `seat` based on it's decision (computer.make_move()) and also takes a card from it.
+		If the decision was already made, it is passed as `from_discard`. Returns True if the computer won, else passes the turn on."""
 
+		computer = self.computers[seat]
 
-	def give_card_to_computer(self):
-		"""Gives a card to the computer based on it's decision (self.computer.make_move()) and also takes a card from it."""
+		if from_discard is None:
+			discard_pile_card = None
 
-		discard_pile_card = None
+			if len(self.discard_pile):
+				discard_pile_card = self.discard_pile[-1].id
 
-		if len(self.discard_pile):
-			discard_pile_card = self.discard_pile[-1]
+			start = perf_counter()
+			from_discard = computer.make_move(self, discard_pile_card)
+			game_log.event("computer_move", turn = self.round.turns, seat = seat, from_discard = from_discard, seconds = perf_counter() - start)
 
-		if self.computer.make_move(self, discard_pile_card):
-			card = self.computer.get_card(self.discard_pile[-1])
-			self.discard_pile.remove(self.discard_pile[-1])
+		if from_discard:
+			card = self.deck.draw_discard().id
+			for tracker in self.trackers:
+				tracker.took_discard(seat, card)
 		else:
-			card = self.computer.get_card(self.main_deck[-1])
-			self.main_deck.remove(self.main_deck[-1])
+			card = self.draw_main().id
+			for tracker in self.trackers:
+				tracker.drew_main(seat, card)
 
-		self.discard_pile.append(card)
+		game_log.event("draw", turn = self.round.turns, seat = seat, card = card, from_discard = from_discard)
+		self.round.record(ACTION_DRAW, seat, int(from_discard), card)
 
-		logger.info(f"In dealer.py/give_card_to_computer: card received: {card}")
+		start = perf_counter()
+		card = computer.get_card(card)
+		game_log.event("discard", turn = self.round.turns, seat = seat, card = card, seconds = perf_counter() - start)
+		self.round.record(ACTION_DISCARD, seat, card)
+		for tracker in self.trackers:
+			tracker.discarded(seat, card)
 
-		if self.computer.did_computer_win():
+		# the computer only knows the cards by their id, so get back the `Card` for the discard pile
+		card = self.round.cards[card]
+		self.deck.discard_card(card)
+
+		logger.info("In dealer.py/give_card_to_computer: card received: %s", card)
+
+		if computer.did_computer_win():
 			return True
+		self.round.end_turn(seat)
 		return False
 
 
+	def draw_main(self):
+		"""Draws the top card of the main deck, reshuffling the discard pile into it first if it is empty."""
+
+		if self.deck.needs_reshuffle():
+			self.shuffle_discard_pile()
+		return self.deck.draw_main()
+
+
 	def shuffle_discard_pile(self):
-		"""Shuffles the discard_pile and makes it the main_deck when (len(self.main_deck) == 0) is True.
-		Also adds top-most card to self.discard_pile from self.main_deck."""
+		"""Shuffles the discard_pile, except it's top-most card, and makes it the main_deck when (len(self.main_deck) == 0) is True."""
 
-		if not len(self.main_deck):
-			logger.error(f"In dealer.py/shuffle_discard_pile: ERROR: Assigning main_deck with len(self.main_deck) != 0")
+		if not self.deck.reshuffle():
 			return None
 
-		random.shuffle(self.discard_pile)
-		self.main_deck = self.discard_pile
-		self.discard_pile = []
-		self.discard_pile.append(self.main_deck[-1])
-		self.main_deck.remove(self.main_deck[-1])
+		for tracker in self.trackers:
+			tracker.reshuffled(self.discard_pile[-1].id)
+		game_log.event("reshuffle", turn = self.round.turns, main_deck = len(self.main_deck), card = self.discard_pile[-1].id)
 
 
 	def show_player(self):
 		"""Checks if the player has/had formed valid lifes and runs."""
 
-		if self.player.pure_life and self.player.second_life and len(self.player.player_deck) == 0:
+		self.round.record(ACTION_SHOW)
+		player = self.players[PLAYER_SEAT]
+		if player.pure_life and player.second_life and len(player.player_deck) == 0:
+			self.round.winner = PLAYER_SEAT
 			end_screen_text = "You Win!!"
 		else:
 			end_screen_text = "You Lose."
@@ -0,0 +1,539 @@
+import logging
+import random
+import sys
+import time
+
+from game_constants import *
+import cards
+import anytime
+import computer
+import melds
+import monte_carlo
+import player
+import dealer
+import piles
+import game_log
+import turns
+
+
+
+# 2: rounds have 2 to MAX_SEATS seats
+# 3: the cards of the second deck (see `cards.MAX_DECKS`)
+SNAPSHOT_VERSION = 3
+MIN_SEATS = 2
+# upto 3 seats are dealt from one deck, 4 to MAX_SEATS seats from two decks (see `num_decks`)
+MAX_SEATS = 6
+
+
+
+class SnapshotError(Exception):
+	"""Raised when a snapshot of a round can't be restored."""
+
+
+
+
+STRATEGIES = {
+	"heuristic": computer.Computer,
+	"anytime": anytime.AnytimeComputer,
+	"monte_carlo": monte_carlo.MonteCarloComputer,
+}
+# strategies whose moves only depend on what they have seen; the others search against the clock, so replays repeat their recorded moves
+DETERMINISTIC_STRATEGIES = {"heuristic"}
+
+
+
+def strategy_name(seat):
+	"""Returns the name of a seat (HUMAN or a computer class): HUMAN, the name of it's strategy, or None if it is unknown."""
+
+	if seat == HUMAN:
+		return HUMAN
+	for name, strategy_class in STRATEGIES.items():
+		if seat is strategy_class:
+			return name
+	return None
+
+
+def seat_classes(names):
+	"""Returns the seats (HUMAN or a computer class) named `names`, see `strategy_name`."""
+
+	seats = []
+	for name in names:
+		if name != HUMAN and name not in STRATEGIES:
+			raise SnapshotError(f"unknown strategy {name!r}")
+		seats.append(HUMAN if name == HUMAN else STRATEGIES[name])
+	return seats
+
+
+def num_decks(num_seats):
+	"""Returns the # of decks that a round of `num_seats` seats is dealt from: the fewest decks that give every seat
+	NUM_CARDS_WITH_PLAYER cards, the card joker and the first discard."""
+
+	num_dealt = num_seats * NUM_CARDS_WITH_PLAYER + 2
+	return -(-num_dealt // cards.CARDS_PER_DECK)
+
+
+
+class CardRect:
+	"""Stand-in for `pygame.Rect` used by cards that have no image
+
+	Properties of a `CardRect` type object:
+	- Has x and y co-ordinates so that `Player` and `Dealer` can lay out cards exactly like they do in the GUI
+	"""
+
+	def __init__(self, x = 0, y = 0, width = CARD_WIDTH, height = CARD_HEIGHT):
+		self.x = x
+		self.y = y
+		self.width = width
+		self.height = height
+
+
+	def collidepoint(self, pos):
+		return self.x <= pos[0] < self.x + self.width and self.y <= pos[1] < self.y + self.height
+
+
+
+
+class Card:
+	"""Creates a card without any graphics
+
+	Properties of a `Card` type object:
+	- Has a suit, a value and it's id in the compact representation of `cards`
+	- Has a `CardRect` holding it's x and y co-ordinates
+	- Has a bool value representing if the card is selected by `Player`
+	"""
+
+	def __init__(self, suit, val, deck = 0):
+		self.suit = suit
+		self.val = val
+		self.id = cards.card_id(suit, val, deck)
+		self.rect = CardRect()
+		self.clicked = False
+
+
+	def __str__(self):
+		return str(self.val)+"-of-"+ str(self.suit)
+
+
+	def __lt__(self, other):
+		return self.val < other.val
+
+
+
+
+class RoundEngine:
+	"""Runs the logic of a round (deal -> draw -> discard -> win-check) without pygame
+
+	Properties of a `RoundEngine` type object:
+	- Deals the cards with it's own random stream (see `piles.rng_stream`), so a round can be reproduced from it's seed
+	- Keeps the main deck and the discard pile in a `piles.Deck` shared with the `Dealer`
+	- Can be saved with `snapshot`, brought back with `restore` (or built from a snapshot with `state`) and forked cheaply with `fork`
+	- Seats 2 to MAX_SEATS players; `seats` has HUMAN or a computer class (see `STRATEGIES`) for every seat, by default a human and a `computer_class`
+	- The player's seat (PLAYER_SEAT) is always human; self.players and self.computers have the `Player` and the `Computer` of every seat
+	- Has a `Dealer` and acts as the round for it, and a `turns.TurnScheduler` that lets the computers think ahead on `ponder_executor`
+	- Records messages and the result of the round instead of displaying them and never sleeps
+	- Records every action of all the seats in self.actions, so that the round can be saved and replayed with `replay`
+	- `main.Round` extends it with images, the display and the event handling
+	"""
+
+	def __init__(self, seed = None, computer_delay = 0, computer_class = computer.Computer, state = None, seats = None, ponder_executor = None):
+		if state is not None:
+			seed = state["seed"]
+		# a round always has a seed, so that it can be replayed
+		if seed is None:
+			seed = random.randrange(1 << 32)
+		self.seed = seed
+		self.random = piles.rng_stream(seed, "deal")
+
+		if seats is None:
+			seats = seat_classes(state["seats"]) if state is not None else [HUMAN, computer_class]
+		if not MIN_SEATS <= len(seats) <= MAX_SEATS or seats[PLAYER_SEAT] != HUMAN:
+			raise ValueError(f"a round has {MIN_SEATS} to {MAX_SEATS} seats and the player's seat is human, not {[strategy_name(seat) for seat in seats]}")
+		self.seats = list(seats)
+		self.num_decks = num_decks(len(self.seats))
+
+		computer_seats = [seat for seat in self.seats if seat != HUMAN]
+		self.computer_class = computer_seats[0] if computer_seats else computer_class
+		self.strategy = strategy_name(self.computer_class)
+		self.actions = []
+		self.computer_delay = computer_delay
+
+		self.running = False
+		self.event_text = ""
+		self.result = None
+		self.winner = None
+		self.turns = 0
+		self.turn_scheduler = turns.TurnScheduler(len(self.seats), PLAYER_SEAT, ponder_executor)
+
+		# a round built from a snapshot isn't dealt at all
+		if state is not None:
+			self.build_cards()
+			self.deck = piles.Deck(rng = piles.rng_stream(seed, "reshuffle"))
+			self.dealer = None
+			self.restore(state)
+			return
+
+		hands, self.card_joker, main_deck, discard_pile = self.initialize_distribute_cards()
+
+		self.players = {}
+		self.computers = {}
+		for seat, seat_class in enumerate(self.seats):
+			if seat_class == HUMAN:
+				self.players[seat] = player.Player(hands[seat], self.card_joker)
+			else:
+				self.computers[seat] = seat_class([card.id for card in hands[seat]], self.card_joker.id, computer_delay, seat = seat)
+
+		self.deck = piles.Deck(main_deck, discard_pile, piles.rng_stream(seed, "reshuffle"))
+		self.dealer = dealer.Dealer(self.deck, self.card_joker, self.players, self.computers, self)
+
+
+	@property
+	def player(self):
+		"""The `Player` of the player's seat."""
+
+		return self.players[PLAYER_SEAT]
+
+
+	@property
+	def computer(self):
+		"""The `Computer` of the first computer seat, None if every seat is human."""
+
+		return next(iter(self.computers.values()), None)
+
+
+	@property
+	def computer_move(self):
+		"""Checks if it is the turn of a computer."""
+
+		return self.turn_scheduler.seat in self.computers
+
+
+	@property
+	def main_deck(self):
+		return self.deck.main
+
+
+	@property
+	def discard_pile(self):
+		return self.deck.discard
+
+
+	def make_card(self, suit, val, deck = 0):
+		"""Builds a single card of the deck # `deck`. `main.Round` overrides this to build cards with images."""
+
+		return Card(suit, val, deck)
+
+
+	def build_cards(self):
+		"""Builds all the cards of the self.num_decks decks in self.cards, indexed by their id."""
+
+		self.cards = []
+		for deck in range(self.num_decks):
+			for suit in cards.SUITS:
+				for value in range(1,NUM_CARDS_WITH_PLAYER+1):
+					self.cards.append(self.make_card(suit,value,deck))
+			self.cards.append(self.make_card("Joker",0,deck))
+
+
+	def initialize_distribute_cards(self):
+		"""Builds all the cards and distributes them in various decks after shuffling."""
+
+		self.build_cards()
+
+		main_deck = [card for card in self.cards if card.val]
+		self.random.shuffle(main_deck)
+
+		# choose the card joker and remove it from deck
+		card_joker = main_deck.pop()
+		card_joker.rect.x = BORDER_GAP
+		card_joker.rect.y = MID_CARD_POS
+		self.meld_index = melds.get_meld_index(card_joker.val)
+
+		# add the extra joker card of every deck to the deck and shuffle
+		main_deck.extend(card for card in self.cards if not card.val)
+		self.random.shuffle(main_deck)
+
+		# every seat gets the next NUM_CARDS_WITH_PLAYER cards, starting with the player
+		hands = [main_deck[seat*NUM_CARDS_WITH_PLAYER:(seat+1)*NUM_CARDS_WITH_PLAYER] for seat in range(len(self.seats))]
+		num_dealt = len(self.seats) * NUM_CARDS_WITH_PLAYER
+		discard_pile = [main_deck[num_dealt]]
+		main_deck = main_deck[num_dealt+1:]
+
+		# Define co-ordinates for player_deck
+		player_deck = hands[PLAYER_SEAT]
+		for i in range(NUM_CARDS_WITH_PLAYER):
+			player_deck[i].rect.x = BORDER_GAP + i * CARD_GAP
+			player_deck[i].rect.y = DISPLAY_HEIGHT - CARD_HEIGHT - BORDER_GAP
+
+		return hands, card_joker, main_deck, discard_pile
+
+
+	def snapshot(self):
+		"""Returns the whole state of the round as a compact dict of ints and lists (no `Card` objects), see `restore` and `savegame`."""
+
+		return {
+			"version": SNAPSHOT_VERSION,
+			"seed": self.seed,
+			"strategy": self.strategy,
+			"seats": [strategy_name(seat) for seat in self.seats],
+			"turns": self.turns,
+			"turn_seat": self.turn_scheduler.seat,
+			"result": self.result,
+			"winner": self.winner,
+			"actions": list(self.actions),
+			"card_joker": self.card_joker.id,
+			"main_deck": [card.id for card in self.main_deck],
+			"discard_pile": [card.id for card in self.discard_pile],
+			"reshuffle_random": self.deck.random.getstate(),
+			"hands": [self.players[seat].snapshot() if seat in self.players else self.computers[seat].snapshot() for seat in range(len(self.seats))],
+		}
+
+
+	def restore(self, state):
+		"""Brings the round back to a state returned by `snapshot`, keeping it's cards, it's seats and it's dealer.
+		The players and the computers are built again; other trackers of the dealer (e.g. of a `MirrorPolicy`) are dropped."""
+
+		if state.get("version") != SNAPSHOT_VERSION:
+			raise SnapshotError(f"unsupported snapshot version {state.get('version')}")
+		if len(state["seats"]) != len(self.seats):
+			raise SnapshotError(f"the snapshot has {len(state['seats'])} seats, the round {len(self.seats)}")
+
+		self.seed = state["seed"]
+		self.strategy = state["strategy"]
+		self.turns = state["turns"]
+		self.turn_scheduler.seat = state["turn_seat"]
+		self.result = state["result"]
+		self.winner = state["winner"]
+		self.actions = list(state["actions"])
+
+		for card in self.cards:
+			card.clicked = False
+		self.card_joker = self.cards[state["card_joker"]]
+		self.card_joker.rect.x = BORDER_GAP
+		self.card_joker.rect.y = MID_CARD_POS
+		self.meld_index = melds.get_meld_index(self.card_joker.val)
+
+		self.deck.main.cards = [self.cards[card] for card in state["main_deck"]]
+		self.deck.discard.cards = [self.cards[card] for card in state["discard_pile"]]
+		self.deck.random.setstate(piles.random_state(state["reshuffle_random"]))
+
+		# the players and the computers start without cards, the snapshot has them all
+		self.players = {}
+		self.computers = {}
+		for seat, seat_class in enumerate(self.seats):
+			if seat_class == HUMAN:
+				self.players[seat] = player.Player([], self.card_joker)
+				self.players[seat].restore(state["hands"][seat], self.cards)
+			else:
+				self.computers[seat] = seat_class([], self.card_joker.id, self.computer_delay, seat = seat)
+
+		if self.dealer is None:
+			self.dealer = dealer.Dealer(self.deck, self.card_joker, self.players, self.computers, self)
+		self.dealer.card_joker = self.card_joker
+		self.dealer.players = self.players
+		self.dealer.computers = self.computers
+		self.dealer.trackers = [seat_computer.tracker for seat_computer in self.computers.values()]
+
+		for seat, seat_computer in self.computers.items():
+			seat_computer.restore(state["hands"][seat])
+
+
+	def fork(self):
+		"""Returns a headless copy of the round that plays on independently of it, e.g. for a search to try a line of play.
+		Only the snapshot is copied; the copy has it's own cards, without images."""
+
+		return RoundEngine(state = self.snapshot(), seats = self.seats)
+
+
+	def update_event_info(self, text, delay = 0):
+		"""Records the message for the player. Headless rounds never wait for the `delay`."""
+
+		self.event_text = text
+
+
+	def game_end_screen(self, text):
+		"""Records the `text` as the result and ends the current round."""
+
+		logger.info("In engine.py/game_end_screen: result: %s", text)
+		game_log.event("result", turn = self.turns, result = text)
+		self.result = text
+		self.running = False
+
+
+	def player_draw(self, from_discard, seat = PLAYER_SEAT):
+		"""Selects the discard pile or the main deck for the player (or the human at `seat`) and asks the dealer for the card.
+		Returns the card added to the player's deck."""
+
+		seat_player = self.players[seat]
+		seat_player.is_main_deck_selected = not from_discard
+		self.discard_pile[-1].clicked = from_discard
+
+		self.dealer.give_card_to_player(seat)
+		return seat_player.player_deck[-1]
+
+
+	def player_swap(self, card_ids = None):
+		"""Swaps the 2 selected cards of the player (or the cards `card_ids`) and records it."""
+
+		self.select_player_cards(card_ids)
+		clicked = [card.id for card in self.player.player_deck if card.clicked]
+		if len(clicked) == 2:
+			self.record(ACTION_SWAP, *clicked)
+		self.player.swap_cards()
+
+
+	def player_check_group(self, card_ids = None):
+		"""Checks the group of selected cards of the player (or the cards `card_ids`) and records it."""
+
+		self.select_player_cards(card_ids)
+		self.record(ACTION_CHECK, [card.id for card in self.player.player_deck if card.clicked])
+		self.player.check_group()
+
+
+	def player_arrange(self):
+		"""Arranges the player's cards by their best grouping. Not recorded, since it only changes the order of the cards."""
+
+		distance = self.player.arrange()
+		self.update_event_info(f"Cards arranged, {distance} away from winning", MESSAGE_DELAY)
+
+
+	def select_player_cards(self, card_ids):
+		"""Selects exactly the cards `card_ids` in the player's deck. Keeps the selection if `card_ids` is None."""
+
+		if card_ids is None:
+			return
+		for card in self.player.player_deck:
+			card.clicked = card.id in card_ids
+
+
+	def player_declare(self, seat = PLAYER_SEAT):
+		"""Ends the round with the player's (or the human at `seat`) whole hand checked by `melds` (unlike the show button, no groups need to be checked first)."""
+
+		self.record(ACTION_DECLARE, *([seat] if seat != PLAYER_SEAT else []))
+		won = melds.is_winning(self.players[seat].hand, self.card_joker.val)
+		self.winner = seat if won else None
+
+		if seat == PLAYER_SEAT:
+			self.game_end_screen("You Win!!" if won else "You Lose.")
+		else:
+			self.game_end_screen(f"Player {seat} Won!" if won else f"Player {seat} Lost.")
+
+
+	def record(self, *action):
+		"""Appends an action (see the ACTION_ constants) to self.actions."""
+
+		self.actions.append(list(action))
+
+
+	def player_discard(self, card, seat = PLAYER_SEAT):
+		"""Selects `card` in the player's (or the human at `seat`) deck and hands it over to the dealer."""
+
+		for other in self.players[seat].player_deck:
+			other.clicked = False
+		card.clicked = True
+		self.dealer.take_card_from_player(seat)
+
+
+	def computer_turn(self, from_discard = None):
+		"""Lets the computer whose turn it is draw and discard a card. Ends the round if the computer wins.
+		`from_discard` is the computer's decision if it was already made, e.g. by a `computer_worker.ComputerWorker`."""
+
+		seat = self.turn_scheduler.seat
+		if self.dealer.give_card_to_computer(from_discard, seat):
+			self.winner = seat
+			self.game_end_screen("Computer Won!" if len(self.computers) == 1 else f"Computer {seat} Won!")
+
+
+	def end_turn(self, seat):
+		"""Called by the dealer when `seat` has discarded: passes the turn on to the next seat."""
+
+		self.turn_scheduler.end_turn(seat, self.computers.get(seat))
+
+
+	def play(self, policy, max_turns = 200):
+		"""Plays the round to the end, with `policy` making the moves of the player (or a dict of the policy of every human seat).
+		Returns the result of the round, or None if nobody won within `max_turns` turns."""
+
+		policies = policy if isinstance(policy, dict) else {PLAYER_SEAT: policy}
+		self.running = True
+
+		while self.running and self.turns < max_turns:
+			seat = self.turn_scheduler.seat
+			if seat in self.computers:
+				self.computer_turn()
+				continue
+
+			seat_policy = policies[seat]
+			card = self.player_draw(seat_policy.choose_draw(self), seat)
+			self.player_discard(seat_policy.choose_discard(self, card), seat)
+			if seat_policy.has_won(self):
+				self.player_declare(seat)
+				break
+
+		self.running = False
+		return self.result
+
+
+
+
+class MirrorPolicy:
+	"""Plays the player's seat (or the human `seat`) of a `RoundEngine` with the decisions of a computer
+
+	Properties of a `MirrorPolicy` type object:
+	- Keeps a computer of the class `computer_class` (see `STRATEGIES`) built from the seat's deck as it's brain
+	- Decides where to draw from, what to discard and if the seat's cards win the round
+	"""
+
+	def __init__(self, round_engine, computer_class = computer.Computer, seat = PLAYER_SEAT):
+		self.brain = computer_class([card.id for card in round_engine.players[seat].player_deck], round_engine.card_joker.id, 0, seat = seat)
+		round_engine.dealer.add_tracker(self.brain.tracker)
+
+
+	def choose_draw(self, round_engine):
+		"""Returns True if the player should draw from the discard pile."""
+
+		return self.brain.make_move(round_engine.dealer, round_engine.discard_pile[-1].id)
+
+
+	def choose_discard(self, round_engine, card):
+		"""Returns the card the player should discard after drawing `card`."""
+
+		return round_engine.cards[self.brain.get_card(card.id)]
+
+
+	def has_won(self, round_engine):
+		return self.brain.did_computer_win()
+
+
+
+
+def simulate(num_rounds, seed = 0, max_turns = 200, num_seats = 2):
+	"""Plays `num_rounds` headless rounds of `MirrorPolicy` against `num_seats` - 1 `computer.Computer`s.
+	Round `i` is dealt with seed `seed + i`. Returns a dict counting the results."""
+
+	results = {}
+	for i in range(num_rounds):
+		round_engine = RoundEngine(seed + i, seats = [HUMAN] + [computer.Computer] * (num_seats - 1))
+		result = round_engine.play(MirrorPolicy(round_engine), max_turns)
+		results[result] = results.get(result, 0) + 1
+	return results
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	num_rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+	num_seats = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+	start = time.perf_counter()
+	results = simulate(num_rounds, seed, num_seats = num_seats)
+	elapsed = time.perf_counter() - start
+
+	for result, count in results.items():
+		print(f"{result}: {count}")
+	print(f"{num_rounds} rounds in {elapsed:.2f}s ({num_rounds / elapsed:.0f} rounds/s)")
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,147 @@
+import cProfile
+import json
+import logging
+import time
+
+import pygame
+
+from game_constants import *
+import rolling
+
+
+
+PHASES = ("frame", "game_logic", "event_pump", "computer", "display", "display_update", "computer_think")
+
+OVERLAY_KEY = pygame.K_F3
+CAPTURE_KEY = pygame.K_F4
+OVERLAY_REFRESH = 0.5
+OVERLAY_BACKGROUND = (0, 0, 0)
+OVERLAY_WIDTH = 320
+
+
+
+class FrameProfiler:
+	"""Times every frame of the game loop split by phase
+
+	Properties of a `FrameProfiler` type object:
+	- Phases (see PHASES) are timed with `begin` and `end`; game_logic includes event_pump, computer and display
+	- Keeps the last FRAME_STATS_WINDOW samples of every phase and reports their p50 / p95 / p99
+	- Can draw the stats as an overlay (toggled with F3) and write them to `stats_file` every FRAME_STATS_INTERVAL seconds
+	- Can capture a cProfile of the next PROFILE_CAPTURE_SECONDS seconds (started with F4) to PROFILE_CAPTURE_FILE
+	"""
+
+	def __init__(self, stats_file = FRAME_STATS_FILE, window = FRAME_STATS_WINDOW):
+		self.stats_file = stats_file
+		self.samples = {phase: rolling.RollingSamples(window) for phase in PHASES}
+		self.starts = {}
+
+		self.overlay = False
+		self.overlay_surface = None
+		self.overlay_time = 0.0
+
+		self.export_time = time.perf_counter()
+
+		self.capture = None
+		self.capture_end = 0.0
+
+
+	def begin(self, phase):
+		self.starts[phase] = time.perf_counter()
+
+
+	def end(self, phase):
+		self.samples[phase].add(time.perf_counter() - self.starts[phase])
+
+
+	def add(self, phase, seconds):
+		"""Records a duration measured elsewhere, e.g. the computer's decision on it's worker thread."""
+
+		self.samples[phase].add(seconds)
+
+
+	def end_frame(self):
+		"""Ends the frame started with `begin("frame")` and does the periodic work: stats export and the end of a capture."""
+
+		now = time.perf_counter()
+		self.samples["frame"].add(now - self.starts["frame"])
+
+		if self.stats_file and now - self.export_time >= FRAME_STATS_INTERVAL:
+			self.export_time = now
+			self.export(self.stats_file)
+
+		if self.capture is not None and now >= self.capture_end:
+			self.stop_capture()
+
+
+	def stats(self):
+		"""Returns the percentiles (in ms) and the # of samples of every phase."""
+
+		return {phase: dict(samples.percentiles(), count = samples.count) for phase, samples in self.samples.items()}
+
+
+	def export(self, file_name):
+		with open(file_name, "w") as stats_file:
+			json.dump({"time": time.time(), "phases": self.stats()}, stats_file, indent = 2)
+
+
+	def toggle_overlay(self):
+		self.overlay = not self.overlay
+		self.overlay_surface = None
+		logger.info(f"In frame_profiler.py/toggle_overlay: overlay: {self.overlay}")
+
+
+	def draw_overlay(self, screen, font):
+		"""Draws the stats in the top right corner of `screen`. Returns the rect to update.
+		The text is only rebuilt every OVERLAY_REFRESH seconds, and not kept in a `renderer.TextCache` since it changes every time."""
+
+		now = time.perf_counter()
+		if self.overlay_surface is None or now - self.overlay_time >= OVERLAY_REFRESH:
+			self.overlay_time = now
+			lines = [f"{'phase':15}{'p50':>8}{'p95':>8}{'p99':>8}  (ms)"]
+			for phase, stats in self.stats().items():
+				if stats["count"]:
+					lines.append(f"{phase:15}{stats['p50']:8.2f}{stats['p95']:8.2f}{stats['p99']:8.2f}")
+			if self.capture is not None:
+				lines.append("capturing cProfile...")
+
+			# the overlay always has room for every line, so that it covers the previous one
+			surfaces = [font.render(line, True, FONT_COLOR) for line in lines]
+			self.overlay_surface = pygame.Surface((OVERLAY_WIDTH, FONT_SIZE * (len(PHASES) + 2) + BORDER_GAP))
+			self.overlay_surface.fill(OVERLAY_BACKGROUND)
+			for i, surface in enumerate(surfaces):
+				self.overlay_surface.blit(surface, (BORDER_GAP, BORDER_GAP/2 + i*FONT_SIZE))
+
+		rect = self.overlay_surface.get_rect(topright = (DISPLAY_WIDTH - BORDER_GAP, BORDER_GAP))
+		screen.blit(self.overlay_surface, rect)
+		return rect
+
+
+	def start_capture(self, seconds = PROFILE_CAPTURE_SECONDS):
+		"""Profiles the game thread with cProfile for the next `seconds` seconds."""
+
+		if self.capture is not None:
+			return
+		self.capture = cProfile.Profile()
+		self.capture_end = time.perf_counter() + seconds
+		self.capture.enable()
+		logger.info(f"In frame_profiler.py/start_capture: profiling for {seconds}s")
+
+
+	def stop_capture(self):
+		self.capture.disable()
+		self.capture.dump_stats(PROFILE_CAPTURE_FILE)
+		self.capture = None
+		logger.info(f"In frame_profiler.py/stop_capture: cProfile stats written to {PROFILE_CAPTURE_FILE}")
+
+
+
+
+profiler = FrameProfiler()
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
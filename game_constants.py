@@ -4,6 +4,55 @@ CARD_HEIGHT = 120
 
 NUM_CARDS_WITH_PLAYER = 13
 COMPUTER_DELAY = 3
+MESSAGE_DELAY = 2
+
+# "heuristic", "anytime" or "monte_carlo", see engine.STRATEGIES
+COMPUTER_STRATEGY = "heuristic"
+MONTE_CARLO_TIME_BUDGET = 1.5
+
+# share of the computer's delay that the anytime computer searches for (see anytime), it waits for the rest
+COMPUTER_DIFFICULTY = "medium"
+DIFFICULTY_BUDGETS = {"easy": 0.1, "medium": 0.5, "hard": 1.0}
+
+# the log is written by a background thread (see game_log); set GAME_LOG_JSON to a file name for JSON lines
+GAME_LOG_FILE = "GameLog.log"
+GAME_LOG_JSON = None
+
+# seats at the table, the player moves first; every other seat is a computer or another HUMAN (see engine.RoundEngine)
+PLAYER_SEAT = 0
+COMPUTER_SEAT = 1
+HUMAN = "human"
+# seats of a round of the game: the player and NUM_SEATS - 1 computers, atmost engine.MAX_SEATS
+NUM_SEATS = 2
+
+# actions recorded by a round (see replay): [ACTION_DRAW, seat, from_discard, card], [ACTION_DISCARD, seat, card],
+# [ACTION_CHECK, [cards]], [ACTION_SWAP, card, card], [ACTION_SHOW] and [ACTION_DECLARE] ([ACTION_DECLARE, seat] by another human seat)
+ACTION_DRAW = "d"
+ACTION_DISCARD = "x"
+ACTION_CHECK = "c"
+ACTION_SWAP = "s"
+ACTION_SHOW = "w"
+ACTION_DECLARE = "v"
+REPLAY_DIR = "replays"
+RECORD_REPLAYS = True
+
+# a round left with the go back button is saved here (see savegame) and resumed by the next start
+SAVE_FILE = "saved_round.sav"
+
+# the multi-table server (see server) and it's load test
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+
+# frame profiling (see frame_profiler): F3 shows the stats, F4 captures a cProfile; set FRAME_STATS_FILE to export the stats
+FRAME_STATS_WINDOW = 600
+FRAME_STATS_FILE = None
+FRAME_STATS_INTERVAL = 5
+PROFILE_CAPTURE_SECONDS = 5
+PROFILE_CAPTURE_FILE = "frame_profile.prof"
+
+# the screens sleep until the next event when idle (waking up atleast every IDLE_TIMEOUT ms) and run at most MAX_FPS frames per second when active
+MAX_FPS = 60
+IDLE_TIMEOUT = 1000
 
 
 DISPLAY_HEIGHT = 700
@@ -14,8 +63,11 @@ BUTTON_HEIGHT = 50
 
 BORDER_GAP = 20
 CARD_GAP = 105
+SELECTED_CARD_LIFT = 10
 
 FONT_COLOR = (255,255,255)
+VALID_GROUP_COLOR = (120,255,120)
+INVALID_GROUP_COLOR = (255,120,120)
 FONT_SIZE = 20
 
 INITIAL_PLAYER_POINTS = 90
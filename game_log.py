@@ -0,0 +1,111 @@
+"""Non-blocking logging for the game.
+
+`setup()` makes the 'logger.main' logger put it's records on a queue, and a background thread writes them
+to `GameLog.log` (and optionally the console and a JSON-lines file), so the game thread never waits on a file.
+
+Messages are formatted lazily: pass the values as arguments (`logger.info("In x.py/f: %s", obj)`) instead of
+f-strings, so nothing is formatted when the level is disabled (headless simulations don't enable INFO at all).
+`event()` logs a structured event (event type, turn, card ids, timings) that the JSON-lines sink writes as fields.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+
+from game_constants import *
+
+
+
+LOGGER_NAME = 'logger.main'
+TEXT_FORMAT = "%(message)s"
+
+_listener = None
+
+
+
+class JsonLinesFormatter(logging.Formatter):
+	"""Formats a record as one JSON object per line, with the fields of `event()` as keys."""
+
+	def format(self, record):
+		line = {"time": round(record.created, 6), "level": record.levelname, "event": getattr(record, "event", None)}
+		line.update(getattr(record, "fields", {}))
+		line["message"] = record.getMessage()
+		return json.dumps(line, default = str)
+
+
+
+
+class GameQueueHandler(logging.handlers.QueueHandler):
+	"""Puts records on the queue of the background writer
+
+	Properties of a `GameQueueHandler` type object:
+	- Formats the message once in the game thread (the arguments are live game state that changes by the time it is written)
+	- Leaves the writing, the JSON encoding and the file I/O to the writer thread
+	"""
+
+	def prepare(self, record):
+		record.msg = record.getMessage()
+		record.args = None
+		record.exc_info = None
+		return record
+
+
+
+
+def setup(file_name = GAME_LOG_FILE, level = logging.INFO, json_file = GAME_LOG_JSON, console = True):
+	"""Sends the records of 'logger.main' at `level` and above through a queue to a background writer.
+	Writes to `file_name`, the console if `console` and JSON lines to `json_file` if it is set. Returns the logger."""
+
+	global _listener
+	shutdown()
+
+	handlers = [logging.FileHandler(file_name)]
+	if console:
+		handlers.append(logging.StreamHandler())
+	for handler in handlers:
+		handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+	if json_file:
+		json_handler = logging.FileHandler(json_file)
+		json_handler.setFormatter(JsonLinesFormatter())
+		handlers.append(json_handler)
+
+	log_queue = queue.SimpleQueue()
+	_listener = logging.handlers.QueueListener(log_queue, *handlers)
+	_listener.start()
+
+	logger = logging.getLogger(LOGGER_NAME)
+	for handler in list(logger.handlers):
+		logger.removeHandler(handler)
+	logger.addHandler(GameQueueHandler(log_queue))
+	logger.setLevel(level)
+	logger.propagate = False
+	return logger
+
+
+def shutdown():
+	"""Writes the records still in the queue and stops the background writer."""
+
+	global _listener
+	if _listener is not None:
+		_listener.stop()
+		for handler in _listener.handlers:
+			handler.close()
+		_listener = None
+
+
+def event(name, **fields):
+	"""Logs the structured event `name` (e.g. "draw", "discard", "computer_move") with `fields` like the turn, card ids and timings.
+	Costs one level check when INFO is disabled."""
+
+	if logger.isEnabledFor(logging.INFO):
+		logger.info("Event %s: %s", name, fields, extra = {"event": name, "fields": fields})
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
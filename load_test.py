@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+
+from game_constants import *
+import computer
+import rolling
+import server
+
+
+
+LOAD_TEST_WINDOW = 200000
+
+
+
+async def play_table(address, seed, num_rounds, think, max_turns, latency):
+	"""Plays `num_rounds` rounds on one connection like a player would, with a `computer.Computer` choosing the moves
+	and `think` seconds between moves. Adds the time of every request (and of every move: a draw and it's discard) to `latency`."""
+
+	client = await server.Client.connect(*address)
+	for i in range(num_rounds):
+		state = await client.request("new", seed = seed + i)
+		brain = computer.Computer(list(state["hand"]), state["card_joker"], 0, seat = PLAYER_SEAT)
+
+		while state["result"] is None and state["turns"] < max_turns:
+			await asyncio.sleep(think)
+
+			start = time.perf_counter()
+			reply = await client.request("draw", from_discard = brain.make_move(None, state["discard_top"]))
+			latency["draw"].add(time.perf_counter() - start)
+
+			discard = brain.get_card(reply["card"])
+			discard_start = time.perf_counter()
+			state = await client.request("discard", card = discard)
+			latency["discard"].add(time.perf_counter() - discard_start)
+			latency["move"].add(time.perf_counter() - start)
+
+			if state["result"] is None and brain.did_computer_win():
+				state = await client.request("declare")
+	await client.close()
+
+
+async def run_clients(address, num_tables, num_rounds, think, max_turns, seed):
+	"""Runs `num_tables` tables at once. Returns the client side latency of every request and the server's stats."""
+
+	latency = {name: rolling.RollingSamples(LOAD_TEST_WINDOW) for name in ("draw", "discard", "move")}
+	await asyncio.gather(*(play_table(address, seed + i * num_rounds, num_rounds, think, max_turns, latency) for i in range(num_tables)))
+
+	client = await server.Client.connect(*address)
+	stats = await client.request("stats")
+	await client.close()
+	return latency, stats
+
+
+def load_test(num_tables = 100, num_rounds = 1, think = 0.0, max_turns = 100, seed = 0, address = None):
+	"""Plays `num_tables` concurrent tables against the server at `address` ((host, port) or (None, None, unix path)),
+	or against a server started in a process of it's own if it is None.
+	Returns a report with the latencies (ms) and the tables per core: the tables that one core of the server can host at this pace."""
+
+	server_process = None
+	if address is None:
+		ready = multiprocessing.Queue()
+		server_process = multiprocessing.Process(target = server.serve, args = (SERVER_HOST, 0, None, ready), daemon = True)
+		server_process.start()
+		address = tuple(ready.get())
+
+	try:
+		start = time.perf_counter()
+		latency, stats = asyncio.run(run_clients(address, num_tables, num_rounds, think, max_turns, seed))
+		elapsed = time.perf_counter() - start
+	finally:
+		if server_process is not None:
+			server_process.terminate()
+			server_process.join()
+
+	num_moves = latency["move"].count
+	# the cores the server kept busy; tables per core is how many tables a fully busy core would host at this pace
+	busy_cores = stats["cpu_seconds"] / stats["seconds"] if stats["seconds"] else 0.0
+	return {
+		"tables": num_tables,
+		"rounds": num_tables * num_rounds,
+		"think": think,
+		"seconds": elapsed,
+		"moves": num_moves,
+		"moves_per_second": num_moves / elapsed,
+		"server_busy_cores": busy_cores,
+		"tables_per_core": num_tables / busy_cores if busy_cores else None,
+		"latency_ms": {name: samples.percentiles() for name, samples in latency.items()},
+		"server_latency_ms": stats["latency_ms"],
+	}
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Plays many concurrent tables against the game server and reports the latency of the moves and the tables per core.")
+	parser.add_argument("--tables", type = int, default = 100, help = "concurrent tables (one client connection each)")
+	parser.add_argument("--rounds", type = int, default = 1, help = "rounds played by every client")
+	parser.add_argument("--think", type = float, default = 0.0, help = "seconds a client waits before every move")
+	parser.add_argument("--max-turns", type = int, default = 100)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--host", help = "test a running server at this host instead of starting one")
+	parser.add_argument("--port", type = int, default = SERVER_PORT)
+	parser.add_argument("--unix", help = "test a running server on this Unix socket")
+	parser.add_argument("--json", help = "write the report to this file")
+	args = parser.parse_args()
+
+	address = None
+	if args.unix:
+		address = (None, None, args.unix)
+	elif args.host:
+		address = (args.host, args.port)
+
+	report = load_test(args.tables, args.rounds, args.think, args.max_turns, args.seed, address)
+
+	print(f"{report['tables']} tables, {report['rounds']} rounds, {report['moves']} moves in {report['seconds']:.2f}s ({report['moves_per_second']:.0f} moves/s)")
+	print(f"server busy cores: {report['server_busy_cores']:.2f}, tables per core: {report['tables_per_core'] or 0:.0f}")
+	for name, percentiles in report["latency_ms"].items():
+		print(f"{name:10}" + "".join(f"{key:>6} {value:8.2f} ms" for key, value in percentiles.items()))
+
+	if args.json:
+		with open(args.json, "w") as json_file:
+			json.dump(report, json_file, indent = 2)
+else:
+	logger = logging.getLogger('logger.main')
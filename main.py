@@ -1,12 +1,29 @@
-import pygame
-import random
 import time
+
+# measured before anything else is imported, to track how long a cold start takes
+STARTUP_START = time.perf_counter()
+
+import pygame
 import logging
+import os
+import sys
+import threading
 
 from game_constants import *
-import computer
-import player
-import dealer
+import engine
+import assets
+import renderer
+import computer_worker
+import frame_profiler
+import game_log
+import replay
+import savegame
+import scheduler
+import turns
+
+
+
+ARRANGE_KEY = pygame.K_a
 
 
 
@@ -20,7 +37,7 @@ class Button:
 	"""
 
 	def __init__(self,task,image_name,x,y):
-		self.image = pygame.transform.scale(pygame.image.load(f"game_icons/buttons/{image_name}.png"),(BUTTON_WIDTH,BUTTON_HEIGHT))
+		self.image = assets.registry.button(image_name)
 		self.rect = self.image.get_rect()
 		self.rect.x = x
 		self.rect.y = y
@@ -29,7 +46,7 @@ class Button:
 
 
 
-class Card:
+class Card(engine.Card):
 	"""Creates the game object Card
 	
 	Properties of a `Card` type object:
@@ -38,110 +55,64 @@ class Card:
 	- Has a bool value representing if the card is selected by `Player`
 	"""
 
-	def __init__(self,suit,val):
-		self.suit = suit
-		self.val = val
-		self.image = pygame.transform.scale(pygame.image.load(f"game_icons/cards/{val}-{suit}.jpg"),(CARD_WIDTH,CARD_HEIGHT))
+	def __init__(self,suit,val,deck = 0):
+		super().__init__(suit, val, deck)
+		self.image = assets.registry.card(suit, val)
 		self.rect = self.image.get_rect()
-		self.clicked = False
-
-
-	def __str__(self):
-		return str(self.val)+"-of-"+ str(self.suit)
-
-
-	def __lt__(self, other):
-		return self.val < other.val
 
 
 
 
-class Round:
-	"""Creates and initializes all the game objects, player, the computer and the dealer and runs the whole deal/round
+class Round(engine.RoundEngine):
+	"""Displays a `engine.RoundEngine` and runs the whole deal/round with the user
 
 	Properties of a `Round` type object:
-	- Has a reference to a `Player`, `Computer` and `Dealer`
-	- Builds and stores references to all different card decks and in-game buttons
+	- Has a reference to the `Player`, the `Computer`s and the `Dealer` through the `RoundEngine` it extends
+	- Seats the player against NUM_SEATS - 1 computers by default; the computers ponder on `turns.get_executor()` unless not `ponder`
+	- Builds and stores references to all the card images and in-game buttons
 	- Displays all the events that are occuring 
 	- Handles all the events occuring by calling respective objects and their methods
+	- Times the phases of every frame with `frame_profiler.profiler`
+	- Sleeps until the next event with a `scheduler.FrameScheduler`, since the computer's decision and message timeouts arrive as events
 	"""
 
-	def __init__(self, player_points, computer_points):
+	def __init__(self, player_points, computer_points, seed = None, computer_class = None, computer_delay = COMPUTER_DELAY, state = None, seats = None, ponder = True):
 		self.player_points = player_points
 		self.computer_points = computer_points
 
-		self.game_background = pygame.transform.scale(pygame.image.load(f"game_icons/in_game/game_bg.jpg"),(DISPLAY_WIDTH, DISPLAY_HEIGHT))
+		self.game_background = assets.registry.background("game_bg")
 
-		player_deck, computer_deck, self.card_joker, self.main_deck, self.discard_pile = self.__initialize_distribute_cards()
-		self.card_back = pygame.transform.scale(pygame.image.load(f"game_icons/cards/card_back.png"),(CARD_WIDTH, CARD_HEIGHT))
+		computer_class = computer_class or engine.STRATEGIES[COMPUTER_STRATEGY]
+		if seats is None and state is None:
+			seats = [HUMAN] + [computer_class] * (NUM_SEATS - 1)
+		super().__init__(seed, computer_delay, computer_class, state, seats, turns.get_executor() if ponder else None)
+		self.card_back = assets.registry.card_back()
 
 		logger.info(f"In main.py/Round/__init__: Card Joker chosen: {str(self.card_joker)}")
 
-		self.computer = computer.Computer(computer_deck, self.card_joker)
-		self.computer_move = False
-
-		self.player = player.Player(player_deck, self.card_joker)
-		
-		self.dealer = dealer.Dealer(self.main_deck, self.discard_pile, self.card_joker, self.player, self.computer, self)
-
-		self.running = False
-
 		self.game_buttons = self.__initialize_game_buttons()
 
-		self.exit_game = False
-
-		self.event_text = ""
-
-
-	def __initialize_distribute_cards(self):
-		"""Builds all the `Card` objects and distributes them in various decks after shuffling."""
-
-		# Build main_deck
-		main_deck = []
-		for suit in ["Diamonds","Hearts","Spades","Clubs"]:
-		    for value in range(1,NUM_CARDS_WITH_PLAYER+1):
-		        main_deck.append(Card(suit,value))
-
-		random.shuffle(main_deck)
+		self.renderer = renderer.RoundRenderer(screen, myfont, text_cache)
+		self.dirty_rects = []
 
-		# choose the card joker and remove it from deck
-		card_joker = main_deck[0]
-		card_joker.rect.x = BORDER_GAP
-		card_joker.rect.y = MID_CARD_POS
-		main_deck.remove(main_deck[0])
+		self.computer_worker = computer_worker.ComputerWorker()
+		self.scheduler = scheduler.FrameScheduler()
+		self.computer_thinking = False
+		self.message_held = False
 
-		# add the extra joker card to the deck and shuffle
-		main_deck.append(Card("Joker",0))
-		random.shuffle(main_deck)
-
-
-		player_deck=[]
-		for i in range(NUM_CARDS_WITH_PLAYER):
-			player_deck.append(main_deck[i])
-			main_deck.remove(main_deck[i])
-
-		# Define co-ordinates for player_deck
-		for i in range(NUM_CARDS_WITH_PLAYER):
-			player_deck[i].rect.x = BORDER_GAP + i * CARD_GAP
-			player_deck[i].rect.y = DISPLAY_HEIGHT - CARD_HEIGHT - BORDER_GAP
-
-		computer_deck=[]
-		for i in range(NUM_CARDS_WITH_PLAYER):
-			computer_deck.append(main_deck[i])
-			main_deck.remove(main_deck[i])
+		self.exit_game = False
 
 
-		discard_pile=[]
-		discard_pile.append(main_deck[0])
-		main_deck.remove(main_deck[0])
+	def make_card(self, suit, val, deck = 0):
+		"""Builds a `Card` with it's image; the cards of both decks share the images."""
 
-		return player_deck, computer_deck, card_joker, main_deck, discard_pile
+		return Card(suit, val, deck)
 
 
 	def __initialize_game_buttons(self):
 		"""Builds a list of all the `Button` objects displayed during the gameplay."""
 
-		swap_button = Button(self.player.swap_cards,'swap_button', DISPLAY_WIDTH - BUTTON_WIDTH - BORDER_GAP, BUTTON_VERTICAL_HEIGHT)
+		swap_button = Button(self.player_swap,'swap_button', DISPLAY_WIDTH - BUTTON_WIDTH - BORDER_GAP, BUTTON_VERTICAL_HEIGHT)
 		
 		remove_button = Button(self.dealer.take_card_from_player,'remove_button', DISPLAY_WIDTH - BUTTON_WIDTH - BORDER_GAP, BUTTON_VERTICAL_HEIGHT + 2*BUTTON_HEIGHT)
 		
@@ -149,7 +120,7 @@ class Round:
 		
 		add_button = Button(self.dealer.give_card_to_player,'add_button', DISPLAY_WIDTH - 2*BUTTON_WIDTH - 2*BORDER_GAP, BUTTON_VERTICAL_HEIGHT)
 		
-		check_button = Button(self.player.check_group,'check_button', DISPLAY_WIDTH - 2*BUTTON_WIDTH - 2*BORDER_GAP, BUTTON_VERTICAL_HEIGHT + 2*BUTTON_HEIGHT)
+		check_button = Button(self.player_check_group,'check_button', DISPLAY_WIDTH - 2*BUTTON_WIDTH - 2*BORDER_GAP, BUTTON_VERTICAL_HEIGHT + 2*BUTTON_HEIGHT)
 		
 		go_back_button = Button(self.go_back,'go_back_button', DISPLAY_WIDTH - 2*BUTTON_WIDTH - 2*BORDER_GAP, BUTTON_VERTICAL_HEIGHT + 4*BUTTON_HEIGHT)
 
@@ -158,54 +129,27 @@ class Round:
 
 
 	def go_back(self):
-		"""Quits the indefinitely running, game-loop."""
+		"""Quits the indefinitely running, game-loop. A round that isn't over is saved, so that the next start resumes it."""
 
 		logger.info(f"In main.py/go_back: User pressed Go back button")
+		if self.result is None:
+			savegame.save(self)
 		self.running = False
 
 
 	def __display_game_screen(self, update_flag = True):
-		"""Generates the graphical game screen"""
+		"""Generates the graphical game screen and returns the rects of the screen that changed."""
 
-		screen.blit(self.game_background,(0, 0))
-
-		if not self.computer_move and update_flag:
+		if not self.computer_move and not self.message_held and update_flag:
 			if self.player.player_can_add_card:
 				self.event_text = "Select card you want to add."
 			else:
 				self.event_text = "Select card you want to remove."
 
-		event_text = myfont.render(self.event_text, 10, FONT_COLOR)
-		screen.blit(event_text, (BORDER_GAP, BORDER_GAP))
-
-		# Display Computer's card deck
-		for i in range(NUM_CARDS_WITH_PLAYER):
-			screen.blit(self.card_back, (BORDER_GAP + i*CARD_GAP, 2*BORDER_GAP + FONT_SIZE))
-
-
-		# Display Player's card deck
-		for card in self.player.player_deck:
-			screen.blit(card.image, (card.rect.x, card.rect.y))
-
-		# Display Card Joker and Main Deck
-		screen.blit(self.card_joker.image,(self.card_joker.rect.x,self.card_joker.rect.y))
-		text = myfont.render("Card Joker", 10, FONT_COLOR)
-		screen.blit(text, (BORDER_GAP/2 , MID_CARD_POS + CARD_HEIGHT))
-
-		screen.blit(self.card_back, (BORDER_GAP * 11, MID_CARD_POS))
-		text = myfont.render("Main Deck", 10, FONT_COLOR)
-		screen.blit(text,(BORDER_GAP*11 - BORDER_GAP/4, MID_CARD_POS + CARD_HEIGHT))
-
-
-		# display discard_pile if card is discarded, otherwise only display card_joker in some corner
 		if len(self.discard_pile):
 			self.discard_pile[-1].rect.x, self.discard_pile[-1].rect.y = BORDER_GAP * 22, MID_CARD_POS
-			screen.blit(self.discard_pile[-1].image,(self.discard_pile[-1].rect.x, self.discard_pile[-1].rect.y))
-			text = myfont.render("Discard Pile", 10, FONT_COLOR)
-			screen.blit(text,(BORDER_GAP*22 - BORDER_GAP, MID_CARD_POS + CARD_HEIGHT))
 
-		for button in self.game_buttons:
-			screen.blit(button.image, (button.rect.x, button.rect.y))
+		return self.renderer.draw(self)
 
 
 	def game_end_screen(self, text):
@@ -218,23 +162,24 @@ class Round:
 
 		screen.blit(self.game_background,(0, 0))
 		
-		myfont = pygame.font.SysFont("castellar", 5*FONT_SIZE)
+		myfont = assets.registry.font("castellar", 5*FONT_SIZE)
 
 		text = myfont.render(text, 10, FONT_COLOR)
 		text_pos = text.get_rect(center = (DISPLAY_WIDTH/2, DISPLAY_HEIGHT/2))
 		screen.blit(text, text_pos)
 
-		click_anywhere_font = pygame.font.SysFont("calibri", FONT_SIZE)
+		click_anywhere_font = assets.registry.font("calibri", FONT_SIZE)
 		text = click_anywhere_font.render("Click anywhere to continue", 10, FONT_COLOR)
 		text_pos = text.get_rect(center = (DISPLAY_WIDTH/2, DISPLAY_HEIGHT/2 + 10*FONT_SIZE + BORDER_GAP))
 		screen.blit(text, text_pos)
 
 		pygame.display.update()
+		self.renderer.invalidate()
 		
 		
 		end_screen_running = True
 		while end_screen_running:
-			for event in pygame.event.get():
+			for event in self.scheduler.events():
 				if(event.type == pygame.QUIT):
 					self.exit_game = True
 					end_screen_running = False
@@ -244,30 +189,45 @@ class Round:
 		self.running = False
 
 
-	def update_event_info(self, text):
-		"""Updates the message for the player."""
+	def update_event_info(self, text, delay = 0):
+		"""Updates the message for the player and keeps it on screen for `delay` seconds."""
 
 		logger.info(f"In main.py/update_event_info: text: {text}")
 		self.event_text = text
-		self.__display_game_screen(False)
-		pygame.display.update()
+		pygame.display.update(self.__display_game_screen(False))
+		if delay:
+			self.message_held = True
+			pygame.time.set_timer(computer_worker.MESSAGE_TIMEOUT_EVENT, int(delay * 1000), 1)
+
 
+	def game_logic(self, events = None):
+		"""This function is called from `game_loop` to handle the new `events` (all the queued events by default) and draw the screen."""
 
-	def game_logic(self):
-		"""This function is called from `game_loop` to check for any new events."""
+		profiler = frame_profiler.profiler
+		profiler.begin("game_logic")
 
-		if not len(self.main_deck):
-			self.dealer.shuffle_discard_pile()
-		if self.computer_move:
-			logger.info(f"In main.py/game_logic: Computer is making a move.")
-			self.update_event_info(f"Computer is making a move")
-			if self.dealer.give_card_to_computer():
-				self.game_end_screen("Computer Won!")
-			self.computer_move = False
-		for event in pygame.event.get():
+		if events is None:
+			profiler.begin("event_pump")
+			events = pygame.event.get()
+			profiler.end("event_pump")
+
+		for event in events:
 			if(event.type == pygame.QUIT):
 				self.running = False
 				self.exit_game = True
+			if(event.type == computer_worker.COMPUTER_MOVE_EVENT and event.computer is self.computers.get(self.turn_scheduler.seat)):
+				self.computer_thinking = False
+				profiler.add("computer_think", event.seconds)
+				profiler.begin("computer")
+				self.computer_turn(event.from_discard)
+				profiler.end("computer")
+			if(event.type == computer_worker.MESSAGE_TIMEOUT_EVENT):
+				self.message_held = False
+			if(event.type == pygame.KEYDOWN):
+				if(event.key == ARRANGE_KEY):
+					self.player_arrange()
+				else:
+					self.profiler_keys(event.key)
 			if(event.type == pygame.MOUSEBUTTONDOWN):
 				pos = pygame.mouse.get_pos()
 				if(event.button == 1):
@@ -279,8 +239,9 @@ class Round:
 								card.clicked=True
 					mouse = pygame.mouse.get_pos()
 
+					# while the computer is making a move, only allow the player to go back
 					for button in self.game_buttons:
-						if button.rect.collidepoint(pos):
+						if button.rect.collidepoint(pos) and (not self.computer_move or button.task == self.go_back):
 							button.task()
 
 					if(BORDER_GAP * 11 <= mouse[0] <= BORDER_GAP * 11 + CARD_WIDTH and MID_CARD_POS <= mouse[1] <= MID_CARD_POS + CARD_HEIGHT):
@@ -291,23 +252,128 @@ class Round:
 					elif(len(self.discard_pile)):
 						if(self.discard_pile[-1].rect.collidepoint(pos)):
 							self.discard_pile[-1].clicked=True
-		self.__display_game_screen()
+
+		# start the computer as soon as the player has discarded, the loop then waits for it's decision like any other event
+		if self.computer_move and not self.computer_thinking:
+			seat = self.turn_scheduler.seat
+			logger.info(f"In main.py/game_logic: Computer {seat} is making a move.")
+			self.update_event_info("Computer is making a move" if len(self.computers) == 1 else f"Computer {seat} is making a move")
+			self.computer_thinking = True
+			self.computer_worker.start(self.computers[seat], self.dealer, self.discard_pile[-1].id if len(self.discard_pile) else None)
+
+		profiler.begin("display")
+		self.dirty_rects = self.__display_game_screen()
+		profiler.end("display")
+
+		profiler.end("game_logic")
+
+
+	def profiler_keys(self, key):
+		"""Toggles the frame stats overlay or starts a cProfile capture."""
+
+		if key == frame_profiler.OVERLAY_KEY:
+			frame_profiler.profiler.toggle_overlay()
+			self.renderer.invalidate()
+		elif key == frame_profiler.CAPTURE_KEY:
+			frame_profiler.profiler.start_capture()
+
+
+	def is_active(self):
+		"""Checks if the screen has to be redrawn every frame, even without events."""
+
+		return frame_profiler.profiler.overlay
 
 
 	def game_loop(self):
-		"""The game_loop for self."""
+		"""The game_loop for self. Sleeps until the next event unless the screen is active."""
 		self.running = True
+		self.renderer.invalidate()
 
+		profiler = frame_profiler.profiler
+		events = None
 		while(self.running):
-			self.game_logic()
+			# the first frame is drawn right away, then every frame waits for something to happen
+			events = [] if events is None else self.scheduler.wait(self.is_active())
+
+			profiler.begin("frame")
+			profiler.begin("event_pump")
+			events += pygame.event.get()
+			profiler.end("event_pump")
 
-			pygame.display.update()	
+			self.game_logic(events)
+
+			if profiler.overlay:
+				self.dirty_rects.append(profiler.draw_overlay(screen, myfont))
+
+			profiler.begin("display_update")
+			pygame.display.update(self.dirty_rects)
+			profiler.end("display_update")
+			profiler.end_frame()
 
 		logger.info(f"In main.py/Round/game_loop: Exiting loop")		
-		
+
+		self.save_replay()
 		return self.exit_game, self.player_points
 
 
+	def save_replay(self):
+		"""Saves the round to REPLAY_DIR, so that it can be replayed with `replay.py` or `main.py --replay`."""
+
+		if not RECORD_REPLAYS or not len(self.actions):
+			return
+
+		os.makedirs(REPLAY_DIR, exist_ok = True)
+		file_name = os.path.join(REPLAY_DIR, f"round-{time.strftime('%Y%m%d-%H%M%S')}-{self.seed}.replay")
+		replay.save_round(self, file_name)
+		logger.info(f"In main.py/Round/save_replay: saved {len(self.actions)} actions to {file_name}")
+
+
+
+
+class ReplayRound(Round):
+	"""Steps through a `replay.Recording` in the game screen
+
+	Properties of a `ReplayRound` type object:
+	- Deals the round of the recording and shows it like a `Round`, with the computer deciding right away
+	- Plays the next recorded action on every press of space or the right arrow key, and quits on escape
+	"""
+
+	def __init__(self, player_points, computer_points, recording, scripted = False):
+		super().__init__(player_points, computer_points, recording.seed, computer_delay = 0, seats = replay.seat_classes(recording, scripted), ponder = False)
+		self.replayer = replay.Replayer(self, recording, scripted)
+
+
+	def game_logic(self, events = None):
+		"""Plays a recorded action for every key press instead of taking the user's moves."""
+
+		for event in (events if events is not None else pygame.event.get()):
+			if(event.type == pygame.QUIT):
+				self.running = False
+				self.exit_game = True
+			if(event.type == computer_worker.MESSAGE_TIMEOUT_EVENT):
+				self.message_held = False
+			if(event.type == pygame.KEYDOWN):
+				if(event.key == pygame.K_ESCAPE):
+					self.running = False
+				elif(event.key in (pygame.K_SPACE, pygame.K_RIGHT)):
+					if self.replayer.is_done():
+						self.update_event_info(f"End of the replay")
+					else:
+						try:
+							played = self.replayer.step()
+							self.update_event_info(f"Replayed {played}")
+						except replay.ReplayError as error:
+							logger.error(f"In main.py/ReplayRound/game_logic: {error}")
+							self.update_event_info(f"Replay diverged, see the log")
+				else:
+					self.profiler_keys(event.key)
+		self.dirty_rects = self.renderer.draw(self)
+
+
+	def save_replay(self):
+		pass
+
+
 
 
 
@@ -315,23 +381,30 @@ class Round:
 class Game:
 	"""Handles user interaction in the menu and instantiates different `Rounds` for user to play
 	- Every new instance of game, loads the user with `game_constants.INITIAL_PLAYER_POINTS`
+	- Shows the menu right away and starts the music once it is loaded on a background thread
+	- Logs the time from the start of the process to the first menu frame
+	- Only redraws the menu after a click, and sleeps until the next event in between
 	"""
 
-	def __init__(self, initial_player_points, initial_computer_points):
+	def __init__(self, initial_player_points, initial_computer_points, exit_after_first_frame = False):
 
-		pygame.mixer.music.load(MUSIC_NAME)
-		pygame.mixer.music.play(loops = -1)
-		pygame.mixer.music.set_volume(0.5)
 		self.is_music_on = True
+		self.music_loaded = False
+		self.music_thread = threading.Thread(target = self.__load_music, name = "music", daemon = True)
+		self.music_thread.start()
+
+		self.startup_time = None
+		self.exit_after_first_frame = exit_after_first_frame
 
 		self.player_points = initial_player_points
 		self.computer_points = initial_computer_points
 
-		self.menu_background = pygame.transform.scale(pygame.image.load(f"game_icons/in_game/start_menu_bg.jpg"),(DISPLAY_WIDTH, DISPLAY_HEIGHT))
+		self.menu_background = assets.registry.background("start_menu_bg")
 
 		self.running = True
 
 		self.menu_buttons = self.__initialize_menu_buttons()
+		self.scheduler = scheduler.FrameScheduler()
 
 
 	def __initialize_menu_buttons(self):
@@ -346,9 +419,19 @@ class Game:
 
 
 	def start_game(self):
-		"""Initializes a `Round` object to start a new game round."""
-
-		round = Round(self.player_points, self.computer_points)
+		"""Initializes a `Round` object to start a new game round, or to resume the round saved when the user went back."""
+
+		round = None
+		try:
+			state = savegame.take()
+			if state is not None:
+				round = Round(self.player_points, self.computer_points, state = state)
+				logger.info(f"In main.py/Game/start_game: resumed the saved round of seed {state['seed']}")
+		except engine.SnapshotError as error:
+			logger.error(f"In main.py/Game/start_game: can't resume the saved round: {error}")
+
+		if round is None:
+			round = Round(self.player_points, self.computer_points)
 		flag, self.player_points = round.game_loop()
 		if flag:
 			self.running = False
@@ -360,15 +443,34 @@ class Game:
 		self.running = False
 
 
+	def __load_music(self):
+		"""Initializes the mixer and loads the music, then plays it unless the user switched it off meanwhile."""
+
+		try:
+			pygame.mixer.init()
+			pygame.mixer.music.load(MUSIC_NAME)
+			pygame.mixer.music.set_volume(0.5)
+		except pygame.error as error:
+			logger.error(f"In main.py/Game/__load_music: music not available: {error}")
+			return
+
+		self.music_loaded = True
+		if self.is_music_on:
+			pygame.mixer.music.play(loops = -1)
+		logger.info(f"In main.py/Game/__load_music: music loaded")
+
+
 	def switch_music(self):
 		"""Switches the music."""
 
 		if self.is_music_on:
 			self.is_music_on = False
-			pygame.mixer.music.stop()
+			if self.music_loaded:
+				pygame.mixer.music.stop()
 		else:
 			self.is_music_on = True
-			pygame.mixer.music.play(loops = -1)
+			if self.music_loaded:
+				pygame.mixer.music.play(loops = -1)
 		logger.info(f"In main.py/switch_music: is_music_on: {self.is_music_on}")
 
 
@@ -380,22 +482,36 @@ class Game:
 		for button in self.menu_buttons:
 			screen.blit(button.image,(button.rect.x,button.rect.y))
 
-		myfont = pygame.font.SysFont("castellar", 5*FONT_SIZE)
-		text = myfont.render("In Spades", 10, FONT_COLOR)
+		text = text_cache.render(assets.registry.font("castellar", 5*FONT_SIZE), "In Spades")
 		text_pos = text.get_rect(center = (DISPLAY_WIDTH/2, 5*FONT_SIZE + BORDER_GAP))
 		screen.blit(text, text_pos)
 
-		myfont = pygame.font.SysFont("castellar", 30)
-		text = myfont.render(f"Chips Owned: {self.player_points}", 10, FONT_COLOR)
+		text = text_cache.render(assets.registry.font("castellar", 30), f"Chips Owned: {self.player_points}")
 		screen.blit(text, (DISPLAY_WIDTH-350, DISPLAY_HEIGHT-3*FONT_SIZE))
 
 
 	def game_loop(self):
 		"""Game-loop for the game."""
 
+		redraw = True
 		while(self.running):
-			pygame.time.delay(50)
-			for event in pygame.event.get():
+			if redraw:
+				redraw = False
+				self.display_menu_screen()
+				pygame.display.update()
+
+				if self.startup_time is None:
+					self.startup_time = time.perf_counter() - STARTUP_START
+					logger.info(f"In main.py/Game/game_loop: first frame shown {self.startup_time:.3f}s after start")
+					game_log.event("startup", seconds = self.startup_time)
+					if self.exit_after_first_frame:
+						self.running = False
+						continue
+
+			# the menu only changes after a click (or when the window needs to be drawn again), so sleep until an event,
+			# except while the images are still loading a few per frame
+			warming_up = assets.registry.warm_up_step()
+			for event in self.scheduler.events(warming_up):
 				if(event.type == pygame.QUIT):
 					self.running = False
 				if(event.type == pygame.MOUSEBUTTONDOWN):
@@ -404,9 +520,9 @@ class Game:
 						for button in self.menu_buttons:
 							if button.rect.collidepoint(pos):
 								button.task()
-			self.display_menu_screen()
-
-			pygame.display.update()
+								redraw = True
+				if(event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)):
+					redraw = True
 
 		logger.info(f"In main.py/Game/game_loop: Exiting loop")
 
@@ -417,13 +533,10 @@ class Game:
 
 if __name__ == '__main__':
 
-	pygame.init()
-	pygame.mixer.init()
-	logging.basicConfig(level = logging.INFO)
-
-	logger = logging.getLogger('logger.main')
-	handler = logging.FileHandler('GameLog.log')
-	logger.addHandler(handler)
+	# the mixer is initialized with the music, on a background thread (see `Game`)
+	pygame.display.init()
+	pygame.font.init()
+	logger = game_log.setup()
 
 	# TODO: Make accessors and mutators
 	# TODO: Write test code
@@ -433,12 +546,24 @@ if __name__ == '__main__':
 
 	screen = pygame.display.set_mode((DISPLAY_WIDTH, DISPLAY_HEIGHT))
 	pygame.display.set_caption("In Spades")
-	myfont = pygame.font.SysFont("monospace", FONT_SIZE)
-
-	logger.info(f"In main.py/__'main'__: initializing instance of `Game`")
-	game = Game(INITIAL_PLAYER_POINTS, INITIAL_COMPUTER_POINTS)
-	game.game_loop()
+	myfont = assets.registry.font("monospace", FONT_SIZE)
+	text_cache = renderer.TextCache()
+
+	logger.info(f"In main.py/__'main'__: loading the images between the frames of the menu")
+	assets.registry.start_warm_up()
+
+	if len(sys.argv) > 2 and sys.argv[1] == "--replay":
+		logger.info(f"In main.py/__'main'__: replaying {sys.argv[2]}")
+		replay_round = ReplayRound(INITIAL_PLAYER_POINTS, INITIAL_COMPUTER_POINTS, replay.load(sys.argv[2]), "--scripted" in sys.argv)
+		replay_round.game_loop()
+	else:
+		logger.info(f"In main.py/__'main'__: initializing instance of `Game`")
+		game = Game(INITIAL_PLAYER_POINTS, INITIAL_COMPUTER_POINTS, "--startup-time" in sys.argv)
+		game.game_loop()
+		if game.exit_after_first_frame:
+			print(f"startup time: {game.startup_time:.3f}s")
 
 	pygame.quit()
 
 	logger.info(f"In main.py/__'main'__: ---------------------------------")
+	game_log.shutdown()
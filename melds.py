@@ -0,0 +1,637 @@
+import itertools
+import logging
+import random
+import sys
+from array import array
+
+import cards
+from game_constants import *
+
+
+
+MIN_GROUP_SIZE = 3
+MIN_SECOND_LIFE_SIZE = 4
+MAX_SET_SIZE = len(cards.SUITS)
+MAX_CACHE_SIZE = 200000
+
+# bits of the count of every value in the counts of `encode`, enough for the 8 cards of a value in two decks
+COUNT_BITS = 4
+COUNT_MASK = (1 << COUNT_BITS) - 1
+# above the counts, the # of suits of every value held twice (only with two decks), since a set needs different suits
+DOUBLES_SHIFT = COUNT_BITS * cards.NUM_VALUES
+DOUBLE_BITS = 3
+DOUBLE_MASK = (1 << DOUBLE_BITS) - 1
+
+PURE_LIFE = "pure_life"
+SECOND_LIFE = "second_life"
+LIFE = "life"
+SET = "set"
+LEFTOVER = "leftover"
+
+# value used in plans for a card played by a joker
+JOKER_SLOT = 0
+# value used in plans for a card that isn't in the hand yet
+MISSING_SLOT = -1
+
+KIND_ORDER = (PURE_LIFE, SECOND_LIFE, LIFE, SET)
+
+_cache = {}
+_arrange_cache = {}
+# a plan of None is cached too; one lookup (unlike `in` then `[]`) is safe when another thread clears the cache in between
+_MISSING = object()
+
+# lowest and highest value and the # of values from the lowest to the highest of every value mask
+_LOW_VALUES = array("B", [0]) * (1 << cards.NUM_VALUES)
+_HIGH_VALUES = array("B", [0]) * (1 << cards.NUM_VALUES)
+_SPANS = array("B", [0]) * (1 << cards.NUM_VALUES)
+for _values in range(1, 1 << cards.NUM_VALUES):
+	_LOW_VALUES[_values] = (_values & -_values).bit_length()
+	_HIGH_VALUES[_values] = _values.bit_length()
+	_SPANS[_values] = _HIGH_VALUES[_values] - _LOW_VALUES[_values] + 1
+
+
+
+def encode(hand, joker_val):
+	"""Returns the canonical encoding (value counts, # of jokers) of the hand `hand` (see `cards`).
+	Suits only matter for a set, which needs different suits, so the counts also have the # of suits of every value held twice
+	(see `_take`); hands with the same counts are solved the same way."""
+
+	jokers = hand & cards.joker_mask(joker_val)
+	naturals = hand & ~jokers
+
+	counts = 0
+	for val in range(1, cards.NUM_VALUES+1):
+		counts |= cards.count_value(naturals, val) << (COUNT_BITS * (val - 1))
+
+	# a suit is held twice only with two decks; one deck hands have no doubles and keep the same counts
+	if naturals >> cards.CARDS_PER_DECK:
+		doubles = naturals & naturals >> cards.CARDS_PER_DECK
+		for val in range(1, cards.NUM_VALUES+1):
+			counts |= cards.count_value(doubles, val) << (DOUBLES_SHIFT + DOUBLE_BITS * (val - 1))
+	return counts, cards.popcount(jokers)
+
+
+def solve(hand, joker_val):
+	"""Finds a partition of all the cards in `hand` into a pure life, a second life of atleast 4 cards and other valid lives and sets.
+	Returns the partition as a list of (kind, cards) with kind in (PURE_LIFE, SECOND_LIFE, LIFE, SET), or None if there is none.
+	The cards of a life are in the order of their values, with the jokers where they are used."""
+
+	counts, num_jokers = encode(hand, joker_val)
+	plan = _search(counts, num_jokers, True, True)
+	if plan is None:
+		return None
+	return _assign(plan, hand, joker_val)
+
+
+def is_winning(hand, joker_val):
+	"""Checks if all the cards in `hand` can be partitioned into winning groups."""
+
+	counts, num_jokers = encode(hand, joker_val)
+	return _search(counts, num_jokers, True, True) is not None
+
+
+def find_winning_discard(hand, joker_val):
+	"""Finds a card of `hand` (e.g. 14 cards after a draw) whose discard leaves a winning hand.
+	Returns (card, partition of the remaining cards), or None if no discard wins."""
+
+	tried = set()
+	for card in cards.from_mask(hand):
+		# discarding any joker or any card of the same value leaves the same canonical hand
+		key = JOKER_SLOT if cards.is_joker(card, joker_val) else cards.VALUES[card]
+		if key in tried:
+			continue
+		tried.add(key)
+
+		remaining = hand & ~cards.BITS[card]
+		if is_winning(remaining, joker_val):
+			return card, solve(remaining, joker_val)
+	return None
+
+
+def classify_group(group, joker_val, need_pure = True, need_second = True):
+	"""Classifies the cards of the mask `group` as a single group in constant time (no search, a few bit operations and table lookups).
+	Returns (kind, placement): kind is the best of PURE_LIFE (only if `need_pure`), SECOND_LIFE (only if `need_second`), LIFE and SET
+	that the cards form, or None if they form no group. placement is a list of (card, value it plays) in the order of the group:
+	jokers fill the missing values of a life (then extend it upwards, then downwards) or play the value of a set."""
+
+	jokers = group & cards.joker_mask(joker_val)
+	naturals = group & ~jokers
+	num_jokers = cards.popcount(jokers)
+	num_naturals = cards.popcount(naturals)
+	size = num_jokers + num_naturals
+
+	if size < MIN_GROUP_SIZE:
+		return None, []
+
+	values = cards.value_mask(naturals)
+	num_values = cards.popcount(values)
+
+	# a life has one card per value and it's values, with the jokers, fit in a range of `size` values
+	if num_values == num_naturals and size <= cards.NUM_VALUES and (not values or _SPANS[values] <= size):
+		if not num_jokers and need_pure:
+			kind = PURE_LIFE
+		elif size >= MIN_SECOND_LIFE_SIZE and need_second:
+			kind = SECOND_LIFE
+		else:
+			kind = LIFE
+		return kind, _place_life(naturals, jokers, values, size)
+
+	if num_values == 1 and size <= MAX_SET_SIZE and cards.popcount(cards.fold_decks(naturals)) == num_naturals:
+		val = _LOW_VALUES[values]
+		return SET, [(card, val) for card in cards.from_mask(naturals) + cards.from_mask(jokers)]
+
+	return None, []
+
+
+def _place_life(naturals, jokers, values, size):
+	"""Returns the (card, value) of a life of `size` cards made of the cards of `naturals` and `jokers`."""
+
+	if values:
+		low, high = _LOW_VALUES[values], _HIGH_VALUES[values]
+	else:
+		low, high = 1, 0
+
+	extra = size - (high - low + 1)
+	up = min(extra, cards.NUM_VALUES - high)
+	low -= extra - up
+
+	natural_cards = {cards.VALUES[card]: card for card in cards.from_mask(naturals)}
+	joker_cards = cards.from_mask(jokers)
+
+	placement = []
+	for val in range(low, low + size):
+		card = natural_cards.get(val)
+		placement.append((card if card is not None else joker_cards.pop(), val))
+	return placement
+
+
+def arrange(hand, joker_val, need_pure = True, need_second = True, num_discards = 0):
+	"""Finds the grouping of `hand` that is the fewest cards away from winning.
+	The distance is the least k such that the hand, after discarding `num_discards` cards (e.g. 1 after a draw), is winning once k of it's cards
+	are replaced by k well chosen cards. Each turn replaces atmost one card, so it is a lower bound on the # of turns left.
+	Returns (distance, partition, leftovers): partition is a list of (kind, cards) ordered by KIND_ORDER, where None marks a card that is missing,
+	and leftovers are the cards in no group, by value."""
+
+	counts, num_jokers = encode(hand, joker_val)
+	for distance in range(cards.NUM_VALUES + 1):
+		plan = _arrange_search(counts, num_jokers, distance + num_discards, distance, need_pure, need_second, joker_val)
+		if plan is not None:
+			break
+
+	partition = _assign(plan, hand, joker_val)
+	leftovers = [grp[0] for kind, grp in partition if kind == LEFTOVER]
+	leftovers.sort(key = cards.value)
+	partition = [(kind, grp) for kind, grp in partition if kind != LEFTOVER]
+	partition.sort(key = lambda group: KIND_ORDER.index(group[0]))
+	return distance, partition, leftovers
+
+
+def clear_cache():
+	_cache.clear()
+	_arrange_cache.clear()
+
+
+def _count(counts, val):
+	return (counts >> (COUNT_BITS * (val - 1))) & COUNT_MASK
+
+
+def _suits(counts, val):
+	"""Returns the # of different suits of the cards of value `val`, the most cards of a set of that value."""
+
+	if counts >> DOUBLES_SHIFT:
+		return _count(counts, val) - ((counts >> (DOUBLES_SHIFT + DOUBLE_BITS * (val - 1))) & DOUBLE_MASK)
+	return (counts >> (COUNT_BITS * (val - 1))) & COUNT_MASK
+
+
+def _take(counts, val, num):
+	"""Returns `counts` without `num` cards of value `val` of different suits.
+	They are taken from the suits held twice first, which keeps the most suits for a set (`_assign` does the same)."""
+
+	if counts >> DOUBLES_SHIFT:
+		doubles = min(num, (counts >> (DOUBLES_SHIFT + DOUBLE_BITS * (val - 1))) & DOUBLE_MASK)
+		counts -= doubles << (DOUBLES_SHIFT + DOUBLE_BITS * (val - 1))
+	return counts - (num << (COUNT_BITS * (val - 1)))
+
+
+def _search(counts, num_jokers, need_pure, need_second):
+	"""Returns a plan (tuple of (kind, values)) that uses up all the value counts in `counts` and `num_jokers` jokers,
+	or None. JOKER_SLOT in values marks a joker."""
+
+	key = (counts, num_jokers, need_pure, need_second)
+	plan = _cache.get(key, _MISSING)
+	if plan is not _MISSING:
+		return plan
+
+	if len(_cache) >= MAX_CACHE_SIZE:
+		_cache.clear()
+
+	plan = _search_uncached(counts, num_jokers, need_pure, need_second)
+	_cache[key] = plan
+	return plan
+
+
+def _search_uncached(counts, num_jokers, need_pure, need_second):
+
+	if not counts:
+		# only jokers are left; they can form a group of their own
+		if need_pure:
+			return None
+		if need_second:
+			if num_jokers >= MIN_SECOND_LIFE_SIZE:
+				return ((SECOND_LIFE, (JOKER_SLOT,) * num_jokers),)
+			return None
+		if num_jokers == 0:
+			return ()
+		if num_jokers >= MIN_GROUP_SIZE:
+			return ((LIFE, (JOKER_SLOT,) * num_jokers),)
+		return None
+
+	# the card with the lowest value must either be in a set or start a life
+	low_val = 1
+	while not _count(counts, low_val):
+		low_val += 1
+
+	# sets of the lowest value
+	for num_naturals in range(min(_suits(counts, low_val), MAX_SET_SIZE), 0, -1):
+		for num_set_jokers in range(max(0, MIN_GROUP_SIZE - num_naturals), min(num_jokers, MAX_SET_SIZE - num_naturals) + 1):
+			rest = _search(_take(counts, low_val, num_naturals), num_jokers - num_set_jokers, need_pure, need_second)
+			if rest is not None:
+				return ((SET, (low_val,) * num_naturals + (JOKER_SLOT,) * num_set_jokers),) + rest
+
+	# lives starting with the lowest value
+	return _extend_life(_take(counts, low_val, 1), num_jokers, need_pure, need_second, (low_val,), low_val + 1, 0)
+
+
+def _extend_life(counts, num_jokers, need_pure, need_second, life, next_val, jokers_used):
+	"""Tries to close the `life` built so far, or to extend it with the next value or a joker."""
+
+	if len(life) >= MIN_GROUP_SIZE:
+		roles = []
+		if need_pure and not jokers_used:
+			roles.append(PURE_LIFE)
+		if need_second and len(life) >= MIN_SECOND_LIFE_SIZE:
+			roles.append(SECOND_LIFE)
+		roles.append(LIFE)
+
+		for role in roles:
+			rest = _search(counts, num_jokers, need_pure and role != PURE_LIFE, need_second and role != SECOND_LIFE)
+			if rest is not None:
+				return ((role, life),) + rest
+
+	if len(life) >= cards.NUM_VALUES:
+		return None
+
+	if next_val <= cards.NUM_VALUES and _count(counts, next_val):
+		plan = _extend_life(_take(counts, next_val, 1), num_jokers, need_pure, need_second, life + (next_val,), next_val + 1, jokers_used)
+		if plan is not None:
+			return plan
+
+	if num_jokers:
+		return _extend_life(counts, num_jokers - 1, need_pure, need_second, life + (JOKER_SLOT,), next_val + 1, jokers_used + 1)
+
+	return None
+
+
+def _arrange_search(counts, num_jokers, drops, missing, need_pure, need_second, joker_val):
+	"""Like `_search`, but atmost `drops` cards can be left out of the groups (as LEFTOVER) and atmost `missing` cards
+	that aren't in the hand (MISSING_SLOT) can be used in them. Returns a plan or None."""
+
+	key = (counts, num_jokers, drops, missing, need_pure, need_second, joker_val)
+	plan = _arrange_cache.get(key, _MISSING)
+	if plan is not _MISSING:
+		return plan
+
+	if len(_arrange_cache) >= MAX_CACHE_SIZE:
+		_arrange_cache.clear()
+
+	plan = _arrange_search_uncached(counts, num_jokers, drops, missing, need_pure, need_second, joker_val)
+	_arrange_cache[key] = plan
+	return plan
+
+
+def _arrange_search_uncached(counts, num_jokers, drops, missing, need_pure, need_second, joker_val):
+
+	if not counts:
+		# the missing cards and the jokers left form the lives still needed; other jokers make a life or are left over
+		plan = ()
+		if need_pure:
+			if missing < MIN_GROUP_SIZE:
+				return None
+			missing -= MIN_GROUP_SIZE
+			plan += ((PURE_LIFE, (MISSING_SLOT,) * MIN_GROUP_SIZE),)
+		if need_second:
+			num_missing = max(0, MIN_SECOND_LIFE_SIZE - num_jokers)
+			if num_missing > missing:
+				return None
+			plan += ((SECOND_LIFE, (JOKER_SLOT,) * num_jokers + (MISSING_SLOT,) * num_missing),)
+			num_jokers = 0
+		if num_jokers >= MIN_GROUP_SIZE:
+			plan += ((LIFE, (JOKER_SLOT,) * num_jokers),)
+		elif num_jokers:
+			if num_jokers > drops:
+				return None
+			plan += ((LEFTOVER, (JOKER_SLOT,)),) * num_jokers
+		return plan
+
+	low_val = 1
+	while not _count(counts, low_val):
+		low_val += 1
+
+	# sets of the lowest value, completed by jokers and then by missing cards
+	for num_naturals in range(min(_suits(counts, low_val), MAX_SET_SIZE), 0, -1):
+		for num_set_jokers in range(min(num_jokers, MAX_SET_SIZE - num_naturals) + 1):
+			num_missing = max(0, MIN_GROUP_SIZE - num_naturals - num_set_jokers)
+			if num_missing > missing:
+				continue
+			rest = _arrange_search(_take(counts, low_val, num_naturals), num_jokers - num_set_jokers, drops, missing - num_missing, need_pure, need_second, joker_val)
+			if rest is not None:
+				return ((SET, (low_val,) * num_naturals + (JOKER_SLOT,) * num_set_jokers + (MISSING_SLOT,) * num_missing),) + rest
+
+	# lives starting with the lowest value
+	plan = _arrange_life(_take(counts, low_val, 1), num_jokers, drops, missing, need_pure, need_second, joker_val, (low_val,), low_val + 1, 0)
+	if plan is not None:
+		return plan
+
+	# a pure life that can't grow upwards (e.g. the joker's value comes next) can start with missing cards below the lowest value
+	if need_pure:
+		for num_below in range(1, min(missing, MIN_GROUP_SIZE - 1, low_val - 1) + 1):
+			if low_val - num_below <= joker_val < low_val:
+				break
+			plan = _arrange_life(_take(counts, low_val, 1), num_jokers, drops, missing - num_below, need_pure, need_second, joker_val, (MISSING_SLOT,) * num_below + (low_val,), low_val + 1, 0)
+			if plan is not None:
+				return plan
+
+	# or the card is left over
+	if drops:
+		rest = _arrange_search(_take(counts, low_val, 1), num_jokers, drops - 1, missing, need_pure, need_second, joker_val)
+		if rest is not None:
+			return ((LEFTOVER, (low_val,)),) + rest
+
+	return None
+
+
+def _arrange_life(counts, num_jokers, drops, missing, need_pure, need_second, joker_val, life, next_val, jokers_used):
+	"""Like `_extend_life`, for `_arrange_search`. A missing card keeps the life pure unless it has the joker's value."""
+
+	if len(life) >= MIN_GROUP_SIZE:
+		roles = []
+		if need_pure and not jokers_used:
+			roles.append(PURE_LIFE)
+		if need_second and len(life) >= MIN_SECOND_LIFE_SIZE:
+			roles.append(SECOND_LIFE)
+		roles.append(LIFE)
+
+		for role in roles:
+			rest = _arrange_search(counts, num_jokers, drops, missing, need_pure and role != PURE_LIFE, need_second and role != SECOND_LIFE, joker_val)
+			if rest is not None:
+				return ((role, life),) + rest
+
+	if len(life) >= cards.NUM_VALUES:
+		return None
+
+	if next_val <= cards.NUM_VALUES and _count(counts, next_val):
+		plan = _arrange_life(_take(counts, next_val, 1), num_jokers, drops, missing, need_pure, need_second, joker_val, life + (next_val,), next_val + 1, jokers_used)
+		if plan is not None:
+			return plan
+
+	if num_jokers:
+		plan = _arrange_life(counts, num_jokers - 1, drops, missing, need_pure, need_second, joker_val, life + (JOKER_SLOT,), next_val + 1, jokers_used + 1)
+		if plan is not None:
+			return plan
+
+	if missing:
+		# past the highest value the life grows downwards
+		missing_val = next_val if next_val <= cards.NUM_VALUES else life[0] - (next_val - cards.NUM_VALUES)
+		return _arrange_life(counts, num_jokers, drops, missing - 1, need_pure, need_second, joker_val, life + (MISSING_SLOT,), next_val + 1, jokers_used + (missing_val == joker_val))
+
+	return None
+
+
+def _assign(plan, hand, joker_val):
+	"""Replaces the values in `plan` by the actual cards of `hand`."""
+
+	jokers = hand & cards.joker_mask(joker_val)
+	naturals = hand & ~jokers
+
+	joker_cards = cards.from_mask(jokers)
+	natural_cards = {}
+	for card in cards.from_mask(naturals):
+		natural_cards.setdefault(cards.VALUES[card], []).append(card)
+
+	partition = []
+	for kind, values in plan:
+		grp = []
+		for val in values:
+			if val == MISSING_SLOT:
+				grp.append(None)
+			elif val == JOKER_SLOT:
+				grp.append(joker_cards.pop())
+			else:
+				grp.append(_take_card(natural_cards[val], grp if kind == SET else ()))
+		partition.append((kind, grp))
+	return partition
+
+
+def _take_card(value_cards, grp):
+	"""Removes and returns a card of `value_cards` whose suit no card of `grp` has, from a suit held twice if there is one (like `_take`)."""
+
+	suits = [cards.SUIT_INDICES[card] for card in value_cards]
+	used = {cards.SUIT_INDICES[card] for card in grp}
+	# the last card among equals, like `list.pop`
+	pos = max((i for i in reversed(range(len(value_cards))) if suits[i] not in used), key = lambda i: suits.count(suits[i]))
+	return value_cards.pop(pos)
+
+
+
+
+class MeldIndex:
+	"""Enumerates every life and set of the deck for a round whose card joker has value `joker_val`
+
+	Properties of a `MeldIndex` type object:
+	- Meld `i` is described by self.kinds[i] (PURE_LIFE, LIFE or SET), self.values[i] (13-bit value mask) and self.sizes[i]
+	- A life is a range of values; it is pure only if it doesn't need a value played by a joker
+	- A set is 3 or 4 cards of the same value
+	- self.value_melds[val] has the melds that use a card of value `val`
+	- self.completions[values] has the values that complete a 3 card meld with 2 values of the value mask `values`
+	"""
+
+	def __init__(self, joker_val):
+		self.joker_val = joker_val
+		self.joker_mask = cards.joker_mask(joker_val)
+
+		self.kinds = []
+		self.values = array("H")
+		self.sizes = array("B")
+
+		for length in range(MIN_GROUP_SIZE, cards.NUM_VALUES+1):
+			for low_val in range(1, cards.NUM_VALUES - length + 2):
+				values = ((1 << length) - 1) << (low_val - 1)
+				is_pure = not values & (1 << (joker_val - 1))
+				self.__add_meld(PURE_LIFE if is_pure else LIFE, values, length)
+
+		for val in range(1, cards.NUM_VALUES+1):
+			if val == joker_val:
+				continue
+			for size in range(MIN_GROUP_SIZE, MAX_SET_SIZE+1):
+				self.__add_meld(SET, 1 << (val - 1), size)
+
+		self.value_melds = [array("H") for val in range(cards.NUM_VALUES+1)]
+		for i in range(len(self.kinds)):
+			for val in range(1, cards.NUM_VALUES+1):
+				if self.values[i] & (1 << (val - 1)):
+					self.value_melds[val].append(i)
+
+		# values (other than the joker value) completing a life of 3 from 2 values in hand
+		natural_values = cards.FULL_VALUE_MASK & ~(1 << (joker_val - 1))
+		self.completions = array("H", [0]) * (1 << cards.NUM_VALUES)
+		for values in range(1 << cards.NUM_VALUES):
+			values_in_hand = values & natural_values
+			completing = (values_in_hand << 1 & values_in_hand << 2) | (values_in_hand << 1 & values_in_hand >> 1) | (values_in_hand >> 1 & values_in_hand >> 2)
+			self.completions[values] = completing & natural_values & ~values_in_hand
+
+
+	def __add_meld(self, kind, values, size):
+		self.kinds.append(kind)
+		self.values.append(values)
+		self.sizes.append(size)
+
+
+	def card_melds(self, card):
+		"""Returns the melds that `card` can be a part of. Jokers can be a part of every meld."""
+
+		if cards.is_joker(card, self.joker_val):
+			return range(len(self.kinds))
+		return self.value_melds[cards.VALUES[card]]
+
+
+	def missing_values(self, meld, hand):
+		"""Returns the value mask of the values that the hand `hand` doesn't have for `meld`.
+		For a set the missing value is only reported if the hand has less cards of the value than the set needs."""
+
+		naturals = hand & ~self.joker_mask
+		if self.kinds[meld] == SET:
+			val = self.values[meld].bit_length()
+			if cards.count_value(naturals, val) >= self.sizes[meld]:
+				return 0
+			return self.values[meld]
+		return self.values[meld] & ~cards.value_mask(naturals)
+
+
+	def missing_cards(self, meld, hand, seen = 0):
+		"""Returns the mask of the cards, not in `hand` or `seen`, that can fill the missing values of `meld`."""
+
+		missing = self.missing_values(meld, hand)
+		result = 0
+		for val in range(1, cards.NUM_VALUES+1):
+			if missing & (1 << (val - 1)):
+				result |= cards.VALUE_MASKS[val]
+		return result & ~hand & ~seen & ~self.joker_mask
+
+
+	def needed_values(self, hand):
+		"""Returns the value mask of the values that complete a life or a set of 3 with 2 cards of `hand`."""
+
+		naturals = hand & ~self.joker_mask
+		values = cards.value_mask(naturals)
+		pairs = cards.value_mask_at_least(naturals, 2)
+		return self.completions[values] | pairs
+
+
+
+
+_meld_indexes = {}
+
+
+def get_meld_index(joker_val):
+	"""Returns the `MeldIndex` for `joker_val`, building it once per process."""
+
+	meld_index = _meld_indexes.get(joker_val)
+	if meld_index is None:
+		meld_index = _meld_indexes[joker_val] = MeldIndex(joker_val)
+		logger.info(f"In melds.py/get_meld_index: built index of {len(meld_index.kinds)} melds for joker value {joker_val}")
+	return meld_index
+
+
+
+def _brute_force_winning(hand, joker_val, need_pure = True, need_second = True, memo = None):
+	"""Checks if `hand` is winning by trying every group (see `classify_group`) of it's lowest card, without the canonical encoding.
+	Exponential in the size of the hand, only for `check_two_decks`."""
+
+	if not hand:
+		return not need_pure and not need_second
+	if memo is None:
+		memo = {}
+	key = (hand, need_pure, need_second)
+	if key in memo:
+		return memo[key]
+
+	low_bit = hand & -hand
+	others = cards.from_mask(hand ^ low_bit)
+	winning = False
+	for size in range(MIN_GROUP_SIZE - 1, len(others) + 1):
+		for grp_cards in itertools.combinations(others, size):
+			grp = low_bit | cards.to_mask(grp_cards)
+			kind = classify_group(grp, joker_val, need_pure, need_second)[0]
+			if kind is None:
+				continue
+			# a group can also play a role below the best one
+			kinds = [kind]
+			if kind == PURE_LIFE and need_second and size + 1 >= MIN_SECOND_LIFE_SIZE:
+				kinds.append(SECOND_LIFE)
+			if kind in (PURE_LIFE, SECOND_LIFE):
+				kinds.append(LIFE)
+			for kind in kinds:
+				if _brute_force_winning(hand ^ grp, joker_val, need_pure and kind != PURE_LIFE, need_second and kind != SECOND_LIFE, memo):
+					winning = True
+					break
+			if winning:
+				break
+		if winning:
+			break
+
+	memo[key] = winning
+	return winning
+
+
+def _is_valid(grp, joker_val, kind):
+	"""Checks if the cards of the mask `grp` form a group of `kind` (a few jokers with one card are both a life and a set)."""
+
+	if kind == SET:
+		naturals = grp & ~cards.joker_mask(joker_val)
+		return MIN_GROUP_SIZE <= cards.popcount(grp) <= MAX_SET_SIZE and (not naturals or cards.is_set(naturals))
+	return classify_group(grp, joker_val, kind == PURE_LIFE, kind == SECOND_LIFE)[0] == kind
+
+
+def check_two_decks(num_hands, seed = 0):
+	"""Compares `is_winning` and `solve` with `_brute_force_winning` on `num_hands` random hands of two decks, dealt from a few values
+	so that they often hold a card twice. Returns the hands (hand, joker value) where they differ or where a set of `solve` repeats a suit."""
+
+	rng = random.Random(seed)
+	pool = [card for card in range(cards.NUM_CARDS) if cards.VALUES[card] <= 5]
+	failures = []
+	for i in range(num_hands):
+		hand = cards.to_mask(rng.sample(pool, NUM_CARDS_WITH_PLAYER))
+		joker_val = rng.randint(1, 6)
+
+		partition = solve(hand, joker_val)
+		valid = all(_is_valid(cards.to_mask(grp), joker_val, kind) for kind, grp in partition or ())
+		if not valid or (partition is not None) != is_winning(hand, joker_val) or (partition is not None) != _brute_force_winning(hand, joker_val):
+			failures.append((hand, joker_val))
+	return failures
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	num_hands = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+	failures = check_two_decks(num_hands, seed)
+	for hand, joker_val in failures:
+		print(f"differs: {[cards.name(card) for card in cards.from_mask(hand)]} with joker value {joker_val}")
+	print(f"{num_hands} two deck hands checked, {len(failures)} differ")
+else:
+	logger = logging.getLogger('logger.main')
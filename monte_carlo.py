@@ -0,0 +1,304 @@
+import logging
+import multiprocessing
+import os
+import random
+import time
+
+from game_constants import *
+import card_tracker
+import cards
+import computer
+import melds
+import piles
+
+
+
+ROLLOUT_TURNS = 30
+WIN, DRAW, LOSS = 1.0, 0.5, 0.0
+# the discard of the card just drawn from the main deck, whichever it is
+DRAWN = -1
+
+_pools = {}
+
+
+
+class MonteCarloComputer(computer.Computer):
+	"""Creates a computer that chooses it's moves by playing out sampled games (information set Monte Carlo)
+
+	Properties of a `MonteCarloComputer` type object:
+	- Keeps it's cards exactly like `computer.Computer` and still discards a winning card as soon as it has one
+	- The search takes the place of the computer's `delay`, so it never sleeps
+	- Samples the cards it hasn't seen (main deck and the hidden cards of every opponent, see `card_tracker.CardTracker`)
+	  and plays the rest of the game with a fast policy for every seat, in the order of the table
+	- Picks the draw and the discard with the best estimated win rate; both are searched in `make_move`
+	  (on the `computer_worker.ComputerWorker` in the game), so `get_card` only reads the discard back
+	- Spreads the rollouts over a `multiprocessing` pool of `processes` workers for `time_budget` seconds,
+	  or plays exactly `iterations` sampled games per decision if it is set (reproducible with `seed`)
+	"""
+
+	def __init__(self, computer_deck, card_joker, delay = 0, time_budget = MONTE_CARLO_TIME_BUDGET, iterations = None, processes = None, seed = None, seat = COMPUTER_SEAT):
+		super().__init__(computer_deck, card_joker, delay, seat)
+		self.time_budget = time_budget
+		self.iterations = iterations
+		self.processes = processes if processes is not None else (os.cpu_count() or 1)
+		self.random = random.Random(seed)
+
+		# (hand before the draw, win rate of every discard) searched by the last `make_move`
+		self.plan = None
+		# the seats of the opponents in the order they play after this one, known from the dealer in `make_move`
+		self.opponents = [other for other in (PLAYER_SEAT, COMPUTER_SEAT) if other != seat]
+
+
+	def snapshot(self):
+		state = super().snapshot()
+		state["random"] = self.random.getstate()
+		return state
+
+
+	def restore(self, state):
+		super().restore(state)
+		self.random.setstate(piles.random_state(state["random"]))
+
+
+	def make_move(self, dealer, discard_pile_card):
+		"""Makes a decision to choose a card from main deck or the discard pile.
+		Returns True if computer chooses a card from discard_pile."""
+
+		num_seats = len(dealer.players) + len(dealer.computers)
+		self.opponents = [(self.tracker.seat + i) % num_seats for i in range(1, num_seats)]
+
+		choose_from_discard = False
+		if discard_pile_card is not None:
+			win_rates = self.__search(self.hand, [("draw", True), ("draw", False)], discard_pile_card)
+			choose_from_discard = win_rates[0] > win_rates[1]
+			logger.info("In monte_carlo.py/make_move: discard_pile_card: %s, win rates (discard, main deck): %s, choose_from_discard: %s", cards.name(discard_pile_card), win_rates, choose_from_discard)
+
+		# the discard after taking the top of the discard pile, or after any card of the main deck (keeping it or not)
+		if choose_from_discard:
+			hand = self.hand | cards.BITS[discard_pile_card]
+			discards = discard_candidates(hand, self.joker_val)
+			actions = [("discard", card) for card in discards]
+		else:
+			hand = self.hand
+			discards = discard_candidates(hand, self.joker_val) + [DRAWN]
+			actions = [("draw_discard", card) for card in discards]
+		self.plan = (self.hand, dict(zip(discards, self.__search(hand, actions, None))))
+		return choose_from_discard
+
+
+	def get_card(self, card):
+		"""Recieves a card from a `Dealer` object and returns the card whose discard has the best win rate, as searched by `make_move`.
+		A card drawn from the main deck is kept if the hand needs it (like `computer.Computer.choose_draw`) or if keeping a card rated better."""
+
+		needed = self.meld_index.completions[self.values] | self.pairs
+		plan, self.plan = self.plan, None
+		hand = self.hand
+		self.add_card_to_grps(card)
+
+		winning_discard = melds.find_winning_discard(self.hand, self.joker_val)
+		if winning_discard is not None:
+			card = winning_discard[0]
+			self.remove_card(card)
+			logger.info("In monte_carlo.py/get_card: computer returned %s to win, computer = %s", cards.name(card), self)
+			return card
+
+		# without a plan for this hand (e.g. the draw wasn't decided by `make_move`), searching here would block the game loop
+		if plan is None or plan[0] != hand:
+			return self.discard_card()
+
+		win_rates = plan[1]
+		best = max((discard for discard in win_rates if discard != DRAWN), key = win_rates.get)
+		if DRAWN in win_rates and not cards.is_joker(card, self.joker_val) and not needed & (1 << (cards.VALUES[card] - 1)) and win_rates[DRAWN] >= win_rates[best]:
+			best = DRAWN
+		win_rate = win_rates[best]
+		if best == DRAWN:
+			best = card
+
+		self.remove_card(best)
+		logger.info("In monte_carlo.py/get_card: computer returned %s with win rate %.2f, computer = %s", cards.name(best), win_rate, self)
+		return best
+
+
+	def __search(self, hand, actions, discard_pile_card):
+		"""Returns the estimated win rate of every action in `actions` for the hand `hand`."""
+
+		# cards buried in the discard pile are out of the game until it is reshuffled
+		unseen = self.tracker.masks[card_tracker.LIVE]
+		# the cards every opponent took from the discard pile and the # of it's cards that this seat hasn't seen
+		opponents = [(self.tracker.held.get(seat, 0), self.tracker.hidden_count(seat)) for seat in self.opponents]
+
+		num_workers = max(1, self.processes)
+		if self.iterations is not None:
+			deadline = None
+			iterations = [self.iterations // num_workers + (i < self.iterations % num_workers) for i in range(num_workers)]
+		else:
+			deadline = time.perf_counter() + self.time_budget
+			iterations = [None] * num_workers
+
+		tasks = [(hand, self.joker_val, unseen, opponents, discard_pile_card, actions, deadline, iterations[i], self.random.getrandbits(64)) for i in range(num_workers)]
+
+		if num_workers == 1:
+			results = [run_rollouts(tasks[0])]
+		else:
+			results = get_pool(num_workers).map(run_rollouts, tasks)
+
+		totals = [0.0] * len(actions)
+		plays = 0
+		for scores, num_played in results:
+			plays += num_played
+			for i in range(len(actions)):
+				totals[i] += scores[i]
+
+		logger.info("In monte_carlo.py/__search: %d sampled games for %d actions", plays, len(actions))
+		if not plays:
+			return totals
+		return [total / plays for total in totals]
+
+
+
+
+def discard_candidates(hand, joker_val):
+	"""Returns one card of every value in `hand`: never a joker, and discarding cards of the same value is the same move."""
+
+	candidates = {}
+	for card in cards.from_mask(hand):
+		if not cards.is_joker(card, joker_val):
+			candidates.setdefault(cards.VALUES[card], card)
+	return list(candidates.values())
+
+
+def get_pool(processes):
+	"""Returns a `multiprocessing.Pool` of `processes` workers, created once per process."""
+
+	pool = _pools.get(processes)
+	if pool is None:
+		pool = _pools[processes] = multiprocessing.Pool(processes)
+	return pool
+
+
+def run_rollouts(task):
+	"""Plays sampled games for every action until the deadline (or for the given # of iterations).
+	Returns (total score of every action, # of sampled games per action)."""
+
+	hand, joker_val, unseen, opponents, discard_pile_card, actions, deadline, iterations, seed = task
+
+	rng = random.Random(seed)
+	meld_index = melds.get_meld_index(joker_val)
+
+	unseen_cards = cards.from_mask(unseen)
+
+	scores = [0.0] * len(actions)
+	played = 0
+	while (iterations is None or played < iterations) and (deadline is None or time.perf_counter() < deadline):
+
+		# sample the hidden cards of every opponent and the order of the main deck
+		rng.shuffle(unseen_cards)
+		opponent_hands = []
+		num_dealt = 0
+		for held, num_hidden in opponents:
+			opponent_hands.append(held | cards.to_mask(unseen_cards[num_dealt:num_dealt + num_hidden]))
+			num_dealt += num_hidden
+		main_deck = unseen_cards[num_dealt:]
+
+		# every action is played in the same sampled game
+		for i, (kind, arg) in enumerate(actions):
+			if kind == "draw":
+				scores[i] += _play_draw(hand, opponent_hands, list(main_deck), discard_pile_card, arg, meld_index, rng)
+			elif kind == "draw_discard":
+				scores[i] += _play_draw(hand, opponent_hands, list(main_deck), None, False, meld_index, rng, arg)
+			else:
+				scores[i] += _play_out(hand & ~cards.BITS[arg], opponent_hands, list(main_deck), arg, meld_index, rng)
+		played += 1
+
+	return scores, played
+
+
+def _play_draw(hand, opponent_hands, main_deck, discard_pile_card, from_discard, meld_index, rng, discard = None):
+	"""Plays the computer's draw and discard and then the rest of the game.
+	The discard is `discard`, the drawn card if it is DRAWN, or the policy's choice if it is None."""
+
+	if from_discard:
+		card = discard_pile_card
+	elif main_deck:
+		card = main_deck.pop()
+	else:
+		return DRAW
+
+	hand |= cards.BITS[card]
+	if melds.find_winning_discard(hand, meld_index.joker_val) is not None:
+		return WIN
+
+	if discard is None:
+		discard = policy_discard(hand, meld_index, rng)
+	elif discard == DRAWN:
+		discard = card
+	return _play_out(hand & ~cards.BITS[discard], opponent_hands, main_deck, discard, meld_index, rng)
+
+
+def _play_out(hand, opponent_hands, main_deck, discard_pile_card, meld_index, rng):
+	"""Plays the game from the next opponent's turn with the policy for every seat. Returns WIN, DRAW or LOSS for the computer."""
+
+	opponent_hands = list(opponent_hands)
+	for turn in range(ROLLOUT_TURNS):
+		for i in range(len(opponent_hands)):
+			opponent_hands[i], discard_pile_card, won = _policy_turn(opponent_hands[i], main_deck, discard_pile_card, meld_index, rng)
+			if won:
+				return LOSS
+			if discard_pile_card is None:
+				return DRAW
+
+		hand, discard_pile_card, won = _policy_turn(hand, main_deck, discard_pile_card, meld_index, rng)
+		if won:
+			return WIN
+		if discard_pile_card is None:
+			return DRAW
+	return DRAW
+
+
+def _policy_turn(hand, main_deck, discard_pile_card, meld_index, rng):
+	"""Plays one turn of the rollout policy. Returns (hand, new top of the discard pile, won).
+	The top is None if the main deck ran out."""
+
+	joker_val = meld_index.joker_val
+	if discard_pile_card is not None and (cards.is_joker(discard_pile_card, joker_val) or meld_index.needed_values(hand) & (1 << (cards.VALUES[discard_pile_card] - 1))):
+		card = discard_pile_card
+	elif main_deck:
+		card = main_deck.pop()
+	else:
+		return hand, None, False
+
+	hand |= cards.BITS[card]
+	winning_discard = melds.find_winning_discard(hand, joker_val)
+	if winning_discard is not None:
+		return hand & ~cards.BITS[winning_discard[0]], winning_discard[0], True
+
+	discard = policy_discard(hand, meld_index, rng)
+	return hand & ~cards.BITS[discard], discard, False
+
+
+def policy_discard(hand, meld_index, rng):
+	"""Chooses a discard by how connected the cards are: first values with no pair and no value within 2,
+	then values with no pair and no neighbour, then any value. Never discards jokers if possible."""
+
+	naturals = hand & ~meld_index.joker_mask
+	if not naturals:
+		return cards.from_mask(hand)[0]
+
+	values = cards.value_mask(naturals)
+	pairs = cards.value_mask_at_least(naturals, 2)
+	neighbours = (values << 1) | (values >> 1)
+	near = neighbours | (values << 2) | (values >> 2)
+
+	for loose in (values & ~pairs & ~near, values & ~pairs & ~neighbours, values):
+		if loose:
+			loose_values = [val for val in range(1, cards.NUM_VALUES+1) if loose & (1 << (val - 1))]
+			val = rng.choice(loose_values)
+			return cards.from_mask(naturals & cards.VALUE_MASKS[val])[0]
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,137 @@
+import logging
+import random
+
+from game_constants import *
+
+
+
+def rng_stream(seed, name):
+	"""Returns the random stream `name` of the round dealt with `seed`.
+	Every use of randomness in a round has it's own stream, so that one of them can change without changing the others."""
+
+	return random.Random(f"{seed}:{name}")
+
+
+def random_state(state):
+	"""Returns a state for `random.Random.setstate` from the one `getstate` returned, also after it went through JSON (which turns tuples into lists)."""
+
+	version, internal_state, gauss_next = state
+	return version, tuple(internal_state), gauss_next
+
+
+
+
+class Pile:
+	"""Creates a face-down or face-up stack of cards
+
+	Properties of a `Pile` type object:
+	- The top of the pile is the end of self.cards, so drawing and discarding are O(1)
+	- Can be indexed like a list (pile[-1] is the top) and has a len
+	"""
+
+	__slots__ = ("cards",)
+
+	def __init__(self, cards = ()):
+		self.cards = list(cards)
+
+
+	def __len__(self):
+		return len(self.cards)
+
+
+	def __getitem__(self, index):
+		return self.cards[index]
+
+
+	def __iter__(self):
+		return iter(self.cards)
+
+
+	def top(self):
+		return self.cards[-1]
+
+
+	def draw(self):
+		return self.cards.pop()
+
+
+	def put(self, card):
+		self.cards.append(card)
+
+
+
+
+class Deck:
+	"""Creates the main deck and the discard pile of a round
+
+	Properties of a `Deck` type object:
+	- Draws from the top of the main deck or the discard pile and discards on top of the discard pile in O(1)
+	- Reshuffles with it's own random stream: the top of the discard pile stays, the rest of it becomes the main deck
+	- Can take a snapshot of both piles and it's random state and go back to it, or fork into an independent copy
+	- Is shared by the `Dealer` and the round, so both always see the same piles
+	"""
+
+	__slots__ = ("main", "discard", "random")
+
+	def __init__(self, main_deck = (), discard_pile = (), rng = None):
+		self.main = Pile(main_deck)
+		self.discard = Pile(discard_pile)
+		self.random = rng if rng is not None else random.Random()
+
+
+	def draw_main(self):
+		return self.main.draw()
+
+
+	def draw_discard(self):
+		return self.discard.draw()
+
+
+	def discard_card(self, card):
+		self.discard.put(card)
+
+
+	def needs_reshuffle(self):
+		return not len(self.main)
+
+
+	def reshuffle(self):
+		"""Shuffles the discard pile, except it's top, into the main deck. Returns False if the main deck isn't empty."""
+
+		if len(self.main):
+			logger.error(f"In piles.py/reshuffle: ERROR: reshuffling with {len(self.main)} cards in the main deck")
+			return False
+
+		top = self.discard.draw()
+		self.main.cards, self.discard.cards = self.discard.cards, [top]
+		self.random.shuffle(self.main.cards)
+		return True
+
+
+	def snapshot(self):
+		"""Returns the state of both piles and the random stream. Cards are shared, not copied."""
+
+		return tuple(self.main.cards), tuple(self.discard.cards), self.random.getstate()
+
+
+	def restore(self, snapshot):
+		main_deck, discard_pile, state = snapshot
+		self.main.cards = list(main_deck)
+		self.discard.cards = list(discard_pile)
+		self.random.setstate(state)
+
+
+	def fork(self):
+		"""Returns an independent copy of the deck that will draw and reshuffle exactly like this one."""
+
+		rng = random.Random()
+		rng.setstate(self.random.getstate())
+		return Deck(self.main.cards, self.discard.cards, rng)
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
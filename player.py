@@ -1,19 +1,26 @@
 import logging
 from game_constants import *
+import cards
+import melds
 
 class Player:	
 	"""Creates an object controlled by the user
 	
 	Properties of a `Player` type object:
 	- Keeps track of all the cards and thereby if they have been selected by the player
+	- Keeps the cards it holds as a mask (see `cards`) for the game logic
 	- Can check if current life/set is valid
+	- Can find the best grouping of it's cards (kept current for hints) and arrange the cards in that order
 	- Interacts with the dealer object to give / recieve cards
+	- Can be saved with `snapshot` and brought back with `restore`
 	"""
 
 	def __init__(self, player_deck, card_joker):
 
 		self.player_deck = player_deck
 		self.card_joker = card_joker
+		self.joker_val = card_joker.val
+		self.hand = cards.to_mask(card.id for card in player_deck)
 
 		self.pure_life = False
 		self.second_life = False
@@ -23,6 +30,39 @@ class Player:
 
 		self.is_main_deck_selected = False
 
+		self.hint_key = None
+		self.hint_result = None
+
+
+	def snapshot(self):
+		"""Returns the state of the player (it's cards in their order and it's flags) as plain lists, see `restore`."""
+
+		return {
+			"deck": [card.id for card in self.player_deck],
+			"pure_life": self.pure_life,
+			"second_life": self.second_life,
+			"can_add_card": self.player_can_add_card,
+			"can_remove_card": self.player_can_remove_card,
+		}
+
+
+	def restore(self, state, round_cards):
+		"""Goes back to a state returned by `snapshot`, with the cards of the round `round_cards` (indexed by id) laid out in their order."""
+
+		self.player_deck[:] = [round_cards[card] for card in state["deck"]]
+		self.hand = cards.to_mask(state["deck"])
+		for index, card in enumerate(self.player_deck):
+			card.rect.x = BORDER_GAP + index * CARD_GAP
+			card.rect.y = DISPLAY_HEIGHT - CARD_HEIGHT - BORDER_GAP
+			card.clicked = False
+
+		self.pure_life = state["pure_life"]
+		self.second_life = state["second_life"]
+		self.player_can_add_card = state["can_add_card"]
+		self.player_can_remove_card = state["can_remove_card"]
+		self.is_main_deck_selected = False
+		self.hint_key = None
+
 
 	def swap_cards(self):
 		"""Swaps the positions of 2 cards selected by user.
@@ -54,7 +94,7 @@ class Player:
 	def add_card(self, card):
 		"""Appends the card to self.player_deck and updates it's x-y coordinates. """
 
-		logger.info(f"In player.py/add_card: Adding card to self.player_deck {card}")
+		logger.info("In player.py/add_card: Adding card to self.player_deck %s", card)
 		self.is_main_deck_selected = False
 
 		card.rect.x = BORDER_GAP + NUM_CARDS_WITH_PLAYER * CARD_GAP
@@ -62,6 +102,7 @@ class Player:
 
 		card.clicked = False
 		self.player_deck.append(card)
+		self.hand |= cards.BITS[card.id]
 
 		for card in self.player_deck:
 			card.clicked = False
@@ -99,111 +140,91 @@ class Player:
 		
 		card_not_needed.clicked = False
 		self.player_deck.remove(card_not_needed)
+		self.hand &= ~cards.BITS[card_not_needed.id]
 
-		logger.info(f"In player.py/remove_card: Card {card_not_needed} removed from self.player_deck")
+		logger.info("In player.py/remove_card: Card %s removed from self.player_deck", card_not_needed)
 
 		self.player_can_add_card = True
 
 		return card_not_needed
 
 
-	def __check_life(self, cards_clicked, jokers, min_life_size):
-		"""Checks if the cards sent form a valid life of atleast `min_life_size`.
-		Currently this is only a helper to self.check_group."""
+	def selected_cards(self):
+		"""Returns the mask of the cards selected by the player."""
 
-		if len(cards_clicked)+len(jokers) < min_life_size:
-			return False
+		selected = 0
+		for card in self.player_deck:
+			if card.clicked:
+				selected |= cards.BITS[card.id]
+		return selected
 
-		count = 0
-		for i in range(len(cards_clicked)-1):
-			if len(jokers) > 0 and jokers[-1].val == card_joker.val and cards_clicked[i].val + 1 == card_joker.val:
-				jokers.remove(jokers[-1])
-			elif cards_clicked[i+1].val != cards_clicked[i].val + 1:
-				count += 1
 
-		if count > len(jokers):
-			return False
+	def selected_group(self):
+		"""Returns the best interpretation of the selected cards as a group, see `melds.classify_group`.
+		Cheap enough to be called every frame for highlighting the selection."""
 
-		return True
+		return melds.classify_group(self.selected_cards(), self.joker_val, not self.pure_life, not self.second_life)
 
 
-	def __check_set(self, cards_clicked, jokers):
-		"""Checks if the cards sent form a valid set.
-		Currently this is only a helper to self.check_group."""
+	def check_group(self):
+		"""Checks if the cards selected form a valid life or set.
+		Pure life and Second life are automatically detected.
+		If found valid, the cards (including the jokers) are removed from self.player_deck."""
 
-		if len(cards_clicked)+len(jokers) < 3:
-			return True
+		selected = self.selected_cards()
+		for card in self.player_deck:
+			card.clicked = False
 
-		# if the card_jokers are used to make a set, then it's a valid set
-		if len(cards_clicked) == 0:
-			return True
+		if cards.popcount(selected) < melds.MIN_GROUP_SIZE:
+			logger.info(f"In player.py/check_group: Too less cards selected.")
+			return
 
-		if len(jokers) > 1:
-			return False
+		kind, placement = melds.classify_group(selected, self.joker_val, not self.pure_life, not self.second_life)
+		logger.info("In player.py/check_group: checking cards: %s", ", ".join(cards.name(card) for card in cards.from_mask(selected)))
 
+		if kind is None:
+			logger.info(f"In player.py/check_group: Invalid group formed.")
+			return
 
-		for i in range(len(cards_clicked)):
-			if cards_clicked[i].val != cards_clicked[0].val:
-				return False
+		if kind == melds.PURE_LIFE:
+			self.pure_life = True
+		elif kind == melds.SECOND_LIFE:
+			self.second_life = True
 
-		return True
+		self.player_deck[:] = [card for card in self.player_deck if not selected & cards.BITS[card.id]]
+		self.hand &= ~selected
+		logger.info("In player.py/check_group: Valid group formed: %s %s", kind, [(cards.name(card), val) for card, val in placement])
 
 
-	def check_group(self):
-		"""Checks if the cards selected form a valid life or set.
-		Pure life and Second life are automatically detected.
-		If found valid, the cards are removed from self.player_deck."""
+	def hint(self):
+		"""Returns (cards away from winning, partition, leftovers) for the current hand, see `melds.arrange`.
+		It is only computed again when the hand changed, so it can be asked for every frame."""
 
-		cards_clicked = []
-		jokers = []
-		for card in self.player_deck:
-			if card.clicked:
-				if card.val == self.card_joker.val or card.val == 0:
-					jokers.append(card)
-				else:
-					cards_clicked.append(card)
-				card.clicked = False
+		key = (self.hand, self.pure_life, self.second_life, self.player_can_remove_card)
+		if key != self.hint_key:
+			self.hint_key = key
+			# after a draw, the hand is judged after it's discard
+			self.hint_result = melds.arrange(self.hand, self.joker_val, not self.pure_life, not self.second_life, int(self.player_can_remove_card))
+		return self.hint_result
 
-		if len(cards_clicked) < 3:
-			logger.info(f"In player.py/check_group: Too less cards selected.")
-			return
 
-		cards_clicked.sort()
+	def arrange(self):
+		"""Orders self.player_deck as pure life, second life, other lives, sets and the cards left over (see `hint`)
+		and lays the cards out in that order in one pass. De-selects all the cards.
+		Returns the # of cards the hand is away from winning."""
 
-		cards_string = ""
-		for card in cards_clicked:
-			cards_string += str(card) + ", "
-		logger.info(f"In player.py/check_group: checking cards: {cards_string}.")
+		distance, partition, leftovers = self.hint()
 
+		deck = {card.id: card for card in self.player_deck}
+		self.player_deck[:] = [deck[card] for kind, grp in partition for card in grp if card is not None] + [deck[card] for card in leftovers]
 
-		# check for pure life
-		if not self.pure_life and not len(jokers):
-			flag = self.__check_life(cards_clicked, jokers, 3)
-			if flag:
-				self.pure_life = True
-		else:
-			flag = False
-
-		# check for second life with atleast 4 cards
-		if not self.second_life and not flag:
-			flag = self.__check_life(cards_clicked, jokers, 4)
-			if flag:
-				self.second_life = True
-
-		# check for other possible life
-		if not flag:
-			flag = self.__check_life(cards_clicked, jokers, 3)
-
-		# check for sets
-		if not flag:
-			flag = self.__check_set(cards_clicked, jokers)
-
-		if flag:
-			for card in cards_clicked:
-					self.player_deck.remove(card)
-			logger.info(f"In player.py/check_group: Valid group formed.")
-		else:
-			logger.info(f"In player.py/check_group: Invalid group formed.")
+		for index, card in enumerate(self.player_deck):
+			card.rect.x = BORDER_GAP + index * CARD_GAP
+			card.rect.y = DISPLAY_HEIGHT - CARD_HEIGHT - BORDER_GAP
+			card.clicked = False
+
+		logger.info("In player.py/arrange: Cards arranged, %s away from winning: %s", distance, [(kind, [cards.name(card) if card is not None else None for card in grp]) for kind, grp in partition])
+		return distance
 
 
 if __name__ == '__main__':
@@ -0,0 +1,200 @@
+import logging
+
+import pygame
+
+from game_constants import *
+import cards
+import melds
+
+
+
+GROUP_NAMES = {
+	melds.PURE_LIFE: "pure life",
+	melds.SECOND_LIFE: "second life",
+	melds.LIFE: "impure life",
+	melds.SET: "set",
+}
+
+
+
+class TextCache:
+	"""Keeps the rendered surfaces of texts so that a text is rendered only once
+
+	Properties of a `TextCache` type object:
+	- Surfaces are keyed by (font, text, color)
+	- Starts over once it holds more than `max_entries` surfaces, which only happens when a lot of different texts are shown
+	"""
+
+	def __init__(self, max_entries = 256):
+		self.max_entries = max_entries
+		self.surfaces = {}
+
+
+	def render(self, font, text, color = FONT_COLOR):
+		"""Returns the surface of `text` rendered with `font` in `color`."""
+
+		key = (font, text, color)
+		surface = self.surfaces.get(key)
+		if surface is None:
+			if len(self.surfaces) >= self.max_entries:
+				self.surfaces.clear()
+			surface = self.surfaces[key] = font.render(text, True, color)
+		return surface
+
+
+
+
+class RoundRenderer:
+	"""Draws a `Round` on the screen by only redrawing the regions that changed since the last frame
+
+	Properties of a `RoundRenderer` type object:
+	- Pre-composites everything that doesn't change during a round (background, labels, the other seats' decks, card joker, buttons) in a static layer
+	- Draws the rest (event text, player's deck, the hint, the group the selected cards form, main deck, discard pile) as sprites and compares them with the previous frame
+	- Returns the dirty rects to pass to `pygame.display.update`
+	"""
+
+	def __init__(self, screen, font, text_cache = None):
+		self.screen = screen
+		self.font = font
+		self.text_cache = text_cache if text_cache is not None else TextCache()
+
+		self.static_layer = None
+		self.sprites = {}
+		self.full_redraw = True
+
+
+	def invalidate(self):
+		"""Forces the next frame to redraw the whole screen, e.g. after something else drew on it."""
+
+		self.full_redraw = True
+
+
+	def build_static_layer(self, cur_round):
+		"""Draws everything that doesn't change during `cur_round` on a single surface."""
+
+		static_layer = cur_round.game_background.copy()
+
+		# Display the card decks of the other seats side by side along the top, fanned tighter when there are more of them
+		others = [seat for seat in range(len(cur_round.seats)) if seat != PLAYER_SEAT]
+		width = (DISPLAY_WIDTH - BORDER_GAP) / len(others)
+		gap = min(CARD_GAP, (width - CARD_WIDTH - BORDER_GAP) / (NUM_CARDS_WITH_PLAYER - 1))
+		for n, seat in enumerate(others):
+			x = BORDER_GAP + n * width
+			for i in range(NUM_CARDS_WITH_PLAYER):
+				static_layer.blit(cur_round.card_back, (x + i*gap, 2*BORDER_GAP + FONT_SIZE))
+			if len(others) > 1:
+				label = f"Computer {seat}" if seat in cur_round.computers else f"Player {seat}"
+				static_layer.blit(self.text_cache.render(self.font, label), (x, 2*BORDER_GAP + FONT_SIZE + CARD_HEIGHT))
+
+		# Display Card Joker and the labels
+		static_layer.blit(cur_round.card_joker.image,(cur_round.card_joker.rect.x,cur_round.card_joker.rect.y))
+		static_layer.blit(self.text_cache.render(self.font, "Card Joker"), (BORDER_GAP/2 , MID_CARD_POS + CARD_HEIGHT))
+		static_layer.blit(self.text_cache.render(self.font, "Main Deck"), (BORDER_GAP*11 - BORDER_GAP/4, MID_CARD_POS + CARD_HEIGHT))
+
+		for button in cur_round.game_buttons:
+			static_layer.blit(button.image, (button.rect.x, button.rect.y))
+
+		return static_layer
+
+
+	def collect_sprites(self, cur_round):
+		"""Returns the (surface, x, y) of everything that can change during `cur_round`, keyed by what it displays.
+		Selected cards and decks are lifted by `SELECTED_CARD_LIFT`."""
+
+		sprites = {}
+
+		sprites["event_text"] = (self.text_cache.render(self.font, cur_round.event_text), BORDER_GAP, BORDER_GAP)
+
+		# Display Player's card deck
+		for card in cur_round.player.player_deck:
+			sprites[card] = (card.image, card.rect.x, card.rect.y - (SELECTED_CARD_LIFT if card.clicked else 0))
+
+		distance, partition, leftovers = cur_round.player.hint()
+		hint_text = f"Hint: {distance} card{'s' if distance != 1 else ''} away from winning, press A to arrange"
+		sprites["hint_text"] = (self.text_cache.render(self.font, hint_text), BORDER_GAP/2, MID_CARD_POS + CARD_HEIGHT + FONT_SIZE + BORDER_GAP/2)
+
+		selection_text = self.selection_text(cur_round.player)
+		if selection_text is not None:
+			sprites["selection_text"] = (self.text_cache.render(self.font, *selection_text), BORDER_GAP,
+				DISPLAY_HEIGHT - CARD_HEIGHT - BORDER_GAP - SELECTED_CARD_LIFT - FONT_SIZE - BORDER_GAP/2)
+
+		main_deck_lift = SELECTED_CARD_LIFT if cur_round.player.is_main_deck_selected else 0
+		sprites["main_deck"] = (cur_round.card_back, BORDER_GAP * 11, MID_CARD_POS - main_deck_lift)
+
+		# display discard_pile if card is discarded
+		if len(cur_round.discard_pile):
+			card = cur_round.discard_pile[-1]
+			sprites["discard_pile"] = (card.image, card.rect.x, card.rect.y - (SELECTED_CARD_LIFT if card.clicked else 0))
+			sprites["discard_pile_text"] = (self.text_cache.render(self.font, "Discard Pile"), BORDER_GAP*22 - BORDER_GAP, MID_CARD_POS + CARD_HEIGHT)
+
+		return sprites
+
+
+	def selection_text(self, player):
+		"""Returns the (text, color) describing the group the cards selected by `player` form, or None if less than 3 are selected."""
+
+		if cards.popcount(player.selected_cards()) < melds.MIN_GROUP_SIZE:
+			return None
+
+		kind, placement = player.selected_group()
+		if kind is None:
+			return "Selected: not a valid group", INVALID_GROUP_COLOR
+
+		joker_values = [str(val) for card, val in placement if cards.is_joker(card, player.joker_val)]
+		if joker_values:
+			return f"Selected: {GROUP_NAMES[kind]} (jokers as {', '.join(joker_values)})", VALID_GROUP_COLOR
+		return f"Selected: {GROUP_NAMES[kind]}", VALID_GROUP_COLOR
+
+
+	def draw(self, cur_round):
+		"""Draws the frame of `cur_round` on self.screen and returns the list of rects that changed."""
+
+		if self.static_layer is None:
+			self.static_layer = self.build_static_layer(cur_round)
+
+		sprites = self.collect_sprites(cur_round)
+
+		if self.full_redraw:
+			self.full_redraw = False
+			self.sprites = sprites
+			self.screen.blit(self.static_layer, (0, 0))
+			for surface, x, y in sprites.values():
+				self.screen.blit(surface, (x, y))
+			return [self.screen.get_rect()]
+
+		dirty_rects = []
+		for key in self.sprites.keys() | sprites.keys():
+			old_sprite = self.sprites.get(key)
+			new_sprite = sprites.get(key)
+			if old_sprite == new_sprite:
+				continue
+			if old_sprite is not None:
+				dirty_rects.append(self.__sprite_rect(old_sprite))
+			if new_sprite is not None:
+				dirty_rects.append(self.__sprite_rect(new_sprite))
+
+		self.sprites = sprites
+
+		sprite_rects = [(sprite, self.__sprite_rect(sprite)) for sprite in sprites.values()]
+		for rect in dirty_rects:
+			self.screen.set_clip(rect)
+			self.screen.blit(self.static_layer, rect, rect)
+			for (surface, x, y), sprite_rect in sprite_rects:
+				if sprite_rect.colliderect(rect):
+					self.screen.blit(surface, (x, y))
+		self.screen.set_clip(None)
+
+		return dirty_rects
+
+
+	def __sprite_rect(self, sprite):
+		surface, x, y = sprite
+		return pygame.Rect(x, y, surface.get_width(), surface.get_height())
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,239 @@
+import argparse
+import functools
+import gzip
+import json
+import logging
+import os
+import time
+
+from game_constants import *
+import computer
+import engine
+
+
+
+# 2: draws come from the top (end) of the piles and reshuffles have their own random stream, see `piles`
+REPLAY_VERSION = 2
+
+
+
+class ReplayError(Exception):
+	"""Raised when a replayed round doesn't do what the recording says."""
+
+
+
+
+class Recording:
+	"""The seed and the actions of a round, enough to play it again
+
+	Properties of a `Recording` type object:
+	- Has the seed of the deal, the computer's strategy (see `engine.STRATEGIES`, None if unknown) and the result
+	- Has the seats (see `engine.strategy_name`); recordings from before seats were saved have a human and the computer
+	- Has the ordered actions of all the seats (see the ACTION_ constants)
+	- Is saved as gzipped JSON
+	"""
+
+	def __init__(self, seed, strategy, actions, result = None, seats = None):
+		self.seed = seed
+		self.strategy = strategy
+		self.actions = actions
+		self.result = result
+		self.seats = seats if seats is not None else [HUMAN, strategy]
+
+
+	def save(self, file_name):
+		data = {"version": REPLAY_VERSION, "seed": self.seed, "strategy": self.strategy, "seats": self.seats, "result": self.result, "actions": self.actions}
+		with gzip.open(file_name, "wt") as replay_file:
+			json.dump(data, replay_file, separators = (",", ":"))
+
+
+	def computer_script(self, seat = COMPUTER_SEAT):
+		"""Returns the (from_discard, discarded card) of every turn of the computer at `seat`."""
+
+		script = []
+		for action in self.actions:
+			if action[0] == ACTION_DRAW and action[1] == seat:
+				script.append([bool(action[2]), None])
+			elif action[0] == ACTION_DISCARD and action[1] == seat:
+				script[-1][1] = action[2]
+		return script
+
+
+
+
+class ScriptedComputer(computer.Computer):
+	"""Creates a computer that repeats the moves of a recording
+
+	Properties of a `ScriptedComputer` type object:
+	- Keeps it's cards exactly like `computer.Computer`
+	- Draws and discards what the computer did in the recording, so that rounds of any strategy can be replayed
+	"""
+
+	def __init__(self, computer_deck, card_joker, delay = 0, seat = COMPUTER_SEAT, script = ()):
+		super().__init__(computer_deck, card_joker, 0, seat)
+		self.script = script
+		self.turn = 0
+
+
+	def snapshot(self):
+		state = super().snapshot()
+		state["turn"] = self.turn
+		return state
+
+
+	def restore(self, state):
+		super().restore(state)
+		self.turn = state["turn"]
+
+
+	def make_move(self, dealer, discard_pile_card):
+		return self.__next_move()[0]
+
+
+	def get_card(self, card):
+		discard = self.__next_move()[1]
+		self.turn += 1
+
+		self.add_card_to_grps(card)
+		self.remove_card(discard)
+		return discard
+
+
+	def __next_move(self):
+		if self.turn >= len(self.script):
+			raise ReplayError(f"computer has no recorded move for turn {self.turn + 1}")
+		return self.script[self.turn]
+
+
+
+
+class Replayer:
+	"""Plays the actions of a `Recording` on a round, one step at a time
+
+	Properties of a `Replayer` type object:
+	- Works on any `engine.RoundEngine`, so the same recording can be replayed headless or in the pygame UI
+	- Lets the computer decide again if it's strategy is deterministic (see `seat_classes`), or repeats it's recorded moves
+	- Checks after every step that the round recorded exactly the same actions, and raises `ReplayError` otherwise
+	"""
+
+	def __init__(self, round_engine, recording, scripted = False):
+		self.round = round_engine
+		self.recording = recording
+		self.scripted = scripted
+		self.round.running = True
+
+
+	def is_done(self):
+		return not self.round.running or len(self.round.actions) >= len(self.recording.actions)
+
+
+	def step(self):
+		"""Plays the next recorded action (a computer turn is a draw and a discard). Returns the actions played."""
+
+		start = len(self.round.actions)
+		action = self.recording.actions[start]
+		kind = action[0]
+
+		if kind == ACTION_DRAW and action[1] in self.round.players:
+			self.round.player_draw(bool(action[2]), action[1])
+		elif kind == ACTION_DISCARD and action[1] in self.round.players:
+			self.round.player_discard(self.round.cards[action[2]], action[1])
+		elif kind == ACTION_DRAW:
+			self.round.computer_turn(bool(action[2]) if self.scripted else None)
+		elif kind == ACTION_CHECK:
+			self.round.player_check_group(action[1])
+		elif kind == ACTION_SWAP:
+			self.round.player_swap(action[1:])
+		elif kind == ACTION_SHOW:
+			self.round.dealer.show_player()
+		elif kind == ACTION_DECLARE:
+			self.round.player_declare(action[1] if len(action) > 1 else PLAYER_SEAT)
+		else:
+			raise ReplayError(f"unknown action {action} at {start}")
+
+		played = self.round.actions[start:]
+		if not played or played != self.recording.actions[start:start + len(played)]:
+			raise ReplayError(f"action {start}: recorded {self.recording.actions[start:start + max(1, len(played))]}, replayed {played}")
+		return played
+
+
+	def run(self):
+		"""Plays all the remaining actions. Returns the result of the round."""
+
+		while not self.is_done():
+			self.step()
+		return self.round.result
+
+
+
+
+def save_round(round_engine, file_name):
+	"""Saves the seed and the actions of `round_engine` to `file_name`."""
+
+	seats = [engine.strategy_name(seat) for seat in round_engine.seats]
+	Recording(round_engine.seed, round_engine.strategy, round_engine.actions, round_engine.result, seats).save(file_name)
+
+
+def load(file_name):
+	with gzip.open(file_name, "rt") as replay_file:
+		data = json.load(replay_file)
+
+	if data.get("version") != REPLAY_VERSION:
+		raise ReplayError(f"{file_name}: unsupported replay version {data.get('version')}")
+	return Recording(data["seed"], data["strategy"], data["actions"], data["result"], data.get("seats"))
+
+
+def seat_classes(recording, scripted = False):
+	"""Returns the seats (HUMAN or the computer class) that replay `recording`.
+	Computers repeat their recorded moves if `scripted` or if their strategy isn't in engine.DETERMINISTIC_STRATEGIES."""
+
+	seats = []
+	for seat, name in enumerate(recording.seats):
+		if name == HUMAN:
+			seats.append(HUMAN)
+		elif scripted or name not in engine.DETERMINISTIC_STRATEGIES:
+			seats.append(functools.partial(ScriptedComputer, script = recording.computer_script(seat)))
+		else:
+			seats.append(engine.STRATEGIES[name])
+	return seats
+
+
+def replay(recording, scripted = False):
+	"""Replays `recording` headless as fast as possible. Returns the round."""
+
+	round_engine = engine.RoundEngine(recording.seed, seats = seat_classes(recording, scripted))
+	Replayer(round_engine, recording, scripted).run()
+	return round_engine
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Replays recorded rounds headless and checks that they play out the same.")
+	parser.add_argument("files", nargs = "+", help = f"replay files, e.g. from the {REPLAY_DIR} folder")
+	parser.add_argument("--scripted", action = "store_true", help = "repeat the recorded moves of every computer, even of a deterministic strategy (see engine.DETERMINISTIC_STRATEGIES)")
+	parser.add_argument("--repeat", type = int, default = 1, help = "replay every file this many times (for timing)")
+	args = parser.parse_args()
+
+	recordings = [(file_name, load(file_name)) for file_name in args.files]
+
+	num_actions = 0
+	start = time.perf_counter()
+	for i in range(args.repeat):
+		for file_name, recording in recordings:
+			try:
+				round_engine = replay(recording, args.scripted)
+			except ReplayError as error:
+				print(f"{file_name}: {error}")
+				continue
+			num_actions += len(recording.actions)
+			if i == 0:
+				print(f"{os.path.basename(file_name)}: seed {recording.seed}, {len(recording.actions)} actions, result {round_engine.result} (recorded {recording.result})")
+	elapsed = time.perf_counter() - start
+
+	print(f"{num_actions} actions in {elapsed:.3f}s ({num_actions / elapsed:.0f} actions/s)")
+else:
+	logger = logging.getLogger('logger.main')
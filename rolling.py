@@ -0,0 +1,45 @@
+import logging
+from array import array
+
+from game_constants import *
+
+
+
+PERCENTILES = (50, 95, 99)
+
+
+
+class RollingSamples:
+	"""Keeps the last `size` durations of a phase in a ring buffer
+
+	Properties of a `RollingSamples` type object:
+	- Adding a sample is O(1) and never allocates
+	- Percentiles are computed on demand from a sorted copy of the window
+	"""
+
+	def __init__(self, size):
+		self.samples = array("d", [0.0]) * size
+		self.count = 0
+
+
+	def add(self, seconds):
+		self.samples[self.count % len(self.samples)] = seconds
+		self.count += 1
+
+
+	def percentiles(self, percentiles = PERCENTILES):
+		"""Returns the nearest-rank percentiles of the window in milliseconds (empty if there are no samples)."""
+
+		num_samples = min(self.count, len(self.samples))
+		if not num_samples:
+			return {}
+		window = sorted(self.samples[:num_samples])
+		return {f"p{percentile}": 1000 * window[min(num_samples - 1, (percentile * num_samples - 1) // 100)] for percentile in percentiles}
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
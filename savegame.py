@@ -0,0 +1,56 @@
+import gzip
+import json
+import logging
+import os
+
+from game_constants import *
+import engine
+
+
+
+def save(round_engine, file_name = SAVE_FILE):
+	"""Writes the snapshot (see `engine.RoundEngine.snapshot`) of `round_engine` to `file_name` as gzipped JSON."""
+
+	with gzip.open(file_name, "wt") as save_file:
+		json.dump(round_engine.snapshot(), save_file, separators = (",", ":"))
+	logger.info(f"In savegame.py/save: round saved to {file_name}")
+
+
+def load(file_name = SAVE_FILE):
+	"""Returns the snapshot saved in `file_name`. Raises `engine.SnapshotError` if it can't be used."""
+
+	try:
+		with gzip.open(file_name, "rt") as save_file:
+			state = json.load(save_file)
+	except (OSError, ValueError) as error:
+		raise engine.SnapshotError(f"{file_name}: {error}")
+
+	if state.get("version") != engine.SNAPSHOT_VERSION:
+		raise engine.SnapshotError(f"{file_name}: unsupported snapshot version {state.get('version')}")
+	return state
+
+
+def resume(state):
+	"""Builds a headless round from `state`, with the seats it was played with (see `engine.seat_classes`)."""
+
+	return engine.RoundEngine(state = state)
+
+
+def take(file_name = SAVE_FILE):
+	"""Loads the round saved in `file_name` and deletes the file, so that a round is only resumed once.
+	Returns the snapshot, or None if there is no saved round."""
+
+	if not os.path.exists(file_name):
+		return None
+	try:
+		return load(file_name)
+	finally:
+		os.remove(file_name)
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
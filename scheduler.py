@@ -0,0 +1,52 @@
+import logging
+
+import pygame
+
+from game_constants import *
+
+
+
+class FrameScheduler:
+	"""Paces the loops of the menu, the round and the end screen
+
+	Properties of a `FrameScheduler` type object:
+	- When the screen is idle, blocks on `pygame.event.wait` until an event arrives, so an idle game uses no CPU;
+	  clicks, keys, the computer's decision and the message timers all arrive as events
+	- When the screen is active (something changes every frame), caps the loop at `max_fps` frames per second
+	- Wakes up atleast every `idle_timeout` ms even without events, for periodic work like exporting stats
+	"""
+
+	def __init__(self, max_fps = MAX_FPS, idle_timeout = IDLE_TIMEOUT):
+		self.max_fps = max_fps
+		self.idle_timeout = idle_timeout
+		self.clock = pygame.time.Clock()
+
+
+	def wait(self, active = False):
+		"""Waits for the next frame if `active`, else for the next event. Returns the event that ended the wait, if any.
+		The caller gets the rest of the queued events with `pygame.event.get`."""
+
+		if active:
+			self.clock.tick(self.max_fps)
+			return []
+
+		event = pygame.event.wait(self.idle_timeout)
+		# the frame after an idle wait shouldn't be delayed by the cap
+		self.clock.tick()
+		if event.type == pygame.NOEVENT:
+			return []
+		return [event]
+
+
+	def events(self, active = False):
+		"""Waits like `wait` and returns all the events that are queued."""
+
+		return self.wait(active) + pygame.event.get()
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import itertools
+import json
+import logging
+import os
+import time
+
+from game_constants import *
+import engine
+import rolling
+
+
+
+# every request is a line of JSON like {"op": "draw", "from_discard": false}; every reply is a line of JSON with "ok"
+OPS = ("new", "state", "draw", "discard", "check", "swap", "declare", "show", "stats")
+LATENCY_WINDOW = 10000
+# the computer of a table when the client doesn't choose one
+SERVER_STRATEGY = "heuristic"
+# table computers never wait (delay 0), so the anytime computer searches a fixed depth instead of a share of it's delay
+STRATEGY_OPTIONS = {"anytime": {"max_depth": 1}}
+
+
+
+class ProtocolError(Exception):
+	"""Raised for a request that the table can't play. The client gets it's message back."""
+
+
+
+
+class Table:
+	"""Creates one round of a client against a computer
+
+	Properties of a `Table` type object:
+	- Runs a headless `engine.RoundEngine`, so the `Dealer` flow and the `Player` validation are exactly those of the game
+	- Checks that a request is allowed before playing it, since a client can send anything
+	- Shows the client only what the player could see on the screen
+	"""
+
+	def __init__(self, table_id, seed = None, strategy = SERVER_STRATEGY):
+		if not isinstance(strategy, str) or strategy not in engine.STRATEGIES:
+			raise ProtocolError(f"unknown strategy {strategy!r}")
+		if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+			raise ProtocolError("seed must be an int or null")
+
+		self.table_id = table_id
+		computer_class = functools.partial(engine.STRATEGIES[strategy], **STRATEGY_OPTIONS.get(strategy, {}))
+		self.round = engine.RoundEngine(seed, computer_class = computer_class)
+		self.round.running = True
+
+
+	def view(self):
+		cur_round = self.round
+		return {
+			"table": self.table_id,
+			"seed": cur_round.seed,
+			"card_joker": cur_round.card_joker.id,
+			"hand": [card.id for card in cur_round.player.player_deck],
+			"discard_top": cur_round.discard_pile[-1].id if len(cur_round.discard_pile) else None,
+			"main_deck": len(cur_round.main_deck),
+			"turns": cur_round.turns,
+			"pure_life": cur_round.player.pure_life,
+			"second_life": cur_round.player.second_life,
+			"can_draw": cur_round.player.player_can_add_card and cur_round.running,
+			"can_discard": cur_round.player.player_can_remove_card and cur_round.running,
+			"result": cur_round.result,
+		}
+
+
+	def check_running(self):
+		if not self.round.running:
+			raise ProtocolError(f"the round is over: {self.round.result}")
+
+
+	def player_cards(self, card_ids):
+		"""Checks that `card_ids` are distinct cards of the player's hand."""
+
+		# the types first, since only ints can go in a set
+		if not isinstance(card_ids, list) or not all(isinstance(card, int) and not isinstance(card, bool) for card in card_ids) or len(set(card_ids)) != len(card_ids):
+			raise ProtocolError("cards must be a list of distinct card ids")
+		hand = {card.id for card in self.round.player.player_deck}
+		if not hand.issuperset(card_ids):
+			raise ProtocolError("cards must be in your hand")
+		return card_ids
+
+
+	def draw(self, from_discard):
+		self.check_running()
+		if not self.round.player.player_can_add_card:
+			raise ProtocolError("you already drew a card")
+		if from_discard and not len(self.round.discard_pile):
+			raise ProtocolError("the discard pile is empty")
+		return self.round.player_draw(bool(from_discard)).id
+
+
+	def discard(self, card):
+		self.check_running()
+		if not self.round.player.player_can_remove_card:
+			raise ProtocolError("draw a card first")
+		if not isinstance(card, int) or isinstance(card, bool):
+			raise ProtocolError("card must be a card id")
+		card, = self.player_cards([card])
+		self.round.player_discard(self.round.cards[card])
+
+
+	def check(self, card_ids):
+		self.check_running()
+		self.round.player_check_group(self.player_cards(card_ids))
+
+
+	def swap(self, card_ids):
+		self.check_running()
+		if len(self.player_cards(card_ids)) != 2:
+			raise ProtocolError("select 2 cards to swap")
+		self.round.player_swap(card_ids)
+
+
+	def declare(self):
+		self.check_running()
+		self.round.player_declare()
+
+
+	def show(self):
+		self.check_running()
+		self.round.dealer.show_player()
+
+
+
+
+class GameServer:
+	"""Hosts many tables in one process, one per client connection
+
+	Properties of a `GameServer` type object:
+	- Speaks JSON lines (see OPS) over TCP or a Unix socket; a connection plays one table at a time
+	- Runs the computer's turns in `executor` (threads by default), so that one table's AI never stalls the other tables
+	- Times every request by op and reports the p50 / p95 / p99 with the # of tables and the CPU time of the process
+	"""
+
+	def __init__(self, executor = None):
+		self.executor = executor if executor is not None else concurrent.futures.ThreadPoolExecutor(os.cpu_count() or 1)
+		self.table_ids = itertools.count(1)
+		self.num_tables = 0
+		self.tables_played = 0
+		self.latency = {op: rolling.RollingSamples(LATENCY_WINDOW) for op in OPS}
+		self.started = time.perf_counter()
+		self.cpu_started = time.process_time()
+
+
+	async def start(self, host = SERVER_HOST, port = SERVER_PORT, unix_path = None):
+		"""Starts listening on `unix_path` if it is set, else on `host`:`port`. Returns the `asyncio.Server`."""
+
+		if unix_path:
+			server = await asyncio.start_unix_server(self.handle_client, unix_path)
+		else:
+			server = await asyncio.start_server(self.handle_client, host, port)
+		logger.info(f"In server.py/start: listening on {[str(sock.getsockname()) for sock in server.sockets]}")
+		return server
+
+
+	async def handle_client(self, reader, writer):
+		table = None
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+
+				start = time.perf_counter()
+				request = op = None
+				try:
+					request = json.loads(line)
+					if not isinstance(request, dict):
+						raise ProtocolError("a request must be a JSON object")
+					op = request.get("op")
+					if op not in OPS:
+						raise ProtocolError(f"unknown op {op!r}")
+					table, reply = await self.dispatch(table, op, request)
+					reply["ok"] = True
+				except (ProtocolError, ValueError, KeyError, TypeError) as error:
+					reply = {"ok": False, "error": str(error)}
+
+				# the client can tag it's requests to match the replies
+				if isinstance(request, dict) and "id" in request:
+					reply["id"] = request["id"]
+				writer.write(json.dumps(reply, separators = (",", ":")).encode() + b"\n")
+				await writer.drain()
+
+				if op in self.latency:
+					self.latency[op].add(time.perf_counter() - start)
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			if table is not None:
+				self.num_tables -= 1
+			writer.close()
+
+
+	async def dispatch(self, table, op, request):
+		"""Plays `request` on `table`. Returns the table of the connection (a new one for "new") and the reply."""
+
+		if op == "new":
+			new_table = Table(next(self.table_ids), request.get("seed"), request.get("strategy", SERVER_STRATEGY))
+			if table is None:
+				self.num_tables += 1
+			self.tables_played += 1
+			return new_table, new_table.view()
+
+		if op == "stats":
+			return table, self.stats()
+
+		if table is None:
+			raise ProtocolError("start a table with the new op first")
+
+		reply = {}
+		if op == "draw":
+			reply["card"] = table.draw(request.get("from_discard", False))
+		elif op == "discard":
+			table.discard(request["card"])
+			# the computers answer right away, off the event loop
+			while table.round.computer_move and table.round.running:
+				await asyncio.get_running_loop().run_in_executor(self.executor, table.round.computer_turn)
+				reply["computer_discard"] = table.round.discard_pile[-1].id
+		elif op == "check":
+			table.check(request["cards"])
+		elif op == "swap":
+			table.swap(request["cards"])
+		elif op == "declare":
+			table.declare()
+		elif op == "show":
+			table.show()
+
+		reply.update(table.view())
+		return table, reply
+
+
+	def stats(self):
+		return {
+			"tables": self.num_tables,
+			"tables_played": self.tables_played,
+			"seconds": time.perf_counter() - self.started,
+			"cpu_seconds": time.process_time() - self.cpu_started,
+			"cpus": os.cpu_count() or 1,
+			"latency_ms": {op: dict(samples.percentiles(), count = samples.count) for op, samples in self.latency.items() if samples.count},
+		}
+
+
+
+
+class Client:
+	"""A thin client of a `GameServer`: sends requests and waits for their replies, one at a time"""
+
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+
+
+	@classmethod
+	async def connect(cls, host = SERVER_HOST, port = SERVER_PORT, unix_path = None):
+		if unix_path:
+			reader, writer = await asyncio.open_unix_connection(unix_path)
+		else:
+			reader, writer = await asyncio.open_connection(host, port)
+		return cls(reader, writer)
+
+
+	async def request(self, op, **fields):
+		fields["op"] = op
+		self.writer.write(json.dumps(fields, separators = (",", ":")).encode() + b"\n")
+		await self.writer.drain()
+		return json.loads(await self.reader.readline())
+
+
+	async def close(self):
+		self.writer.close()
+		await self.writer.wait_closed()
+
+
+
+
+def serve(host = SERVER_HOST, port = SERVER_PORT, unix_path = None, ready = None):
+	"""Runs a `GameServer` until it is interrupted. `ready` (e.g. a `multiprocessing.Queue`) gets the address once it listens."""
+
+	async def run():
+		server = await GameServer().start(host, port, unix_path)
+		if ready is not None:
+			ready.put(unix_path or server.sockets[0].getsockname()[:2])
+		async with server:
+			await server.serve_forever()
+
+	try:
+		asyncio.run(run())
+	except KeyboardInterrupt:
+		pass
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Hosts many tables of the game for clients speaking JSON lines.")
+	parser.add_argument("--host", default = SERVER_HOST)
+	parser.add_argument("--port", type = int, default = SERVER_PORT)
+	parser.add_argument("--unix", help = "listen on this Unix socket instead of TCP")
+	args = parser.parse_args()
+
+	serve(args.host, args.port, args.unix)
+else:
+	logger = logging.getLogger('logger.main')
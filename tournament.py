@@ -0,0 +1,188 @@
+import argparse
+import functools
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+
+from game_constants import *
+import anytime
+import engine
+import monte_carlo
+
+
+
+TOURNAMENT_ITERATIONS = 50
+TOURNAMENT_DEPTH = 1
+Z_95 = 1.96
+
+
+
+def parse_strategy(spec):
+	"""Parses a strategy like "heuristic" or "monte_carlo:iterations=100" into (name, keyword arguments)."""
+
+	name, _, args = spec.partition(":")
+	if name not in engine.STRATEGIES:
+		raise ValueError(f"Unknown strategy {name!r}, choose from {', '.join(engine.STRATEGIES)}")
+
+	kwargs = {}
+	for arg in filter(None, args.split(",")):
+		key, _, val = arg.partition("=")
+		for convert in (int, float, str):
+			try:
+				kwargs[key] = convert(val)
+				break
+			except ValueError:
+				pass
+	return name, kwargs
+
+
+def make_computer_class(spec, seed):
+	"""Returns the computer class of the strategy `spec`, seeded with `seed` so that the game can be replayed.
+	Searching computers play a fixed # of iterations (or depth) on a single process, since the games already run in parallel."""
+
+	name, kwargs = parse_strategy(spec)
+	computer_class = engine.STRATEGIES[name]
+
+	if issubclass(computer_class, monte_carlo.MonteCarloComputer):
+		kwargs.setdefault("iterations", TOURNAMENT_ITERATIONS)
+		kwargs.setdefault("processes", 1)
+		kwargs["seed"] = seed
+	elif issubclass(computer_class, anytime.AnytimeComputer):
+		kwargs.setdefault("max_depth", TOURNAMENT_DEPTH)
+	return functools.partial(computer_class, **kwargs)
+
+
+def play_game(task):
+	"""Plays one game of the deal `deal_seed` between two strategies. `first` plays the player's seat, which moves first.
+	Returns a dict with the winner (0 for `first`, 1 for `second`, None for no winner), the # of turns, decisions and seconds."""
+
+	first, second, deal_seed, max_turns = task
+
+	start = time.perf_counter()
+	round_engine = engine.RoundEngine(deal_seed, computer_class = make_computer_class(second, 2 * deal_seed + 1))
+	policy = engine.MirrorPolicy(round_engine, make_computer_class(first, 2 * deal_seed))
+	result = round_engine.play(policy, max_turns)
+	elapsed = time.perf_counter() - start
+
+	winner = {"You Win!!": 0, "Computer Won!": 1}.get(result)
+
+	# every turn is a draw and a discard decision for each seat, except the computer's last one when the player won
+	decisions = 4 * round_engine.turns - (2 if winner == 0 else 0)
+
+	return {"winner": winner, "turns": round_engine.turns, "decisions": decisions, "seconds": elapsed}
+
+
+def wilson_interval(score, games, z = Z_95):
+	"""Returns the Wilson score interval of a win rate of `score` over `games` games."""
+
+	if not games:
+		return 0.0, 1.0
+	rate = score / games
+	denominator = 1 + z * z / games
+	center = (rate + z * z / (2 * games)) / denominator
+	half_width = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+	return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def run_tournament(strategies, num_deals, seed = 0, processes = None, max_turns = 200):
+	"""Plays every pair of `strategies` on `num_deals` deals (deal `i` is dealt with seed `seed + i`), once from each seat.
+	Returns a list with the results of every pair."""
+
+	processes = processes or os.cpu_count() or 1
+
+	# every task knows it's pair (by index, since a strategy can be listed twice) and whether `a` played from seat 0
+	tasks = []
+	task_pairs = []
+	for pair_index, (a, b) in enumerate(itertools.combinations(strategies, 2)):
+		for i in range(num_deals):
+			tasks.append((a, b, seed + i, max_turns))
+			tasks.append((b, a, seed + i, max_turns))
+			task_pairs += [(pair_index, a, b, True), (pair_index, a, b, False)]
+
+	start = time.perf_counter()
+	if processes > 1:
+		with multiprocessing.Pool(processes) as pool:
+			games = pool.map(play_game, tasks, chunksize = max(1, len(tasks) // (8 * processes)))
+	else:
+		games = [play_game(task) for task in tasks]
+	wall_time = time.perf_counter() - start
+
+	pairs = {}
+	for (pair_index, a, b, a_first), game in zip(task_pairs, games):
+		pair = pairs.setdefault(pair_index, {"a": a, "b": b, "games": 0, "wins_a": 0, "wins_b": 0, "no_winner": 0, "turns": 0, "decisions": 0, "seconds": 0.0})
+
+		pair["games"] += 1
+		pair["turns"] += game["turns"]
+		pair["decisions"] += game["decisions"]
+		pair["seconds"] += game["seconds"]
+		if game["winner"] is None:
+			pair["no_winner"] += 1
+		elif (game["winner"] == 0) == a_first:
+			pair["wins_a"] += 1
+		else:
+			pair["wins_b"] += 1
+
+	results = []
+	for pair in pairs.values():
+		score = pair["wins_a"] + 0.5 * pair["no_winner"]
+		low, high = wilson_interval(score, pair["games"])
+		results.append({
+			"a": pair["a"],
+			"b": pair["b"],
+			"games": pair["games"],
+			"wins_a": pair["wins_a"],
+			"wins_b": pair["wins_b"],
+			"no_winner": pair["no_winner"],
+			"win_rate_a": score / pair["games"],
+			"win_rate_a_95": [low, high],
+			"average_turns": pair["turns"] / pair["games"],
+			"decisions_per_second": pair["decisions"] / pair["seconds"] if pair["seconds"] else 0.0,
+		})
+
+	logger.info(f"In tournament.py/run_tournament: {len(tasks)} games in {wall_time:.2f}s on {processes} processes")
+	return results
+
+
+def print_results(results):
+	for result in results:
+		low, high = result["win_rate_a_95"]
+		print(f"{result['a']} vs {result['b']}: {result['games']} games, {result['wins_a']} - {result['wins_b']} ({result['no_winner']} without winner)")
+		print(f"    win rate of {result['a']}: {result['win_rate_a']:.3f} (95% CI {low:.3f} - {high:.3f})")
+		print(f"    average game length: {result['average_turns']:.1f} turns, {result['decisions_per_second']:.0f} decisions/s per process")
+
+
+
+
+if __name__ == '__main__':
+
+	logger = logging.getLogger('logger.main')
+
+	parser = argparse.ArgumentParser(description = "Plays computer strategies against each other on seeded deals, from both seats.")
+	parser.add_argument("strategies", nargs = "+", help = f"two or more of {', '.join(engine.STRATEGIES)}, with options like monte_carlo:iterations=100")
+	parser.add_argument("--deals", type = int, default = 500, help = "# of deals per pair of strategies (every deal is played from both seats)")
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--processes", type = int, default = None, help = "defaults to all the cores")
+	parser.add_argument("--max-turns", type = int, default = 200)
+	parser.add_argument("--json", help = "also write the results to this file")
+	args = parser.parse_args()
+
+	if len(args.strategies) < 2:
+		parser.error("needs atleast two strategies")
+	for spec in args.strategies:
+		try:
+			parse_strategy(spec)
+		except ValueError as error:
+			parser.error(str(error))
+
+	results = run_tournament(args.strategies, args.deals, args.seed, args.processes, args.max_turns)
+	print_results(results)
+
+	if args.json:
+		with open(args.json, "w") as json_file:
+			json.dump({"seed": args.seed, "deals": args.deals, "results": results}, json_file, indent = 2)
+else:
+	logger = logging.getLogger('logger.main')
@@ -0,0 +1,57 @@
+import concurrent.futures
+import logging
+import os
+
+from game_constants import *
+
+
+
+_executors = {}
+
+
+
+class TurnScheduler:
+	"""Decides whose turn it is at a table of `num_seats` seats and lets the computers think ahead
+
+	Properties of a `TurnScheduler` type object:
+	- Seats move in the order 0, 1, ..., num_seats - 1 and around again; self.seat is the seat to move
+	- When a computer has discarded, it starts thinking about it's next draw (see `computer.Computer.ponder`) on `executor`
+	  while the other seats move, so a table of computers doesn't take one computer's time per seat for every cycle
+	- Without an `executor` the computers only think on their turn, which keeps headless rounds reproducible
+	"""
+
+	def __init__(self, num_seats, seat = PLAYER_SEAT, executor = None):
+		self.num_seats = num_seats
+		self.seat = seat
+		self.executor = executor
+
+
+	def end_turn(self, seat, computer = None):
+		"""Passes the turn on after `seat` discarded. `computer` is the computer of the seat (None for a human)."""
+
+		if computer is not None and self.executor is not None:
+			computer.ponder(self.executor)
+		self.seat = (seat + 1) % self.num_seats
+		logger.info("In turns.py/end_turn: seat %d moved, seat %d to move", seat, self.seat)
+		return self.seat
+
+
+
+
+def get_executor():
+	"""Returns a thread pool for the computers to think on, created once per process.
+	A `concurrent.futures.ProcessPoolExecutor` also works: the thinking is handed over as plain data and it's result
+	(e.g. the `anytime.Lookahead` of `anytime.ponder_draws`) comes back pickled."""
+
+	executor = _executors.get("threads")
+	if executor is None:
+		executor = _executors["threads"] = concurrent.futures.ThreadPoolExecutor(max(2, os.cpu_count() or 1), thread_name_prefix = "ponder")
+	return executor
+
+
+
+
+if __name__ == '__main__':
+	pass
+else:
+	logger = logging.getLogger('logger.main')